@@ -0,0 +1,358 @@
+import datetime
+import importlib.util
+import io
+import json
+import random
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class Latency:
+    """Задержка и доля отказов подменного сервиса"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.failures = 0
+
+    def wait(self, extra: float = 0.0) -> bool:
+        """Имитация задержки; True, если вызов должен завершиться отказом"""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter) + extra
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+
+def reply_text(prompt: str) -> str:
+    """Детерминированный ответ подменной модели"""
+    return f"Это тестовый ответ на вопрос длиной {len(prompt)} символов. Второе предложение ответа. Третье предложение."
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов OpenAI chat completions и YandexGPT completion"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw or b'{}')
+        except ValueError:
+            return {}
+
+    def _send_json(self, status: int, payload: Dict):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'bench-model', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = self._body()
+        server: 'StubLLMServer' = self.server.stub
+
+        if self.path.endswith('/chat/completions'):
+            self._chat_completions(server, body)
+        elif self.path.endswith('/llm/v1/completion'):
+            self._yandex_completion(server, body)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _chat_completions(self, server: 'StubLLMServer', body: Dict):
+        if server.latency.wait():
+            self._send_json(server.failure_status, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+            return
+
+        prompt = ' '.join(str(message.get('content', '')) for message in body.get('messages', []))
+        text = reply_text(prompt)
+        created = int(time.time())
+
+        if not body.get('stream'):
+            self._send_json(200, {
+                'id': 'chatcmpl-bench',
+                'object': 'chat.completion',
+                'created': created,
+                'model': body.get('model', 'bench-model'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': text},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': len(prompt) // 3,
+                    'completion_tokens': len(text) // 3,
+                    'total_tokens': (len(prompt) + len(text)) // 3,
+                },
+            })
+            return
+
+        # Поток SSE: по слову в чанке, с паузой между чанками
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        for word in text.split(' '):
+            chunk = {
+                'id': 'chatcmpl-bench',
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': body.get('model', 'bench-model'),
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            if server.token_interval:
+                time.sleep(server.token_interval)
+
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _yandex_completion(self, server: 'StubLLMServer', body: Dict):
+        if not body:
+            # Прогревочный пустой запрос: ключ принят, тело неверное
+            self._send_json(400, {'error': 'empty request'})
+            return
+
+        if server.latency.wait():
+            self._send_json(server.failure_status, {'error': 'injected failure'})
+            return
+
+        text = reply_text(body.get('instruction_text', ''))
+        self._send_json(200, {
+            'result': {
+                'alternatives': [{'text': text, 'score': 1.0, 'num_tokens': str(len(text) // 3)}],
+                'num_prompt_tokens': str(len(body.get('instruction_text', '')) // 3),
+            }
+        })
+
+
+class StubLLMServer:
+    """Локальный HTTP-сервер в фоне, отвечающий как OpenAI и YandexGPT"""
+
+    def __init__(self, latency: Latency, failure_status: int = 503, token_interval: float = 0.0):
+        self.latency = latency
+        self.failure_status = failure_status
+        self.token_interval = token_interval
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _LLMHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def yandex_url(self) -> str:
+        return f"{self.url}/llm/v1/completion"
+
+    def start(self) -> 'StubLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='stub-llm')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def make_events(count: int, start: Optional[datetime.datetime] = None) -> List[Dict]:
+    """События в формате Calendar API, разбросанные по ближайшим дням"""
+    start = start or datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    events = []
+
+    for i in range(count):
+        begin = start + datetime.timedelta(hours=2 * i + 1)
+        if i % 7 == 6:
+            # Часть событий на весь день
+            value_start = {'date': begin.date().isoformat()}
+            value_end = {'date': (begin.date() + datetime.timedelta(days=1)).isoformat()}
+        else:
+            value_start = {'dateTime': begin.isoformat()}
+            value_end = {'dateTime': (begin + datetime.timedelta(hours=1)).isoformat()}
+
+        events.append({
+            'id': f"bench{i}",
+            'status': 'confirmed',
+            'summary': f"Встреча {i}",
+            'start': value_start,
+            'end': value_end,
+        })
+
+    return events
+
+
+def _calendar_error(status: int) -> Exception:
+    """HttpError клиента Google, если он установлен, иначе сетевая ошибка"""
+    if importlib.util.find_spec('googleapiclient') is None:
+        return ConnectionResetError(f"injected failure {status}")
+
+    from googleapiclient.errors import HttpError
+
+    resp = types.SimpleNamespace(status=status, reason='injected failure')
+    return HttpError(resp, b'{"error": "injected failure"}')
+
+
+class _CalendarRequest:
+    """Аналог HttpRequest: выполняется по execute()"""
+
+    def __init__(self, service: 'FakeCalendarService', action, *args):
+        self.service = service
+        self.action = action
+        self.args = args
+
+    def execute(self, num_retries: int = 0):
+        if self.service.latency.wait():
+            raise _calendar_error(self.service.failure_status)
+        return self.action(*self.args)
+
+
+class FakeCalendarService:
+    """Подмена service из googleapiclient: events().list/insert/delete над списком в памяти"""
+
+    def __init__(self, events: List[Dict], latency: Latency, page_size: int = 50, failure_status: int = 503):
+        self.latency = latency
+        self.page_size = page_size
+        self.failure_status = failure_status
+        self._events = {event['id']: event for event in events}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def events(self) -> 'FakeCalendarService':
+        return self
+
+    def list(self, **params) -> _CalendarRequest:
+        return _CalendarRequest(self, self._list, params)
+
+    def insert(self, calendarId: str, body: Dict) -> _CalendarRequest:
+        return _CalendarRequest(self, self._insert, body)
+
+    def delete(self, calendarId: str, eventId: str) -> _CalendarRequest:
+        return _CalendarRequest(self, self._delete, eventId)
+
+    def _list(self, params: Dict) -> Dict:
+        with self._lock:
+            events = list(self._events.values())
+
+        offset = int(params.get('pageToken') or 0)
+        page = events[offset:offset + self.page_size]
+        result = {'items': page}
+
+        if offset + self.page_size < len(events):
+            result['nextPageToken'] = str(offset + self.page_size)
+        else:
+            result['nextSyncToken'] = f"sync-{len(events)}"
+
+        return result
+
+    def _insert(self, body: Dict) -> Dict:
+        with self._lock:
+            self._counter += 1
+            event = dict(body, id=f"new{self._counter}", status='confirmed')
+            self._events[event['id']] = event
+        return event
+
+    def _delete(self, event_id: str) -> str:
+        with self._lock:
+            self._events.pop(event_id, None)
+        return ''
+
+
+class FakeGTTS:
+    """Подмена gTTS: задержка растёт с длиной текста, на выходе псевдо-MP3"""
+
+    latency = Latency()
+    per_char = 0.0
+
+    def __init__(self, text: str, lang: str = 'ru', timeout: Optional[float] = None, **kwargs):
+        self.text = text
+        self.lang = lang
+        self.timeout = timeout
+
+    def write_to_fp(self, fp: io.BytesIO):
+        if self.latency.wait(self.per_char * len(self.text)):
+            raise ConnectionError("injected gTTS failure")
+        fp.write(b'ID3' + self.text.encode('utf-8'))
+
+
+class FakeRecognizer:
+    """Подмена speech_recognition.Recognizer: «аудио» — это уже текст фразы"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.operation_timeout = None
+
+    def recognize_google(self, audio, language: str = 'ru-RU', **kwargs) -> str:
+        import speech_recognition as sr
+
+        if self.latency.wait():
+            raise sr.RequestError("injected recognition failure")
+        if not audio:
+            raise sr.UnknownValueError()
+        return audio
+
+
+@contextmanager
+def speech_fakes(gtts_latency: Latency):
+    """Подмена gTTS, а при отсутствии SpeechRecognition — минимальный модуль с его исключениями"""
+    saved = {name: sys.modules.get(name) for name in ('gtts', 'speech_recognition')}
+
+    gtts_module = types.ModuleType('gtts')
+    gtts_module.gTTS = type('gTTS', (FakeGTTS,), {'latency': gtts_latency})
+    sys.modules['gtts'] = gtts_module
+
+    if importlib.util.find_spec('speech_recognition') is None:
+        sr_module = types.ModuleType('speech_recognition')
+        sr_module.RequestError = type('RequestError', (Exception,), {})
+        sr_module.UnknownValueError = type('UnknownValueError', (Exception,), {})
+        sys.modules['speech_recognition'] = sr_module
+
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
@@ -0,0 +1,518 @@
+import argparse
+import datetime
+import importlib.util
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import webbrowser
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fakes import (
+    Latency, StubLLMServer, FakeCalendarService, FakeRecognizer, make_events, speech_fakes
+)
+from src import ai_engine as ai_engine_module
+from src.ai_engine import AIEngine
+from src.calendar_integration import GoogleCalendar
+from src.commands import CommandHandler
+from src.deadline import Deadline
+from src.metrics import metrics
+from src.recognizers import GoogleBackend
+from src.utils import split_sentences
+from src.voice import VoiceEngine
+
+ROOT = Path(__file__).parent.parent
+
+# Фразы, которые ведут к каждой встроенной команде по ключевым словам
+INTENT_PHRASES = {
+    'time': 'который час',
+    'date': 'какое сегодня число',
+    'calendar': 'что у меня на сегодня',
+    'browser': 'открой ютуб',
+    'metrics': 'покажи статистику',
+    'help': 'помощь',
+    'exit': 'до свидания',
+}
+
+# Перефразировки без ключевых слов: маршрут выбирает классификатор
+PARAPHRASES = ['подскажи сколько натикало', 'чем ты можешь быть полезна', 'что у нас по планам']
+
+AI_PHRASES = ['расскажи что-нибудь интересное о космосе', 'как приготовить омлет', 'почему небо голубое']
+
+HISTORY_TURNS = 20
+
+BENCHMARKS: List[Dict[str, Any]] = []
+
+
+def benchmark(name: str, requires: tuple = ()):
+    """Регистрация замера: функция готовит окружение и возвращает измеряемый вызов"""
+    def decorator(setup: Callable[['Context'], Callable[[], Any]]):
+        BENCHMARKS.append({'name': name, 'requires': requires, 'setup': setup})
+        return setup
+    return decorator
+
+
+@contextmanager
+def patched(target, **values):
+    """Временная подмена атрибутов модуля или объекта"""
+    saved = {name: getattr(target, name) for name in values}
+    for name, value in values.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+def available(module: str) -> bool:
+    """Установлена ли библиотека"""
+    return importlib.util.find_spec(module) is not None
+
+
+class BenchCalendar(GoogleCalendar):
+    """Календарь поверх подменного сервиса: копия уже загружена, как при тёплом старте"""
+
+    def __init__(self, service: FakeCalendarService):
+        self._fake_service = service
+        super().__init__()
+        self.service = service
+
+    def authenticate(self):
+        # Сервис подключается после __init__, чтобы не запускать фоновую синхронизацию
+        self.service = None
+
+    def _load_store(self):
+        self._events = {event['id']: event for event in self._fake_service._list({})['items']}
+        self._synced_at = time.time()
+
+    def _save_store(self):
+        pass
+
+
+class Context:
+    """Общие подменные сервисы и объекты ассистента для замеров"""
+
+    def __init__(self, args: argparse.Namespace, stack: ExitStack):
+        self.args = args
+        self.stack = stack
+        self._cache: Dict[str, Any] = {}
+
+    def _once(self, key: str, factory: Callable[[], Any]) -> Any:
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def latency(self, seconds: float, failure_rate: float = 0.0) -> Latency:
+        return Latency(seconds, seconds * self.args.jitter, failure_rate, self.args.seed)
+
+    def llm_server(self, name: str = 'llm', scale: float = 1.0, failure_rate: float = 0.0) -> StubLLMServer:
+        """Локальный сервер OpenAI/YandexGPT"""
+        return self._once(f"server:{name}", lambda: self.stack.enter_context(StubLLMServer(
+            self.latency(self.args.llm_latency * scale, failure_rate),
+            token_interval=self.args.token_interval
+        )))
+
+    def engine(self, provider: str = 'offline', server: Optional[StubLLMServer] = None,
+               openai_server: Optional[StubLLMServer] = None) -> AIEngine:
+        """AIEngine без кэша и журнала; провайдеры смотрят на локальные серверы"""
+        def build():
+            server_ = server or self.llm_server()
+            openai_server_ = openai_server or server_
+            values = dict(
+                AI_PROVIDER='yandex' if provider == 'yandex' else 'openai',
+                RESPONSE_CACHE_ENABLED=False,
+                CONVERSATION_LOG_ENABLED=False,
+                OPENAI_API_KEY=None,
+                YANDEX_API_KEY=None,
+                YANDEX_FOLDER_ID=None,
+            )
+            if provider in ('openai', 'hedged') and available('openai'):
+                values['OPENAI_API_KEY'] = 'bench'
+            if provider in ('yandex', 'hedged') and available('requests'):
+                values.update(YANDEX_API_KEY='bench', YANDEX_FOLDER_ID='bench')
+
+            with patched(ai_engine_module, **values):
+                engine = AIEngine()
+
+            if engine.client:
+                engine.client = engine.client.with_options(base_url=openai_server_.openai_base_url)
+            # Адрес YandexGPT читается при каждом запросе, поэтому подмена живёт до конца прогона
+            self.stack.enter_context(patched(ai_engine_module, YANDEX_COMPLETION_URL=server_.yandex_url,
+                                             YANDEX_API_KEY='bench'))
+            return engine
+
+        key = f"engine:{provider}:{id(server)}:{id(openai_server)}"
+        return self._once(key, build)
+
+    def calendar(self) -> BenchCalendar:
+        """Календарь с подменным сервисом"""
+        return self._once('calendar', lambda: BenchCalendar(FakeCalendarService(
+            make_events(self.args.events), self.latency(self.args.calendar_latency)
+        )))
+
+    def handler(self, engine: Optional[AIEngine] = None) -> CommandHandler:
+        """Обработчик команд с подменным календарём"""
+        engine = engine or self.engine()
+        return self._once(f"handler:{id(engine)}", lambda: CommandHandler(engine, self.calendar(), None))
+
+    def voice(self) -> VoiceEngine:
+        """Голосовой движок без микрофона и колонок: только синтез и распознавание"""
+        def build():
+            self.stack.enter_context(speech_fakes(self.latency(self.args.tts_latency)))
+            voice = object.__new__(VoiceEngine)
+            voice.audio_cache = None
+            voice.asr = GoogleBackend(FakeRecognizer(self.latency(self.args.asr_latency)))
+            return voice
+
+        return self._once('voice', build)
+
+
+def fill_history(engine: AIEngine, turns: int = HISTORY_TURNS):
+    """История разговора, как после нескольких минут общения"""
+    for i in range(turns):
+        engine.add_to_history('user', f"Вопрос номер {i}: расскажи подробнее про тему {i}?")
+        engine.add_to_history('assistant', f"Ответ номер {i}. Тема {i} довольно интересна. " * 3)
+
+
+def llm_provider_required(provider: str) -> tuple:
+    """Библиотеки, без которых провайдер не подключится"""
+    return {'openai': ('openai',), 'yandex': ('requests',), 'hedged': ('openai', 'requests')}[provider]
+
+
+# Маршрутизация команд
+
+for _intent, _phrase in INTENT_PHRASES.items():
+    def _setup(ctx: Context, phrase=_phrase):
+        ctx.stack.enter_context(patched(webbrowser, open=lambda url: True))
+        handler = ctx.handler()
+        return lambda: handler.process_command(phrase)
+
+    benchmark(f"commands.{_intent}")(_setup)
+
+
+@benchmark('commands.route_paraphrase')
+def _(ctx: Context):
+    handler = ctx.handler()
+    phrases = itertools.cycle(PARAPHRASES)
+    handler.route(PARAPHRASES[0])  # обучение классификатора не входит в замер
+    return lambda: handler.route(next(phrases))
+
+
+@benchmark('commands.ai', requires=('requests',))
+def _(ctx: Context):
+    handler = ctx.handler(ctx.engine('yandex'))
+    phrases = itertools.cycle(AI_PHRASES)
+    return lambda: handler.process_command(next(phrases))
+
+
+# Сборка промпта и история
+
+@benchmark('ai.prompt.openai')
+def _(ctx: Context):
+    engine = ctx.engine()
+    fill_history(engine)
+    context = {'current_time': '12:00', 'upcoming_events': [f"Встреча {i} в 1{i}:00" for i in range(5)]}
+    return lambda: engine._build_openai_messages(context)
+
+
+@benchmark('ai.prompt.tokens')
+def _(ctx: Context):
+    engine = ctx.engine()
+    fill_history(engine)
+    return engine._count_prompt_tokens
+
+
+@benchmark('ai.history.append')
+def _(ctx: Context):
+    engine = ctx.engine()
+    fill_history(engine)
+    counter = itertools.count()
+    # История уже у предела бюджета: каждое добавление вытесняет старые сообщения в сводку
+    return lambda: engine.add_to_history('user', f"Очередной вопрос {next(counter)}. С продолжением?")
+
+
+# Ответы провайдеров через локальные серверы
+
+for _provider in ('openai', 'yandex', 'hedged'):
+    def _setup(ctx: Context, provider=_provider):
+        if provider == 'hedged':
+            # Основной провайдер тормозит: отвечает запасной после задержки хеджирования
+            engine = ctx.engine(provider, openai_server=ctx.llm_server('slow', scale=4.0))
+            engine.router.hedge_min_delay = ctx.args.llm_latency * 1.5
+        else:
+            engine = ctx.engine(provider)
+        phrases = itertools.cycle(AI_PHRASES)
+        return lambda: engine.get_response(next(phrases), use_cache=False)
+
+    benchmark(f"ai.response.{_provider}", requires=llm_provider_required(_provider))(_setup)
+
+
+@benchmark('ai.response.yandex_flaky', requires=('requests',))
+def _(ctx: Context):
+    server = ctx.llm_server('flaky', failure_rate=ctx.args.failure_rate)
+    engine = ctx.engine('yandex', server=server)
+    # Автомат отключения не должен выключить единственного провайдера посреди замера
+    engine.router.failure_threshold = sys.maxsize
+    phrases = itertools.cycle(AI_PHRASES)
+    return lambda: engine.get_response(next(phrases), use_cache=False)
+
+
+@benchmark('ai.stream.first_sentence', requires=('openai',))
+def _(ctx: Context):
+    engine = ctx.engine('openai')
+    phrases = itertools.cycle(AI_PHRASES)
+
+    def run():
+        started = time.perf_counter()
+        stream = engine.get_response_stream(next(phrases), use_cache=False)
+        next(stream)
+        elapsed = time.perf_counter() - started
+        for _ in stream:
+            pass
+        return elapsed
+
+    return run
+
+
+# Календарь
+
+@benchmark('calendar.format_events_text')
+def _(ctx: Context):
+    calendar = ctx.calendar()
+    events = calendar._sorted_events()
+    return lambda: calendar.format_events_text(events)
+
+
+@benchmark('calendar.today')
+def _(ctx: Context):
+    return ctx.calendar().get_today_events
+
+
+@benchmark('calendar.upcoming')
+def _(ctx: Context):
+    return lambda: ctx.calendar().get_upcoming_events(5)
+
+
+@benchmark('calendar.sync_full', requires=('googleapiclient', 'httplib2'))
+def _(ctx: Context):
+    calendar = ctx.calendar()
+
+    def run():
+        calendar._sync_token = None
+        calendar.sync()
+
+    return run
+
+
+@benchmark('calendar.insert_delete', requires=('googleapiclient',))
+def _(ctx: Context):
+    calendar = ctx.calendar()
+    start = datetime.datetime.now() + datetime.timedelta(days=1)
+
+    def run():
+        event = calendar.create_event('Замер', start)
+        calendar.delete_event(event['id'])
+
+    return run
+
+
+# Речь
+
+@benchmark('speech.asr')
+def _(ctx: Context):
+    voice = ctx.voice()
+    phrases = itertools.cycle(AI_PHRASES)
+    return lambda: voice.recognize(next(phrases))
+
+
+@benchmark('speech.tts')
+def _(ctx: Context):
+    voice = ctx.voice()
+    sentences = itertools.cycle(split_sentences(' '.join(f"Это предложение номер {i}." for i in range(10))))
+    return lambda: voice._synthesize_gtts(next(sentences))
+
+
+# Полные ходы: распознавание, команда, синтез ответа по предложениям
+
+def simulated_turn(ctx: Context, handler: CommandHandler, phrase: str):
+    """Ход целиком без микрофона и колонок"""
+    voice = ctx.voice()
+    deadline = Deadline(ctx.args.turn_deadline)
+
+    text = voice.recognize(phrase, deadline)
+    result = handler.process_command(text, deadline=deadline)
+    for sentence in split_sentences(result['response']):
+        voice._synthesize_gtts(sentence)
+
+    metrics.observe('turn', deadline.elapsed(), turn=deadline.turn)
+
+
+@benchmark('turn.command')
+def _(ctx: Context):
+    handler = ctx.handler()
+    return lambda: simulated_turn(ctx, handler, INTENT_PHRASES['calendar'])
+
+
+@benchmark('turn.ai', requires=('requests',))
+def _(ctx: Context):
+    handler = ctx.handler(ctx.engine('yandex'))
+    phrases = itertools.cycle(AI_PHRASES)
+    return lambda: simulated_turn(ctx, handler, next(phrases))
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Перцентиль отсортированных замеров"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int) -> Dict[str, Any]:
+    """Замеры вызова; функция может сама вернуть длительность в секундах"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    errors = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            errors += 1
+            continue
+        elapsed = time.perf_counter() - started
+        samples.append(result if isinstance(result, float) else elapsed)
+
+    if not samples:
+        return {'n': 0, 'errors': errors}
+
+    ordered = sorted(samples)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        'n': len(samples),
+        'errors': errors,
+        'mean_ms': ms(sum(samples) / len(samples)),
+        'p50_ms': ms(percentile(ordered, 0.5)),
+        'p95_ms': ms(percentile(ordered, 0.95)),
+        'min_ms': ms(ordered[0]),
+        'max_ms': ms(ordered[-1]),
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Текущий коммит, чтобы сравнивать прогоны между коммитами"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Прогон выбранных замеров"""
+    results = []
+
+    with ExitStack() as stack:
+        # Замеры не должны дописывать метрики в файлы пользователя
+        stack.enter_context(patched(metrics, formats=set()))
+        ctx = Context(args, stack)
+
+        for bench in BENCHMARKS:
+            name = bench['name']
+            if args.filter and not any(pattern in name for pattern in args.filter):
+                continue
+
+            missing = [module for module in bench['requires'] if not available(module)]
+            if missing:
+                results.append({'name': name, 'skipped': f"нет библиотек: {', '.join(missing)}"})
+                continue
+
+            print(f"⏱ {name}", file=sys.stderr)
+            try:
+                fn = bench['setup'](ctx)
+                results.append({'name': name, **measure(fn, args.repeat, args.warmup)})
+            except Exception as e:
+                results.append({'name': name, 'failed': f"{type(e).__name__}: {e}"})
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'llm_latency': args.llm_latency,
+            'calendar_latency': args.calendar_latency,
+            'asr_latency': args.asr_latency,
+            'tts_latency': args.tts_latency,
+            'failure_rate': args.failure_rate,
+        },
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline_path: Path, threshold: float) -> bool:
+    """Сравнение p50 с прошлым прогоном; True, если нашлись замедления"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {row['name']: row for row in json.load(f)['results']}
+
+    regressed = False
+    print(f"{'замер':<32} {'было':>10} {'стало':>10} {'×':>6}", file=sys.stderr)
+    for row in report['results']:
+        before = baseline.get(row['name'], {}).get('p50_ms')
+        after = row.get('p50_ms')
+        if not before or after is None:
+            continue
+
+        ratio = after / before
+        mark = ' ⚠️' if ratio > threshold else ''
+        regressed = regressed or bool(mark)
+        print(f"{row['name']:<32} {before:>8.2f}мс {after:>8.2f}мс {ratio:>6.2f}{mark}", file=sys.stderr)
+
+    return regressed
+
+
+def main():
+    """Замеры производительности ассистента на локальных подменах внешних сервисов"""
+    parser = argparse.ArgumentParser(description="Офлайн-замеры производительности ассистента")
+    parser.add_argument('--repeat', type=int, default=30, help='Число замеров на сценарий')
+    parser.add_argument('--warmup', type=int, default=2, help='Прогревочные вызовы перед замером')
+    parser.add_argument('--filter', action='append', help='Только замеры, содержащие подстроку')
+    parser.add_argument('--output', type=Path, help='Файл для JSON с результатами (по умолчанию stdout)')
+    parser.add_argument('--compare', type=Path, help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Во сколько раз p50 может вырасти без тревоги')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Задержка LLM, с')
+    parser.add_argument('--token-interval', type=float, default=0.002, help='Пауза между чанками потока, с')
+    parser.add_argument('--events', type=int, default=50, help='Число событий в подменном календаре')
+    parser.add_argument('--calendar-latency', type=float, default=0.02, help='Задержка Calendar API, с')
+    parser.add_argument('--asr-latency', type=float, default=0.05, help='Задержка распознавания, с')
+    parser.add_argument('--tts-latency', type=float, default=0.03, help='Задержка синтеза речи, с')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Разброс задержек как доля от задержки')
+    parser.add_argument('--failure-rate', type=float, default=0.2, help='Доля отказов в сценариях со сбоями')
+    parser.add_argument('--turn-deadline', type=float, default=15.0, help='Срок хода в полных сценариях, с')
+    parser.add_argument('--seed', type=int, default=13)
+    args = parser.parse_args()
+
+    # Сообщения ассистента уходят в stderr, чтобы не смешиваться с JSON
+    with redirect_stdout(sys.stderr):
+        report = run(args)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
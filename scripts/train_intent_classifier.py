@@ -0,0 +1,132 @@
+import argparse
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.intent_classifier import IntentClassifier, load_phrases, INTENT_PHRASES_PATH, OTHER_LABEL
+
+
+def split_folds(examples, folds: int, seed: int):
+    """Стратифицированное разбиение фраз на фолды"""
+    rng = random.Random(seed)
+    result = [defaultdict(list) for _ in range(folds)]
+
+    for label, phrases in examples.items():
+        phrases = list(phrases)
+        rng.shuffle(phrases)
+        for i, phrase in enumerate(phrases):
+            result[i % folds][label].append(phrase)
+
+    return result
+
+
+def evaluate(examples, folds: int, seed: int):
+    """Кросс-валидация: (метка, предсказание, уверенность) для каждой фразы и время предсказания"""
+    parts = split_folds(examples, folds, seed)
+    predictions = []
+    timings = []
+
+    for i, test_part in enumerate(parts):
+        train = defaultdict(list)
+        for j, part in enumerate(parts):
+            if j != i:
+                for label, phrases in part.items():
+                    train[label].extend(phrases)
+
+        classifier = IntentClassifier().fit(train)
+
+        for label, phrases in test_part.items():
+            for phrase in phrases:
+                started = time.perf_counter()
+                predicted, score = classifier.predict(phrase)
+                timings.append(time.perf_counter() - started)
+                predictions.append((label, predicted, score))
+
+    return predictions, timings
+
+
+def apply_threshold(predictions, threshold: float) -> Counter:
+    """Матрица ошибок при заданном пороге: неуверенные ответы уходят в AI"""
+    confusion = Counter()
+    for label, predicted, score in predictions:
+        if predicted is None or score < threshold:
+            predicted = OTHER_LABEL
+        confusion[(label, predicted)] += 1
+    return confusion
+
+
+def calibrate(predictions, max_false_local: float) -> float:
+    """Наименьший порог, при котором доля вопросов для AI, ушедших в команды, не выше допустимой"""
+    others = sum(1 for label, _, _ in predictions if label == OTHER_LABEL)
+    # Порог берётся чуть выше уверенности ложного срабатывания, чтобы оно отсекалось
+    false_scores = sorted(
+        (score for label, predicted, score in predictions
+         if label == OTHER_LABEL and predicted not in (None, OTHER_LABEL)),
+        reverse=True,
+    )
+    allowed = int(others * max_false_local)
+    if len(false_scores) <= allowed:
+        return 0.0
+    return round(false_scores[allowed] + 0.005, 2)
+
+
+def main():
+    """Оценка классификатора намерений на размеченных фразах"""
+    parser = argparse.ArgumentParser(description="Обучение и оценка локального классификатора намерений")
+    parser.add_argument('--phrases', type=Path, default=INTENT_PHRASES_PATH, help='JSON с размеченными фразами')
+    parser.add_argument('--folds', type=int, default=5, help='Число фолдов кросс-валидации')
+    parser.add_argument('--threshold', type=float, help='Порог уверенности; по умолчанию подбирается')
+    parser.add_argument('--max-false-local', type=float, default=0.03,
+                        help='Допустимая доля вопросов для AI, ушедших в локальные команды, при подборе порога')
+    parser.add_argument('--seed', type=int, default=13)
+    args = parser.parse_args()
+
+    examples = load_phrases(args.phrases)
+
+    started = time.perf_counter()
+    IntentClassifier().fit(examples)
+    fit_time = time.perf_counter() - started
+
+    predictions, timings = evaluate(examples, args.folds, args.seed)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = calibrate(predictions, args.max_false_local)
+        print(f"Подобранный порог (INTENT_CONFIDENCE_THRESHOLD): {threshold}")
+
+    confusion = apply_threshold(predictions, threshold)
+    labels = sorted(examples)
+
+    total = sum(confusion.values())
+    correct = sum(count for (label, predicted), count in confusion.items() if label == predicted)
+    # Ложные срабатывания дороже пропусков: они отвечают не то вместо AI
+    false_local = sum(
+        count for (label, predicted), count in confusion.items()
+        if label == OTHER_LABEL and predicted != OTHER_LABEL
+    )
+
+    print(f"Фраз: {total}, намерений: {len(labels)}, обучение на всех: {fit_time * 1000:.1f} мс")
+    print(f"Точность ({args.folds} фолдов, порог {threshold}): {correct / total:.3f}")
+    print(f"Вопросы для AI, ушедшие в локальные команды: {false_local}")
+    print()
+    print(f"{'намерение':<12} {'precision':>9} {'recall':>9}")
+
+    for label in labels:
+        true_positive = confusion[(label, label)]
+        predicted = sum(count for (_, p), count in confusion.items() if p == label)
+        actual = sum(count for (l, _), count in confusion.items() if l == label)
+        precision = true_positive / predicted if predicted else 0.0
+        recall = true_positive / actual if actual else 0.0
+        print(f"{label:<12} {precision:>9.3f} {recall:>9.3f}")
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+    print(f"\nВремя предсказания: p50 {p50:.3f} мс, p99 {p99:.3f} мс")
+
+
+if __name__ == '__main__':
+    main()
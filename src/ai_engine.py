@@ -1,25 +1,57 @@
-import openai
-import requests
 import json
-from typing import List, Dict, Optional
-from datetime import datetime
+import threading
+import time
+from typing import List, Dict, Optional, Iterator
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+try:
+    from src.utils import iter_sentences, split_sentences, LazySingleton
+    from src.response_cache import ResponseCache
+    from src.history import ConversationHistory, make_token_counter
+    from src.conversation_log import ConversationLog
+    from src.provider_router import ProviderRouter, ProviderError, is_provider_failure
+    from src.deadline import Deadline, DeadlineExceeded, retry_call
+    from src.metrics import metrics
+except ImportError:
+    from utils import iter_sentences, split_sentences, LazySingleton
+    from response_cache import ResponseCache
+    from history import ConversationHistory, make_token_counter
+    from conversation_log import ConversationLog
+    from provider_router import ProviderRouter, ProviderError, is_provider_failure
+    from deadline import Deadline, DeadlineExceeded, retry_call
+    from metrics import metrics
+
 try:
     from src.config import (
         OPENAI_API_KEY, OPENAI_MODEL,
         YANDEX_API_KEY, YANDEX_FOLDER_ID, YANDEX_MODEL,
-        AI_PROVIDER, SYSTEM_PROMPT
+        AI_PROVIDER, SYSTEM_PROMPT,
+        AI_HTTP_POOL_SIZE, AI_CONNECT_TIMEOUT, AI_READ_TIMEOUT,
+        RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_KB,
+        RESPONSE_CACHE_PERSIST, RESPONSE_CACHE_PATH,
+        HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_TOKENS, HISTORY_RESUME_MESSAGES,
+        CONVERSATION_LOG_ENABLED, CONVERSATION_LOG_PATH,
+        CONVERSATION_LOG_RETENTION_DAYS, CONVERSATION_LOG_MAX_MESSAGES,
+        AI_HEDGE_ENABLED, AI_HEDGE_MIN_DELAY, AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN,
+        TURN_DEADLINE
     )
 except ImportError:
     try:
         from config import (
             OPENAI_API_KEY, OPENAI_MODEL,
             YANDEX_API_KEY, YANDEX_FOLDER_ID, YANDEX_MODEL,
-            AI_PROVIDER, SYSTEM_PROMPT
+            AI_PROVIDER, SYSTEM_PROMPT,
+            AI_HTTP_POOL_SIZE, AI_CONNECT_TIMEOUT, AI_READ_TIMEOUT,
+            RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_KB,
+            RESPONSE_CACHE_PERSIST, RESPONSE_CACHE_PATH,
+            HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_TOKENS, HISTORY_RESUME_MESSAGES,
+            CONVERSATION_LOG_ENABLED, CONVERSATION_LOG_PATH,
+            CONVERSATION_LOG_RETENTION_DAYS, CONVERSATION_LOG_MAX_MESSAGES,
+            AI_HEDGE_ENABLED, AI_HEDGE_MIN_DELAY, AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN,
+            TURN_DEADLINE
         )
     except ImportError:
         OPENAI_API_KEY = None
@@ -29,6 +61,45 @@ except ImportError:
         YANDEX_MODEL = "general"
         AI_PROVIDER = "openai"
         SYSTEM_PROMPT = "Ты - дружелюбный AI-ассистент. Отвечай кратко и по делу."
+        AI_HTTP_POOL_SIZE = 4
+        AI_CONNECT_TIMEOUT = 3.05
+        AI_READ_TIMEOUT = 30.0
+        RESPONSE_CACHE_ENABLED = True
+        RESPONSE_CACHE_TTL = 86400
+        RESPONSE_CACHE_MAX_KB = 2048
+        RESPONSE_CACHE_PERSIST = False
+        RESPONSE_CACHE_PATH = None
+        HISTORY_TOKEN_BUDGET = 1500
+        HISTORY_SUMMARY_TOKENS = 300
+        HISTORY_RESUME_MESSAGES = 40
+        CONVERSATION_LOG_ENABLED = False
+        CONVERSATION_LOG_PATH = None
+        CONVERSATION_LOG_RETENTION_DAYS = 90
+        CONVERSATION_LOG_MAX_MESSAGES = 20000
+        AI_HEDGE_ENABLED = True
+        AI_HEDGE_MIN_DELAY = 2.0
+        AI_BREAKER_FAILURES = 3
+        AI_BREAKER_COOLDOWN = 30.0
+        TURN_DEADLINE = 15.0
+
+
+YANDEX_COMPLETION_URL = "https://llm.api.cloud.yandex.net/llm/v1/completion"
+
+FALLBACK_RESPONSES = [
+    ('привет', 'Здравствуйте! Чем могу помочь?'),
+    ('как дела', 'У меня всё отлично, спасибо!'),
+    ('спасибо', 'Пожалуйста! Рад помочь.'),
+    ('пока', 'До свидания!'),
+    ('как тебя зовут', 'Меня зовут Алиса, я ваш голосовой ассистент.'),
+    ('что ты умеешь', 'Я умею показывать события календаря, сообщать время и дату, открывать сайты и отвечать на вопросы.'),
+]
+
+OFFLINE_RESPONSE = "Извините, я сейчас работаю в автономном режиме. Пожалуйста, настройте API ключи для полного функционала."
+
+TIMEOUT_RESPONSE = "Извините, сервис отвечает слишком долго. Попробуйте спросить ещё раз."
+
+# Статусы YandexGPT, после которых имеет смысл повторить запрос
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
 
 
 class AIEngine:
@@ -36,136 +107,435 @@ class AIEngine:
 
     def __init__(self):
         self.provider = AI_PROVIDER
-        self.conversation_history = []
-        self.max_history = 10
+        self.conversation_history = ConversationHistory(
+            make_token_counter(self.provider, OPENAI_MODEL if self.provider == 'openai' else YANDEX_MODEL),
+            HISTORY_TOKEN_BUDGET,
+            HISTORY_SUMMARY_TOKENS
+        )
+
+        self.conversation_log = None
+        if CONVERSATION_LOG_ENABLED:
+            self.conversation_log = ConversationLog(
+                CONVERSATION_LOG_PATH, CONVERSATION_LOG_RETENTION_DAYS, CONVERSATION_LOG_MAX_MESSAGES
+            )
+            self._resume_history()
+
+        # Общая keep-alive сессия для провайдеров с обычным HTTP
+        self._http = None
+        self._http_lock = threading.Lock()
+
+        self.response_cache = None
+        if RESPONSE_CACHE_ENABLED:
+            persist_path = RESPONSE_CACHE_PATH if RESPONSE_CACHE_PERSIST else None
+            self.response_cache = ResponseCache(RESPONSE_CACHE_MAX_KB * 1024, RESPONSE_CACHE_TTL, persist_path)
 
-        if self.provider == 'openai' and OPENAI_API_KEY:
-            self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        # Клиент OpenAI нужен и тогда, когда OpenAI — запасной провайдер
+        if OPENAI_API_KEY:
+            import openai
+            self.client = openai.OpenAI(
+                api_key=OPENAI_API_KEY,
+                timeout=openai.Timeout(AI_READ_TIMEOUT, connect=AI_CONNECT_TIMEOUT)
+            )
         else:
             self.client = None
 
+        self.router = ProviderRouter(AI_HEDGE_ENABLED, AI_HEDGE_MIN_DELAY, AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN)
+        providers = {
+            'openai': self._get_openai_response if self.client else None,
+            'yandex': self._get_yandex_response if YANDEX_API_KEY and YANDEX_FOLDER_ID else None,
+        }
+        # Провайдер из настроек основной, остальные настроенные — запасные
+        for name in sorted(providers, key=lambda name: name != self.provider):
+            if providers[name]:
+                self.router.add(name, providers[name])
+
+    @property
+    def http(self):
+        """Пул соединений requests, создаётся при первом запросе"""
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=AI_HTTP_POOL_SIZE, pool_maxsize=AI_HTTP_POOL_SIZE)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._http = session
+
+        return self._http
+
+    def warm_up(self) -> bool:
+        """Открытие соединений с провайдерами и проверка ключей заранее"""
+        if not self.router:
+            return False
+
+        ready = False
+        for name in self.router.providers:
+            try:
+                if name == 'openai':
+                    self.client.models.list()
+                else:
+                    # Пустой запрос не тратит токены: 400 означает, что ключ принят
+                    response = self.http.post(
+                        YANDEX_COMPLETION_URL,
+                        headers=self._yandex_headers(),
+                        json={},
+                        timeout=(AI_CONNECT_TIMEOUT, AI_READ_TIMEOUT)
+                    )
+                    if response.status_code in (401, 403):
+                        print(f"❌ YandexGPT: ключ API отклонён ({response.status_code})")
+                        self.router.record_failure(name)
+                        continue
+
+                print(f"🔌 Соединение с {name} установлено")
+                ready = True
+
+            except Exception as e:
+                print(f"⚠️ Не удалось прогреть соединение с {name}: {e}")
+
+        return ready
+
+    def _yandex_headers(self) -> Dict[str, str]:
+        """Заголовки запросов к YandexGPT"""
+        return {
+            "Authorization": f"Api-Key {YANDEX_API_KEY}",
+            "Content-Type": "application/json"
+        }
+
     def add_to_history(self, role: str, content: str):
         """Добавление сообщения в историю"""
-        self.conversation_history.append({
-            'role': role,
-            'content': content,
-            'timestamp': datetime.now().isoformat()
-        })
-
-        if len(self.conversation_history) > self.max_history * 2:
-            self.conversation_history = self.conversation_history[-self.max_history * 2:]
+        message = self.conversation_history.append(role, content)
+        if self.conversation_log:
+            self.conversation_log.append(role, content, message['timestamp'])
 
     def clear_history(self):
         """Очистка истории"""
-        self.conversation_history = []
+        self.conversation_history.clear()
+        if self.conversation_log:
+            self.conversation_log.clear()
+
+    def _resume_history(self):
+        """Восстановление конца прошлого разговора из журнала"""
+        messages = self.conversation_log.tail(HISTORY_RESUME_MESSAGES)
+        for message in messages:
+            self.conversation_history.append(message['role'], message['content'], message['timestamp'])
+
+        if messages:
+            print(f"💬 Восстановлено сообщений из прошлого разговора: {len(messages)}")
 
-    def get_response(self, user_input: str, context: Optional[Dict] = None) -> str:
-        """Получение ответа от AI"""
+    def flush_log(self):
+        """Запись журнала диалога на диск"""
+        if self.conversation_log:
+            self.conversation_log.flush(timeout=2)
+
+    def get_response(self, user_input: str, context: Optional[Dict] = None, use_cache: bool = True,
+                     deadline: Optional[Deadline] = None) -> str:
+        """Получение ответа от AI не позже срока deadline"""
+        deadline = deadline or Deadline(TURN_DEADLINE)
 
         self.add_to_history('user', user_input)
 
-        if self.provider == 'openai' and OPENAI_API_KEY and self.client:
-            return self._get_openai_response(user_input, context)
-        elif self.provider == 'yandex' and YANDEX_API_KEY and YANDEX_FOLDER_ID:
-            return self._get_yandex_response(user_input, context)
-        else:
+        cache_key = self._response_cache_key(user_input, context, use_cache)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+
+        if not self.router:
             return self._get_fallback_response(user_input)
 
-    def _get_openai_response(self, user_input: str, context: Optional[Dict] = None) -> str:
-        """Получение ответа от OpenAI GPT"""
         try:
-            messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
-
-            for msg in self.conversation_history[-6:]:
-                messages.append({
-                    'role': msg['role'],
-                    'content': msg['content']
-                })
-
-            if context:
-                context_text = f"\nТекущее время: {context.get('current_time', 'неизвестно')}"
-                if context.get('upcoming_events'):
-                    context_text += "\nПредстоящие события:\n"
-                    for event in context['upcoming_events'][:3]:
-                        context_text += f"- {event}\n"
-                messages.append({'role': 'system', 'content': context_text})
-
-            response = self.client.chat.completions.create(
+            _, response = self.router.call(context, deadline, deadline=deadline)
+        except DeadlineExceeded as e:
+            print(f"⏱ {e}")
+            return TIMEOUT_RESPONSE
+        except ProviderError as e:
+            print(f"❌ AI провайдеры не ответили: {e}")
+            return self._get_fallback_response(user_input)
+
+        self.add_to_history('assistant', response)
+        self._cache_response(cache_key, response)
+        return response
+
+    def get_response_stream(self, user_input: str, context: Optional[Dict] = None,
+                            use_cache: bool = True, deadline: Optional[Deadline] = None) -> Iterator[str]:
+        """Потоковое получение ответа от AI по предложениям"""
+        deadline = deadline or Deadline(TURN_DEADLINE)
+
+        self.add_to_history('user', user_input)
+
+        cache_key = self._response_cache_key(user_input, context, use_cache)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            yield from split_sentences(cached)
+            return
+
+        if not self.router:
+            yield self._get_fallback_response(user_input)
+            return
+
+        # Поток отдаёт только OpenAI; дублировать поток нельзя, поэтому без хеджирования
+        streamed = self.router.order()[:1] == ['openai']
+        if streamed:
+            parts = []
+            started = time.monotonic()
+            try:
+                for i, sentence in enumerate(self._stream_openai_response(context, deadline, parts)):
+                    if i == 0:
+                        metrics.observe('llm_first_sentence', time.monotonic() - started,
+                                        provider='openai', turn=deadline.turn)
+                    yield sentence
+            except DeadlineExceeded as e:
+                print(f"⏱ {e}")
+                if parts:
+                    self.add_to_history('assistant', ''.join(parts))
+                else:
+                    yield TIMEOUT_RESPONSE
+                return
+            except Exception as e:
+                print(f"❌ OpenAI API error: {e}")
+                if is_provider_failure(e, deadline):
+                    self.router.record_failure('openai')
+                if parts:
+                    # В историю попадает полный ответ, даже если поток оборвался на середине
+                    self.add_to_history('assistant', ''.join(parts))
+                    return
+            else:
+                self.router.record_success('openai', time.monotonic() - started)
+                response = ''.join(parts)
+                # В потоке OpenAI не сообщает usage, поэтому токены оцениваются
+                self._record_tokens(
+                    'openai', self._count_prompt_tokens(), self.conversation_history.count_tokens(response)
+                )
+                metrics.observe('llm', time.monotonic() - started, provider='openai', turn=deadline.turn,
+                                stream=True)
+                self.add_to_history('assistant', response)
+                self._cache_response(cache_key, response)
+                return
+
+        try:
+            _, response = self.router.call(
+                context, deadline, exclude=('openai',) if streamed else (), deadline=deadline
+            )
+        except DeadlineExceeded as e:
+            print(f"⏱ {e}")
+            yield TIMEOUT_RESPONSE
+            return
+        except ProviderError as e:
+            print(f"❌ AI провайдеры не ответили: {e}")
+            yield self._get_fallback_response(user_input)
+            return
+
+        self.add_to_history('assistant', response)
+        self._cache_response(cache_key, response)
+        yield from split_sentences(response)
+
+    def _response_cache_key(self, user_input: str, context: Optional[Dict], use_cache: bool) -> Optional[str]:
+        """Ключ кэша ответов или None, если запрос идёт мимо кэша"""
+        if not self.response_cache or not self.router:
+            return None
+
+        if not use_cache or ResponseCache.is_context_sensitive(user_input):
+            self.response_cache.record_bypass()
+            return None
+
+        # Ответить может любой из настроенных провайдеров, поэтому в ключе весь их набор
+        models = {'openai': OPENAI_MODEL, 'yandex': YANDEX_MODEL}
+        providers = sorted(self.router.providers)
+        return ResponseCache.make_key(
+            '+'.join(providers), '+'.join(models[name] for name in providers), user_input, context
+        )
+
+    def _get_cached_response(self, cache_key: Optional[str]) -> Optional[str]:
+        """Ответ из кэша с записью в историю"""
+        if not cache_key:
+            return None
+
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            self.add_to_history('assistant', cached)
+
+        return cached
+
+    def _cache_response(self, cache_key: Optional[str], response: str):
+        """Кэширование ответа провайдера"""
+        if cache_key and response:
+            self.response_cache.put(cache_key, response)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Счётчики кэша ответов"""
+        return self.response_cache.stats() if self.response_cache else {}
+
+    def _count_prompt_tokens(self) -> int:
+        """Оценка размера промпта: системный промпт и история"""
+        return sum(
+            self.conversation_history.count_tokens(message['content'])
+            for message in [{'content': SYSTEM_PROMPT}] + self.conversation_history.prompt_messages()
+        )
+
+    @staticmethod
+    def _record_tokens(provider: str, prompt_tokens: int, completion_tokens: int):
+        """Счётчики токенов по провайдерам"""
+        metrics.increment('llm_tokens', prompt_tokens, provider=provider, kind='prompt')
+        metrics.increment('llm_tokens', completion_tokens, provider=provider, kind='completion')
+
+    def provider_stats(self) -> Dict[str, Dict]:
+        """Задержки и состояние AI провайдеров"""
+        return self.router.stats()
+
+    def _build_openai_messages(self, context: Optional[Dict] = None) -> List[Dict]:
+        """Сборка сообщений для OpenAI GPT"""
+        messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+
+        messages.extend(self.conversation_history.prompt_messages())
+
+        if context:
+            context_text = f"\nТекущее время: {context.get('current_time', 'неизвестно')}"
+            if context.get('upcoming_events'):
+                context_text += "\nПредстоящие события:\n"
+                for event in context['upcoming_events'][:3]:
+                    context_text += f"- {event}\n"
+            messages.append({'role': 'system', 'content': context_text})
+
+        return messages
+
+    def _openai_client(self, deadline: Deadline):
+        """Клиент OpenAI с таймаутом по остатку срока; повторами управляет retry_call"""
+        import openai
+
+        return self.client.with_options(
+            timeout=openai.Timeout(deadline.timeout(AI_READ_TIMEOUT), connect=deadline.timeout(AI_CONNECT_TIMEOUT)),
+            max_retries=0
+        )
+
+    @staticmethod
+    def _is_openai_retryable(error: Exception) -> bool:
+        """Временная ли ошибка OpenAI"""
+        import openai
+
+        return isinstance(error, (
+            openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError
+        ))
+
+    def _get_openai_response(self, context: Optional[Dict], deadline: Deadline) -> str:
+        """Получение ответа от OpenAI GPT"""
+        messages = self._build_openai_messages(context)
+
+        def request():
+            response = self._openai_client(deadline).chat.completions.create(
                 model=OPENAI_MODEL,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=500
             )
+            return response
 
-            ai_response = response.choices[0].message.content
+        with metrics.span('llm', provider='openai', turn=deadline.turn) as span:
+            response = retry_call(request, deadline, self._is_openai_retryable)
+            if response.usage:
+                span.set(prompt_tokens=response.usage.prompt_tokens,
+                         completion_tokens=response.usage.completion_tokens)
+                self._record_tokens('openai', response.usage.prompt_tokens, response.usage.completion_tokens)
 
-            self.add_to_history('assistant', ai_response)
+        return response.choices[0].message.content
 
-            return ai_response
+    def _stream_openai_response(self, context: Optional[Dict], deadline: Deadline,
+                                parts: List[str]) -> Iterator[str]:
+        """Потоковое получение ответа от OpenAI GPT; полученные фрагменты копятся в parts"""
 
-        except Exception as e:
-            print(f"❌ OpenAI API error: {e}")
-            return self._get_fallback_response(user_input)
+        def deltas(stream):
+            try:
+                for chunk in stream:
+                    # Таймаут клиента ограничивает только паузу между кусками: медленно текущий
+                    # поток обрывается по сроку хода
+                    if deadline.expired:
+                        raise DeadlineExceeded(f"бюджет {deadline.budget:.1f} с исчерпан во время ответа")
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                # Соединение закрывается сразу, а не когда сборщик мусора доберётся до потока
+                close = getattr(stream, 'close', None)
+                if close:
+                    close()
+
+        messages = self._build_openai_messages(context)
+        stream = retry_call(
+            lambda: self._openai_client(deadline).chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            ),
+            deadline,
+            self._is_openai_retryable
+        )
+
+        yield from iter_sentences(deltas(stream))
 
-    def _get_yandex_response(self, user_input: str, context: Optional[Dict] = None) -> str:
+    def _get_yandex_response(self, context: Optional[Dict], deadline: Deadline) -> str:
         """Получение ответа от YandexGPT"""
-        try:
-            prompt = f"{SYSTEM_PROMPT}\n\n"
+        prompt = f"{SYSTEM_PROMPT}\n\n"
 
-            if context:
-                prompt += f"Контекст: {json.dumps(context, ensure_ascii=False)}\n\n"
+        if context:
+            prompt += f"Контекст: {json.dumps(context, ensure_ascii=False)}\n\n"
 
-            for msg in self.conversation_history[-6:]:
-                prompt += f"{msg['role']}: {msg['content']}\n"
+        for msg in self.conversation_history.prompt_messages():
+            prompt += f"{msg['role']}: {msg['content']}\n"
 
-            prompt += f"user: {user_input}\n"
-            prompt += "assistant: "
+        # Текущий вопрос уже последний в истории
+        prompt += "assistant: "
 
-            response = requests.post(
-                "https://llm.api.cloud.yandex.net/llm/v1/completion",
-                headers={
-                    "Authorization": f"Api-Key {YANDEX_API_KEY}",
-                    "Content-Type": "application/json"
-                },
+        def request():
+            response = self.http.post(
+                YANDEX_COMPLETION_URL,
+                headers=self._yandex_headers(),
                 json={
                     "model": YANDEX_MODEL,
                     "instruction_text": prompt,
                     "max_tokens": 500,
                     "temperature": 0.7
-                }
+                },
+                timeout=(deadline.timeout(AI_CONNECT_TIMEOUT), deadline.timeout(AI_READ_TIMEOUT))
             )
 
-            if response.status_code == 200:
-                ai_response = response.json()['result']['alternatives'][0]['text']
-                self.add_to_history('assistant', ai_response)
-                return ai_response
-            else:
-                print(f"❌ YandexGPT API error: {response.status_code}")
-                return self._get_fallback_response(user_input)
+            if response.status_code != 200:
+                raise ProviderError(f"YandexGPT API error: {response.status_code}", response.status_code)
 
-        except Exception as e:
-            print(f"❌ YandexGPT API error: {e}")
-            return self._get_fallback_response(user_input)
+            return response.json()['result']['alternatives'][0]['text']
+
+        with metrics.span('llm', provider='yandex', turn=deadline.turn) as span:
+            text = retry_call(request, deadline, self._is_yandex_retryable)
+            prompt_tokens = self.conversation_history.count_tokens(prompt)
+            completion_tokens = self.conversation_history.count_tokens(text)
+            span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            self._record_tokens('yandex', prompt_tokens, completion_tokens)
+
+        return text
+
+    @staticmethod
+    def _is_yandex_retryable(error: Exception) -> bool:
+        """Временная ли ошибка YandexGPT"""
+        import requests
+
+        if isinstance(error, ProviderError):
+            return error.status in RETRYABLE_STATUSES
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
 
     def _get_fallback_response(self, user_input: str) -> str:
         """Запасной вариант ответа без API"""
         user_input_lower = user_input.lower()
 
         # Простые ответы на частые вопросы
-        if 'привет' in user_input_lower:
-            return 'Здравствуйте! Чем могу помочь?'
-        elif 'как дела' in user_input_lower:
-            return 'У меня всё отлично, спасибо!'
-        elif 'спасибо' in user_input_lower:
-            return 'Пожалуйста! Рад помочь.'
-        elif 'пока' in user_input_lower:
-            return 'До свидания!'
-        elif 'как тебя зовут' in user_input_lower:
-            return 'Меня зовут Алиса, я ваш голосовой ассистент.'
-        elif 'что ты умеешь' in user_input_lower:
-            return 'Я умею показывать события календаря, сообщать время и дату, открывать сайты и отвечать на вопросы.'
-        else:
-            return "Извините, я сейчас работаю в автономном режиме. Пожалуйста, настройте API ключи для полного функционала."
+        for keyword, response in FALLBACK_RESPONSES:
+            if keyword in user_input_lower:
+                return response
 
+        return OFFLINE_RESPONSE
 
-ai_engine = AIEngine()
\ No newline at end of file
+ai_engine = LazySingleton('ai_engine', AIEngine)
\ No newline at end of file
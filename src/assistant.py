@@ -1,5 +1,4 @@
-import threading
-import time
+import asyncio
 from datetime import datetime
 from queue import Queue
 from typing import Optional
@@ -10,23 +9,32 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from src.voice import voice
-    from src.ai_engine import ai_engine
+    from src.ai_engine import ai_engine, FALLBACK_RESPONSES, OFFLINE_RESPONSE
     from src.calendar_integration import calendar
-    from src.commands import CommandHandler
-    from src.config import ASSISTANT_NAME
+    from src.commands import CommandHandler, EXIT_RESPONSE
+    from src.pipeline import TurnPipeline
+    from src.metrics import metrics
+    from src.config import ASSISTANT_NAME, AI_STREAMING, AUDIO_CACHE_PREWARM, AI_WARMUP
 except ImportError:
     try:
         from voice import voice
-        from ai_engine import ai_engine
+        from ai_engine import ai_engine, FALLBACK_RESPONSES, OFFLINE_RESPONSE
         from calendar_integration import calendar
-        from commands import CommandHandler
-        from config import ASSISTANT_NAME
+        from commands import CommandHandler, EXIT_RESPONSE
+        from pipeline import TurnPipeline
+        from metrics import metrics
+        from config import ASSISTANT_NAME, AI_STREAMING, AUDIO_CACHE_PREWARM, AI_WARMUP
     except ImportError:
         ASSISTANT_NAME = 'Алиса'
+        AI_STREAMING = True
+        AUDIO_CACHE_PREWARM = False
+        AI_WARMUP = True
         from voice import voice
-        from ai_engine import ai_engine
+        from ai_engine import ai_engine, FALLBACK_RESPONSES, OFFLINE_RESPONSE
         from calendar_integration import calendar
-        from commands import CommandHandler
+        from commands import CommandHandler, EXIT_RESPONSE
+        from pipeline import TurnPipeline
+        from metrics import metrics
 
 
 class AIAssistant:
@@ -45,69 +53,96 @@ class AIAssistant:
 
         self.command_queue = Queue()
 
+        self._loop = None
+        self._stop_event = None
+        self._pipeline = None
+        self._warm_up = None
+
         print(f"\n{'=' * 50}")
         print(f"🤖 {self.name} AI-ассистент запущен!")
         print(f"{'=' * 50}\n")
 
     def start(self):
         """Запуск ассистента"""
+        asyncio.run(self.start_async())
+
+    async def start_async(self):
+        """Асинхронный запуск ассистента до остановки"""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._stop_event = asyncio.Event()
         self.is_running = True
 
-        self.greet()
-
-        while self.is_running:
-            try:
-                if self.listen_mode == 'once':
-                    self._listen_once_mode()
-                else:
-                    self._listen_continuous_mode()
-
-            except KeyboardInterrupt:
-                self.stop()
-                break
-            except Exception as e:
-                print(f"❌ Ошибка: {e}")
-                time.sleep(1)
-
-    def _listen_once_mode(self):
-        """Режим однократного прослушивания"""
-        command = self.voice.listen_once(timeout=5)
-
-        if command:
-            result = self.command_handler.process_command(command)
-            if result.get('speak', True):
-                self.voice.speak(result['response'])
-            else:
-                print(f"\n🤖 {self.name}: {result['response']}\n")
-
-            if result.get('action') == 'exit':
-                self.stop()
+        if AI_WARMUP:
+            # Соединение с AI открывается, пока звучит приветствие
+            self._warm_up = loop.run_in_executor(None, lambda: self.ai.warm_up())
+            self._warm_up.add_done_callback(self._on_warm_up_done)
+
+        await loop.run_in_executor(None, self.greet)
+
+        # Шум замеряется один раз после приветствия, дальше порог подстраивается между фразами
+        await loop.run_in_executor(None, self.voice.calibrate)
+
+        if AUDIO_CACHE_PREWARM:
+            self.voice.prewarm_cache(self.known_phrases())
+
+        if self.listen_mode == 'once':
+            await self._listen_once_mode()
         else:
-            time.sleep(1)
+            await self._listen_continuous_mode()
 
-    def _listen_continuous_mode(self):
-        """Режим непрерывного прослушивания"""
+    @staticmethod
+    def _on_warm_up_done(future: asyncio.Future):
+        """Прогрев не обязателен для работы, но его ошибка попадает в лог"""
+        if not future.cancelled() and future.exception():
+            print(f"⚠️ Не удалось прогреть соединение с AI: {future.exception()}")
 
-        def on_command(text):
-            result = self.command_handler.process_command(text)
+    async def _listen_once_mode(self):
+        """Режим однократного прослушивания: стадии хода работают конвейером"""
+        self._pipeline = TurnPipeline(self.voice, self.command_handler, on_exit=self.stop)
+        pipeline_task = asyncio.create_task(self._pipeline.run())
+
+        await self._stop_event.wait()
+
+        self._pipeline.stop()
+        await pipeline_task
 
-            if result.get('speak', True):
-                self.voice.speak(result['response'])
-            else:
-                print(f"\n🤖 {self.name}: {result['response']}\n")
+    async def _listen_continuous_mode(self):
+        """Режим непрерывного прослушивания"""
 
-            if result.get('action') == 'exit':
-                self.stop()
+        def on_command(text):
+            result = self.command_handler.process_command(text, stream=AI_STREAMING)
+            self._respond(result)
 
         self.voice.start_listening(on_command)
 
-        while self.is_running and self.listen_mode == 'continuous':
-            time.sleep(0.1)
+        await self._stop_event.wait()
+
+    def _respond(self, result: dict, wait: bool = False):
+        """Озвучивание или вывод результата команды"""
+        done = None
+
+        if result.get('stream') is not None:
+            # Первое предложение звучит, пока остальные ещё генерируются
+            interruptions = self.voice.interruptions
+            for sentence in result['stream']:
+                if self.voice.interruptions != interruptions:
+                    # Ответ перебили: остаток дочитывается для истории, но не озвучивается
+                    continue
+                done = self.voice.speak_async(sentence)
+        elif result.get('speak', True):
+            done = self.voice.speak_async(result['response'])
+        else:
+            print(f"\n🤖 {self.name}: {result['response']}\n")
 
-    def greet(self):
-        """Приветствие"""
-        hour = datetime.now().hour
+        if done is not None and (wait or result.get('action') == 'exit'):
+            done.wait()
 
+        if result.get('action') == 'exit':
+            self.stop()
+
+    def _welcome_text(self, hour: int) -> str:
+        """Текст приветствия для заданного часа"""
         if hour < 6:
             greeting = "Доброй ночи"
         elif hour < 12:
@@ -117,7 +152,19 @@ class AIAssistant:
         else:
             greeting = "Добрый вечер"
 
-        welcome = f"{greeting}! Я {self.name}, ваш голосовой ассистент. Чем могу помочь?"
+        return f"{greeting}! Я {self.name}, ваш голосовой ассистент. Чем могу помочь?"
+
+    def known_phrases(self) -> list:
+        """Фиксированные фразы для прогрева кэша озвучки"""
+        phrases = [self._welcome_text(hour) for hour in (0, 6, 12, 18)]
+        phrases.append(EXIT_RESPONSE)
+        phrases.extend(response for _, response in FALLBACK_RESPONSES)
+        phrases.append(OFFLINE_RESPONSE)
+        return phrases
+
+    def greet(self):
+        """Приветствие"""
+        welcome = self._welcome_text(datetime.now().hour)
 
         self.voice.speak(welcome)
 
@@ -129,6 +176,14 @@ class AIAssistant:
         """Остановка ассистента"""
         self.is_running = False
         self.voice.stop_listening()
+        self.voice.stop_speaking()
+        if self.ai.is_initialized:
+            self.ai.flush_log()
+        metrics.export()
+
+        # Остановка может прийти из любого потока: из GUI, из конвейера или по Ctrl+C
+        if self._loop and self._stop_event and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
         print("\n👋 Ассистент остановлен")
 
     def set_listen_mode(self, mode: str):
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class AudioCache:
+    """Дисковый кэш синтезированной речи с вытеснением LRU"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+        self._index = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(engine: str, voice: str, rate, language: str, text: str) -> str:
+        """Ключ записи по параметрам синтеза и тексту"""
+        raw = json.dumps([engine, voice, rate, language, text.strip()], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _load_index(self):
+        """Восстановление индекса по файлам, от давно использованных к свежим"""
+        entries = []
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            if path.name.endswith('.tmp'):
+                # Недописанный рендер прошлого запуска
+                path.unlink()
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(entries, key=lambda entry: entry[0]):
+            self._index[path.stem] = (path, size)
+            self._size += size
+
+        self._evict()
+
+    def get(self, key: str) -> Optional[Path]:
+        """Путь к аудио в кэше или None"""
+        with self._lock:
+            entry = self._index.get(key)
+            if not entry:
+                return None
+
+            path, _ = entry
+            if not path.exists():
+                self._drop(key)
+                return None
+
+            self._index.move_to_end(key)
+
+        try:
+            # mtime служит отметкой последнего использования между запусками
+            os.utime(path)
+        except OSError:
+            pass
+
+        return path
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Содержимое аудио из кэша или None"""
+        path = self.get(key)
+        if not path:
+            return None
+
+        try:
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def reserve_path(self, key: str, suffix: str) -> Path:
+        """Уникальный временный путь для рендера файла перед добавлением в кэш"""
+        # Одну фразу могут рендерить два потока сразу: у каждого свой файл, os.replace атомарно выбирает итог
+        return self.directory / f"{key}{suffix}.{uuid.uuid4().hex}.tmp"
+
+    def put(self, key: str, data: bytes, suffix: str) -> Path:
+        """Сохранение аудио в кэш"""
+        tmp_path = self.reserve_path(key, suffix)
+        tmp_path.write_bytes(data)
+        return self.commit(key, tmp_path, suffix)
+
+    def commit(self, key: str, tmp_path: Path, suffix: str) -> Path:
+        """Атомарное добавление отрендеренного файла в кэш; файл может лежать и вне каталога кэша"""
+        path = self.directory / f"{key}{suffix}"
+        if Path(tmp_path).parent != self.directory:
+            # Между файловыми системами переименование не атомарно: файл сначала переносится в каталог кэша
+            staged = self.reserve_path(key, suffix)
+            shutil.move(str(tmp_path), str(staged))
+            tmp_path = staged
+        os.replace(tmp_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            if key in self._index:
+                self._size -= self._index[key][1]
+            self._index[key] = (path, size)
+            self._index.move_to_end(key)
+            self._size += size
+            self._evict()
+
+        return path
+
+    def _drop(self, key: str):
+        """Удаление записи из индекса"""
+        _, size = self._index.pop(key)
+        self._size -= size
+
+    def _evict(self):
+        """Вытеснение давно использованных записей сверх лимита"""
+        while self._size > self.max_bytes and len(self._index) > 1:
+            key, (path, size) = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        with self._lock:
+            return {'entries': len(self._index), 'bytes': self._size, 'max_bytes': self.max_bytes}
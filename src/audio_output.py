@@ -0,0 +1,259 @@
+import queue
+import threading
+import time
+import wave
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple, Union
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.metrics import metrics
+except ImportError:
+    from metrics import metrics
+
+try:
+    from src.config import AUDIO_OUTPUT_BUFFER_MS, AUDIO_OUTPUT_CHUNK_MS
+except ImportError:
+    try:
+        from config import AUDIO_OUTPUT_BUFFER_MS, AUDIO_OUTPUT_CHUNK_MS
+    except ImportError:
+        AUDIO_OUTPUT_BUFFER_MS = 1000
+        AUDIO_OUTPUT_CHUNK_MS = 40
+
+# gTTS отдаёт MP3 24 кГц моно: в этом формате декодер выдаёт PCM, и поток не переоткрывается
+MP3_SAMPLE_RATE = 24000
+MP3_CHANNELS = 1
+
+# (частота, каналы, байт на отсчёт)
+AudioFormat = Tuple[int, int, int]
+
+# Как часто ожидающий места в буфере проверяет, не отменено ли воспроизведение
+POLL_INTERVAL = 0.1
+
+
+class Playback:
+    """Одна фраза в потоке вывода; завершение сообщается событием"""
+
+    def __init__(self, audio_format: AudioFormat):
+        self.format = audio_format
+        self.done = threading.Event()
+        self.cancelled = False
+        self.created_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+
+    def cancel(self):
+        """Отмена: остаток фразы не играет, ожидающие сразу освобождаются"""
+        self.cancelled = True
+        self.done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание конца фразы"""
+        return self.done.wait(timeout)
+
+
+class AudioOutput:
+    """Один постоянно открытый поток вывода PyAudio, который играет PCM из ограниченной очереди"""
+
+    def __init__(self, buffer_ms: int = AUDIO_OUTPUT_BUFFER_MS, chunk_ms: int = AUDIO_OUTPUT_CHUNK_MS,
+                 volume: float = 1.0):
+        import pyaudio
+
+        self.chunk_ms = chunk_ms
+        self.volume = volume
+        self.underruns = 0
+
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = None
+        self._stream_format: Optional[AudioFormat] = None
+
+        self._queue = queue.Queue(maxsize=max(1, buffer_ms // chunk_ms))
+        self._lock = threading.Lock()
+        self._active = set()
+        self._running = True
+
+        self._thread = threading.Thread(target=self._run, name='audio-output', daemon=True)
+        self._thread.start()
+
+    @property
+    def mp3_supported(self) -> bool:
+        """Установлен ли miniaudio для потокового декодирования MP3"""
+        try:
+            import miniaudio  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def play_pcm(self, chunks: Iterable[bytes], audio_format: AudioFormat) -> Playback:
+        """Воспроизведение PCM по мере поступления кусков; возвращается, когда всё в очереди"""
+        playback = Playback(audio_format)
+        with self._lock:
+            self._active.add(playback)
+
+        frame_bytes = audio_format[1] * audio_format[2]
+        chunk_bytes = audio_format[0] * self.chunk_ms // 1000 * frame_bytes
+        pending = bytearray()
+
+        for data in chunks:
+            pending += data
+            while len(pending) >= chunk_bytes:
+                if not self._put(playback, bytes(pending[:chunk_bytes])):
+                    return playback
+                del pending[:chunk_bytes]
+
+        tail = len(pending) - len(pending) % frame_bytes
+        if tail and not self._put(playback, bytes(pending[:tail])):
+            return playback
+        # Пустой кусок отмечает конец фразы
+        self._put(playback, None)
+        return playback
+
+    def play_mp3(self, chunks: Iterable[bytes]) -> Playback:
+        """Воспроизведение MP3, который декодируется по мере поступления байтов"""
+        frames = MP3_SAMPLE_RATE * self.chunk_ms // 1000
+        return self.play_pcm(decode_mp3(chunks, frames), (MP3_SAMPLE_RATE, MP3_CHANNELS, 2))
+
+    def play_wav(self, path: Union[str, Path]) -> Playback:
+        """Воспроизведение WAV-файла"""
+        with wave.open(str(path), 'rb') as wav:
+            audio_format = (wav.getframerate(), wav.getnchannels(), wav.getsampwidth())
+            frames = wav.getframerate() * self.chunk_ms // 1000
+            return self.play_pcm(iter(lambda: wav.readframes(frames), b''), audio_format)
+
+    def stop(self):
+        """Остановка: текущая и ожидающие фразы отменяются, буфер очищается"""
+        with self._lock:
+            active, self._active = self._active, set()
+        for playback in active:
+            playback.cancel()
+
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def close(self):
+        """Закрытие потока и PyAudio"""
+        self.stop()
+        self._running = False
+        self._thread.join(1.0)
+        if self._stream:
+            self._stream.close()
+        self._pyaudio.terminate()
+
+    def _put(self, playback: Playback, chunk: Optional[bytes]) -> bool:
+        """Кусок в очередь; при полном буфере ждёт места, пока фраза не отменена"""
+        while not playback.cancelled:
+            try:
+                self._queue.put((playback, chunk), timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        """Поток вывода: пишет куски в устройство и отмечает концы фраз"""
+        current: Optional[Playback] = None
+        starved = False
+
+        while self._running:
+            try:
+                playback, chunk = self._queue.get(timeout=self.chunk_ms / 1000 if current else POLL_INTERVAL)
+            except queue.Empty:
+                if current is not None and not current.done.is_set() and not starved:
+                    # Фраза не закончена, а звука нет дольше длины куска: устройство осталось без данных
+                    starved = True
+                    self.underruns += 1
+                    metrics.increment('audio_underrun')
+                continue
+
+            starved = False
+            if playback.cancelled:
+                current = None
+                continue
+
+            if chunk is None:
+                with self._lock:
+                    self._active.discard(playback)
+                playback.done.set()
+                current = None
+                continue
+
+            current = playback
+            try:
+                stream = self._open(playback.format)
+                if playback.started_at is None:
+                    playback.started_at = time.perf_counter()
+                    metrics.observe('audio_start', playback.started_at - playback.created_at)
+                stream.write(scale(chunk, playback.format[2], self.volume))
+            except Exception as e:
+                print(f"❌ Ошибка вывода звука: {e}")
+                playback.cancel()
+                current = None
+
+    def _open(self, audio_format: AudioFormat):
+        """Поток вывода в нужном формате; переоткрывается, только если формат сменился"""
+        if self._stream is not None and self._stream_format == audio_format:
+            return self._stream
+
+        if self._stream is not None:
+            self._stream.close()
+
+        rate, channels, width = audio_format
+        self._stream = self._pyaudio.open(
+            format=self._pyaudio.get_format_from_width(width), channels=channels, rate=rate,
+            output=True, frames_per_buffer=rate * self.chunk_ms // 1000
+        )
+        self._stream_format = audio_format
+        return self._stream
+
+
+def scale(data: bytes, sample_width: int, volume: float) -> bytes:
+    """Громкость 16-битного PCM; другие форматы играются как есть"""
+    if volume >= 1.0 or sample_width != 2:
+        return data
+    samples = array('h', data)
+    return array('h', (int(sample * volume) for sample in samples)).tobytes()
+
+
+def decode_mp3(chunks: Iterable[bytes], frames_to_read: int) -> Iterator[bytes]:
+    """Потоковое декодирование MP3 в 16-битный PCM: первые кадры готовы до прихода всего файла"""
+    import miniaudio
+
+    class ChunkSource(miniaudio.StreamableSource):
+        """Источник для декодера, читающий байты по мере их поступления"""
+
+        def __init__(self):
+            self.chunks = iter(chunks)
+            self.buffer = bytearray()
+
+        def read(self, num_bytes: int) -> bytes:
+            while len(self.buffer) < num_bytes:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.buffer += chunk
+            data = bytes(self.buffer[:num_bytes])
+            del self.buffer[:num_bytes]
+            return data
+
+    stream = miniaudio.stream_any(
+        ChunkSource(), source_format=miniaudio.FileFormat.MP3,
+        output_format=miniaudio.SampleFormat.SIGNED16, nchannels=MP3_CHANNELS,
+        sample_rate=MP3_SAMPLE_RATE, frames_to_read=frames_to_read
+    )
+    for samples in stream:
+        yield samples.tobytes()
+
+
+def make_output(volume: float = 1.0) -> Optional[AudioOutput]:
+    """Поток вывода или None, если PyAudio или устройство недоступны"""
+    try:
+        return AudioOutput(volume=volume)
+    except Exception as e:
+        print(f"⚠️ Постоянный поток вывода недоступен ({e}), звук через pygame")
+        return None
@@ -1,14 +1,41 @@
 import datetime
+import json
 import pickle
 import os
+import sys
+import threading
+import time
 from typing import List, Dict, Optional
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from zoneinfo import ZoneInfo
 
-from config import GOOGLE_CALENDAR_SCOPES, GOOGLE_CALENDAR_ID, TOKEN_PATH, GOOGLE_CREDENTIALS_FILE
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.utils import LazySingleton
+    from src.deadline import Deadline, DeadlineExceeded, retry_call
+except ImportError:
+    from utils import LazySingleton
+    from deadline import Deadline, DeadlineExceeded, retry_call
+
+try:
+    from src.config import (
+        GOOGLE_CALENDAR_SCOPES, GOOGLE_CALENDAR_ID, TOKEN_PATH, GOOGLE_CREDENTIALS_FILE,
+        TIMEZONE, CALENDAR_STORE_PATH, CALENDAR_REFRESH_INTERVAL, CALENDAR_SYNC_DAYS_BACK,
+        CALENDAR_SYNC_DAYS_AHEAD, CALENDAR_DISCOVERY_PATH, CALENDAR_HTTP_TIMEOUT
+    )
+except ImportError:
+    from config import (
+        GOOGLE_CALENDAR_SCOPES, GOOGLE_CALENDAR_ID, TOKEN_PATH, GOOGLE_CREDENTIALS_FILE,
+        TIMEZONE, CALENDAR_STORE_PATH, CALENDAR_REFRESH_INTERVAL, CALENDAR_SYNC_DAYS_BACK,
+        CALENDAR_SYNC_DAYS_AHEAD, CALENDAR_DISCOVERY_PATH, CALENDAR_HTTP_TIMEOUT
+    )
+
+
+# Разобранный документ обнаружения Calendar API, общий для повторных аутентификаций
+_discovery_document = None
+
+# Статусы Calendar API, после которых имеет смысл повторить запрос
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
 
 
 class GoogleCalendar:
@@ -16,10 +43,29 @@ class GoogleCalendar:
 
     def __init__(self):
         self.service = None
+
+        # Локальная копия календаря: id события -> событие в формате API
+        self._events = {}
+        self._sync_token = None
+        self._synced_at = 0.0
+        # Граница окна последней полной синхронизации (timeMax), секунды эпохи
+        self._window_end = 0.0
+        self._store_lock = threading.Lock()
+        self._service_lock = threading.Lock()
+        self._refresh_thread = None
+
+        self._load_store()
         self.authenticate()
 
+        if self.service:
+            self._refresh_async()
+
     def authenticate(self):
         """Аутентификация в Google Calendar API"""
+        # Клиентские библиотеки Google загружаются только при первом обращении к календарю
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         creds = None
 
         if os.path.exists(TOKEN_PATH):
@@ -58,48 +104,89 @@ class GoogleCalendar:
                 pickle.dump(creds, token)
 
         try:
-            self.service = build('calendar', 'v3', credentials=creds)
+            self.service = self._build_service(creds)
             print("✅ Google Calendar API connected")
         except Exception as e:
             print(f"❌ Google Calendar API error: {e}")
 
-    def get_upcoming_events(self, max_results: int = 10) -> List[Dict]:
-        """Получение предстоящих событий"""
-        if not self.service:
-            return []
+    def _build_service(self, creds):
+        """Создание клиента Calendar API без запроса документа обнаружения"""
+        from googleapiclient.discovery import build, build_from_document
+        from google_auth_httplib2 import AuthorizedHttp
+        import httplib2
+
+        global _discovery_document
+
+        # Без таймаута один зависший сокет блокирует синхронизацию навсегда
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT))
+
+        if _discovery_document is None:
+            _discovery_document = self._load_discovery_document()
+
+        if _discovery_document is not None:
+            return build_from_document(_discovery_document, http=http)
+
+        # Ни встроенной, ни локальной копии: один раз скачиваем и сохраняем
+        service = build('calendar', 'v3', http=http, static_discovery=False, cache_discovery=False)
+        _discovery_document = service._rootDesc
 
         try:
-            now = datetime.datetime.utcnow().isoformat() + 'Z'
-
-            events_result = self.service.events().list(
-                calendarId=GOOGLE_CALENDAR_ID,
-                timeMin=now,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
-
-            formatted_events = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                formatted_events.append({
-                    'summary': event['summary'],
-                    'start': start,
-                    'id': event['id'],
-                    'description': event.get('description', '')
-                })
-
-            return formatted_events
+            tmp_path = f"{CALENDAR_DISCOVERY_PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(_discovery_document, f)
+            os.replace(tmp_path, CALENDAR_DISCOVERY_PATH)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить документ обнаружения: {e}")
 
-        except HttpError as error:
-            print(f"❌ An error occurred: {error}")
+        return service
+
+    def _load_discovery_document(self) -> Optional[Dict]:
+        """Документ обнаружения из google-api-python-client или из DATA_DIR"""
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            document = get_static_doc('calendar', 'v3')
+            if document:
+                return json.loads(document)
+        except ImportError:
+            pass
+
+        if os.path.exists(CALENDAR_DISCOVERY_PATH):
+            try:
+                with open(CALENDAR_DISCOVERY_PATH, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Не удалось прочитать документ обнаружения: {e}")
+
+        return None
+
+    def get_upcoming_events(self, max_results: int = 10, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Получение предстоящих событий"""
+        if not self._ensure_synced(deadline):
             return []
 
+        now = datetime.datetime.now(datetime.timezone.utc)
+        events = [
+            event for event in self._sorted_events()
+            if self._event_time(event, 'end') > now
+        ][:max_results]
+
+        formatted_events = []
+        for event in events:
+            start = event['start'].get('dateTime', event['start'].get('date'))
+            formatted_events.append({
+                'summary': event['summary'],
+                'start': start,
+                'id': event['id'],
+                'description': event.get('description', '')
+            })
+
+        return formatted_events
+
     def create_event(self, summary: str, start_time: datetime.datetime,
                      end_time: datetime.datetime = None, description: str = "") -> Optional[Dict]:
         """Создание нового события"""
+        from googleapiclient.errors import HttpError
+
         if not self.service:
             return None
 
@@ -120,10 +207,15 @@ class GoogleCalendar:
                 },
             }
 
-            event = self.service.events().insert(
-                calendarId=GOOGLE_CALENDAR_ID,
-                body=event
-            ).execute()
+            with self._service_lock:
+                event = self.service.events().insert(
+                    calendarId=GOOGLE_CALENDAR_ID,
+                    body=event
+                ).execute()
+
+            with self._store_lock:
+                self._events[event['id']] = event
+            self._save_store()
 
             return {
                 'id': event['id'],
@@ -137,41 +229,229 @@ class GoogleCalendar:
 
     def delete_event(self, event_id: str) -> bool:
         """Удаление события"""
+        from googleapiclient.errors import HttpError
+
         if not self.service:
             return False
 
         try:
-            self.service.events().delete(
-                calendarId=GOOGLE_CALENDAR_ID,
-                eventId=event_id
-            ).execute()
+            with self._service_lock:
+                self.service.events().delete(
+                    calendarId=GOOGLE_CALENDAR_ID,
+                    eventId=event_id
+                ).execute()
+
+            with self._store_lock:
+                self._events.pop(event_id, None)
+            self._save_store()
             return True
         except HttpError as error:
             print(f"❌ An error occurred: {error}")
             return False
 
-    def get_today_events(self) -> List[Dict]:
+    def get_today_events(self, deadline: Optional[Deadline] = None) -> List[Dict]:
         """Получение событий на сегодня"""
-        if not self.service:
+        if not self._ensure_synced(deadline):
             return []
 
-        try:
-            now = datetime.datetime.utcnow()
-            end_of_day = now.replace(hour=23, minute=59, second=59)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        end_of_day = now.replace(hour=23, minute=59, second=59)
+
+        return [
+            event for event in self._sorted_events()
+            if self._event_time(event, 'end') > now
+            and self._event_time(event, 'start') < end_of_day
+        ]
+
+    def _sorted_events(self) -> List[Dict]:
+        """События из локальной копии в порядке начала"""
+        with self._store_lock:
+            events = list(self._events.values())
+        return sorted(events, key=lambda event: self._event_time(event, 'start'))
+
+    def _event_time(self, event: Dict, field: str) -> datetime.datetime:
+        """Начало или конец события как datetime с часовым поясом"""
+        value = event.get(field, {})
+
+        if value.get('dateTime'):
+            dt = datetime.datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=ZoneInfo(value.get('timeZone', TIMEZONE)))
+            return dt
 
-            events_result = self.service.events().list(
-                calendarId=GOOGLE_CALENDAR_ID,
-                timeMin=now.isoformat() + 'Z',
-                timeMax=end_of_day.isoformat() + 'Z',
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+        if value.get('date'):
+            # События на весь день считаются в часовом поясе календаря
+            day = datetime.date.fromisoformat(value['date'])
+            return datetime.datetime.combine(day, datetime.time.min, tzinfo=ZoneInfo(TIMEZONE))
+
+        return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+    def _ensure_synced(self, deadline: Optional[Deadline] = None) -> bool:
+        """Проверка свежести локальной копии: устаревшая обновляется в фоне"""
+        if not self.service:
+            return False
 
-            return events_result.get('items', [])
+        if not self._synced_at:
+            # Первый запуск без сохранённой копии: ждём полную синхронизацию, но не дольше срока
+            refresh = self._refresh_async()
+            refresh.join(deadline.remaining() if deadline else None)
+            if refresh.is_alive():
+                raise DeadlineExceeded("календарь не успел синхронизироваться")
+        elif time.time() - self._synced_at > CALENDAR_REFRESH_INTERVAL:
+            self._refresh_async()
+
+        return True
+
+    def _refresh_async(self) -> threading.Thread:
+        """Фоновое обновление, не более одного одновременно"""
+        with self._store_lock:
+            if not (self._refresh_thread and self._refresh_thread.is_alive()):
+                self._refresh_thread = threading.Thread(target=self.sync, daemon=True)
+                self._refresh_thread.start()
+            return self._refresh_thread
+
+    def sync(self) -> bool:
+        """Синхронизация локальной копии: инкрементальная по syncToken, иначе полная"""
+        from googleapiclient.errors import HttpError
 
+        if not self.service:
+            return False
+
+        with self._store_lock:
+            sync_token = self._sync_token
+            window_end = self._window_end
+
+        if sync_token and window_end - time.time() < CALENDAR_SYNC_DAYS_AHEAD * 86400 / 2:
+            # Инкрементальная синхронизация не приносит события, которые просто вошли в окно по времени
+            print("🔄 Окно синхронизации календаря сдвинулось, полная синхронизация")
+            sync_token = None
+        if not sync_token:
+            window_end = time.time() + CALENDAR_SYNC_DAYS_AHEAD * 86400
+
+        try:
+            items, next_token = self._fetch_changes(sync_token, window_end)
         except HttpError as error:
-            print(f"❌ An error occurred: {error}")
-            return []
+            if sync_token and error.resp.status == 410:
+                # Токен устарел: нужна полная синхронизация
+                print("🔄 Токен синхронизации календаря устарел, полная синхронизация")
+                try:
+                    window_end = time.time() + CALENDAR_SYNC_DAYS_AHEAD * 86400
+                    items, next_token = self._fetch_changes(None, window_end)
+                    sync_token = None
+                except HttpError as error:
+                    print(f"❌ An error occurred: {error}")
+                    return False
+            else:
+                print(f"❌ An error occurred: {error}")
+                return False
+        except Exception as e:
+            print(f"❌ Ошибка синхронизации календаря: {e}")
+            return False
+
+        horizon = datetime.datetime.fromtimestamp(window_end, datetime.timezone.utc)
+        with self._store_lock:
+            if not sync_token:
+                self._events = {}
+            for event in items:
+                if event.get('status') == 'cancelled' or self._event_time(event, 'start') > horizon:
+                    # Изменения за горизонтом окна копия не хранит
+                    self._events.pop(event['id'], None)
+                else:
+                    self._events[event['id']] = event
+            self._prune_past_events()
+            self._sync_token = next_token
+            self._window_end = window_end
+            self._synced_at = time.time()
+
+        self._save_store()
+        return True
+
+    def _fetch_changes(self, sync_token: Optional[str], window_end: float):
+        """Загрузка всех страниц изменений с момента sync_token; полная — в окне до window_end"""
+        params = {
+            'calendarId': GOOGLE_CALENDAR_ID,
+            'singleEvents': True,
+        }
+
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            time_min = datetime.datetime.utcnow() - datetime.timedelta(days=CALENDAR_SYNC_DAYS_BACK)
+            params['timeMin'] = time_min.isoformat() + 'Z'
+            # Без timeMax бесконечная серия развернулась бы в неограниченное число экземпляров
+            time_max = datetime.datetime.fromtimestamp(window_end, datetime.timezone.utc)
+            params['timeMax'] = time_max.isoformat()
+
+        items = []
+        page_token = None
+        deadline = Deadline(CALENDAR_HTTP_TIMEOUT * 3)
+
+        while True:
+            if page_token:
+                params['pageToken'] = page_token
+
+            with self._service_lock:
+                result = retry_call(
+                    lambda: self.service.events().list(**params).execute(), deadline, self._is_retryable
+                )
+
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+
+            if not page_token:
+                return items, result.get('nextSyncToken')
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Временная ли ошибка Calendar API"""
+        from googleapiclient.errors import HttpError
+        import httplib2
+
+        if isinstance(error, HttpError):
+            return error.resp.status in RETRYABLE_STATUSES
+        return isinstance(error, (OSError, httplib2.HttpLib2Error))
+
+    def _prune_past_events(self):
+        """Удаление давно прошедших событий из локальной копии"""
+        threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=CALENDAR_SYNC_DAYS_BACK)
+        for event_id in [
+            event_id for event_id, event in self._events.items()
+            if self._event_time(event, 'end') < threshold
+        ]:
+            del self._events[event_id]
+
+    def _load_store(self):
+        """Загрузка сохранённой копии календаря для тёплого старта"""
+        if not os.path.exists(CALENDAR_STORE_PATH):
+            return
+
+        try:
+            with open(CALENDAR_STORE_PATH, 'r', encoding='utf-8') as f:
+                store = json.load(f)
+            self._events = {event['id']: event for event in store.get('events', [])}
+            self._sync_token = store.get('sync_token')
+            self._synced_at = store.get('synced_at', 0.0)
+            self._window_end = store.get('window_end', 0.0)
+        except Exception as e:
+            print(f"⚠️ Не удалось загрузить копию календаря: {e}")
+
+    def _save_store(self):
+        """Сохранение копии календаря на диск"""
+        with self._store_lock:
+            store = {
+                'sync_token': self._sync_token,
+                'synced_at': self._synced_at,
+                'window_end': self._window_end,
+                'events': list(self._events.values())
+            }
+
+        tmp_path = f"{CALENDAR_STORE_PATH}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(store, f, ensure_ascii=False)
+            os.replace(tmp_path, CALENDAR_STORE_PATH)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить копию календаря: {e}")
 
     def format_events_text(self, events: List[Dict]) -> str:
         """Форматирование событий в текст"""
@@ -197,4 +477,4 @@ class GoogleCalendar:
         return text
 
 
-calendar = GoogleCalendar()
\ No newline at end of file
+calendar = LazySingleton('calendar', GoogleCalendar)
\ No newline at end of file
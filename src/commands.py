@@ -1,18 +1,57 @@
 import datetime
+import re
 import webbrowser
 import sys
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Optional
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from src.config import ASSISTANT_NAME
+    from src.intents import IntentRegistry, KeywordIndex
+    from src.intent_classifier import IntentClassifier
+    from src.deadline import Deadline, DeadlineExceeded
+    from src.metrics import metrics
+except ImportError:
+    from intents import IntentRegistry, KeywordIndex
+    from intent_classifier import IntentClassifier
+    from deadline import Deadline, DeadlineExceeded
+    from metrics import metrics
+
+try:
+    from src.config import (
+        ASSISTANT_NAME, INTENT_CLASSIFIER_ENABLED, INTENT_CONFIDENCE_THRESHOLD,
+        TURN_DEADLINE, CALENDAR_CONTEXT_TIMEOUT
+    )
 except ImportError:
     try:
-        from config import ASSISTANT_NAME
+        from config import (
+            ASSISTANT_NAME, INTENT_CLASSIFIER_ENABLED, INTENT_CONFIDENCE_THRESHOLD,
+            TURN_DEADLINE, CALENDAR_CONTEXT_TIMEOUT
+        )
     except ImportError:
         ASSISTANT_NAME = 'Алиса'
+        INTENT_CLASSIFIER_ENABLED = True
+        INTENT_CONFIDENCE_THRESHOLD = 0.36
+        TURN_DEADLINE = 15.0
+        CALENDAR_CONTEXT_TIMEOUT = 1.0
+
+
+EXIT_RESPONSE = 'До свидания! Буду ждать ваших указаний.'
+
+CALENDAR_TIMEOUT_RESPONSE = 'Календарь не ответил вовремя. Попробуйте спросить чуть позже.'
+
+BROWSER_SITES = {
+    'youtube': 'https://youtube.com',
+    'ютуб': 'https://youtube.com',
+    'google': 'https://google.com',
+    'github': 'https://github.com',
+    'гитхаб': 'https://github.com',
+    'gmail': 'https://mail.google.com',
+    'почта': 'https://mail.google.com',
+    'яндекс': 'https://yandex.ru',
+    'yandex': 'https://yandex.ru',
+}
 
 
 class CommandHandler:
@@ -24,41 +63,151 @@ class CommandHandler:
         self.voice = voice
         self.assistant_name = ASSISTANT_NAME
 
-    def process_command(self, text: str) -> Dict[str, Any]:
-        """Обработка команды"""
-        text = text.lower()
+        self.intents = IntentRegistry()
+        self._register_builtin_intents()
 
-        if any(word in text for word in ['события', 'календарь', 'план', 'расписание']):
-            return self._handle_calendar_command(text)
+        self.sites = KeywordIndex()
+        for key, url in BROWSER_SITES.items():
+            self.sites.add(key, url)
 
-        elif 'время' in text or 'часов' in text or 'который час' in text:
-            return self._handle_time_command()
+        self._classifier = None
+        self._classifier_failed = False
 
-        elif 'дата' in text or 'число' in text or 'какой день' in text or 'сегодня' in text:
-            return self._handle_date_command()
+    def _register_builtin_intents(self):
+        """Встроенные команды; приоритеты повторяют исторический порядок проверок"""
+        # Общие слова вроде «план», «время» и «число» встречаются в обычных вопросах к AI,
+        # поэтому они распознаются только в составе вопроса или в конце фразы
+        self.register_intent(
+            'calendar', self._handle_calendar_command,
+            keywords=['события', 'календарь', 'расписание', 'встреч', 'дела на сегодня'],
+            patterns=[
+                r'\b(?:мои|у меня(?: есть)?) планы?\b',
+                r'\bпланы? на (?:сегодня|завтра|неделю)\b',
+                r'\bчто (?:у меня )?(?:запланировано )?(?:на )?сегодня\W*$',
+            ],
+            priority=60
+        )
+        self.register_intent(
+            'time', lambda text, deadline: self._handle_time_command(),
+            keywords=['который час'],
+            patterns=[
+                r'\b(?:сколько|какое)\s+(?:сейчас\s+)?врем(?:я|ени)\W*$',
+                r'\bвремя\W*$',
+                r'\bсколько\s+(?:сейчас\s+)?на\s+часах\b',
+            ],
+            priority=50
+        )
+        self.register_intent(
+            'date', lambda text, deadline: self._handle_date_command(),
+            patterns=[
+                r'\bдат[аыу]\b',
+                r'\bкакое\s+(?:у нас\s+)?(?:сегодня\s+)?число(?:\s+сегодня)?\W*$',
+                r'\bкакой\s+(?:сегодня\s+)?день(?:\s+недели)?(?:\s+сегодня)?\W*$',
+            ],
+            priority=40
+        )
+        self.register_intent(
+            'browser', lambda text, deadline: self._handle_browser_command(text),
+            keywords=['открой'],
+            priority=30
+        )
+        self.register_intent(
+            'calibrate', lambda text, deadline: self._handle_calibrate_command(),
+            keywords=['калибр', 'откалибр'],
+            priority=27
+        )
+        self.register_intent(
+            'metrics', lambda text, deadline: self._handle_metrics_command(),
+            keywords=['статистик', 'метрик', 'задержк'],
+            priority=25
+        )
+        self.register_intent(
+            'help', lambda text, deadline: self._handle_help_command(),
+            keywords=['помощь', 'help', 'что ты умеешь', 'что умеешь', 'команды'],
+            priority=20
+        )
+        # «пока», «стоп» и «выход» — обычные слова внутри фраз, выходом считается только фраза из них целиком
+        name = re.escape(self.assistant_name.lower())
+        self.register_intent(
+            'exit', lambda text, deadline: self._handle_exit_command(),
+            keywords=['до свидания'],
+            patterns=[rf'^\W*(?:{name}\W+)?(?:(?:пока|стоп|выход)\W*)+$'],
+            priority=10
+        )
 
-        elif 'открой' in text:
-            return self._handle_browser_command(text)
+    def register_intent(self, name: str, handler: Callable[[str, Deadline], Dict[str, Any]],
+                        keywords: Iterable[str] = (), patterns: Iterable[str] = (),
+                        priority: int = 0):
+        """Регистрация команды: обработчик получает текст в нижнем регистре и срок хода"""
+        self.intents.register(name, handler, keywords=keywords, patterns=patterns, priority=priority)
 
-        elif any(word in text for word in ['помощь', 'help', 'что ты умеешь', 'команды']):
-            return self._handle_help_command()
+    @property
+    def classifier(self) -> Optional[IntentClassifier]:
+        """Локальный классификатор перефразировок, обучается при первом обращении"""
+        if self._classifier is None and INTENT_CLASSIFIER_ENABLED and not self._classifier_failed:
+            try:
+                self._classifier = IntentClassifier.from_phrases()
+            except (OSError, ValueError) as e:
+                # Повторное обучение на каждой фразе упадёт так же, поэтому ошибка запоминается
+                self._classifier_failed = True
+                print(f"⚠️ Классификатор намерений недоступен: {e}")
+                return None
+        return self._classifier
 
-        elif any(word in text for word in ['пока', 'до свидания', 'выход', 'стоп']):
-            return {
-                'action': 'exit',
-                'response': 'До свидания! Буду ждать ваших указаний.',
-                'speak': True
-            }
+    def _match_intent(self, text: str):
+        """Намерение по ключевым словам, затем по классификатору"""
+        intent = self.intents.match(text)
+        if intent or not self.classifier:
+            return intent
 
-        else:
-            return self._handle_ai_command(text)
+        # Перефразировки без ключевых слов отвечаются локально, без LLM
+        label = self.classifier.classify(text, INTENT_CONFIDENCE_THRESHOLD)
+        return self.intents.get(label) if label else None
 
-    def _handle_calendar_command(self, text: str) -> Dict[str, Any]:
+    def route(self, text: str) -> Optional[str]:
+        """Имя команды для текста или None, если ответит AI"""
+        intent = self._match_intent(text.lower())
+        return intent.name if intent else None
+
+    def process_command(self, text: str, stream: bool = False,
+                        deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Обработка команды в пределах срока хода"""
+        text = text.lower()
+        deadline = deadline or Deadline(TURN_DEADLINE)
+
+        with metrics.span('routing', turn=deadline.turn) as span:
+            intent = self._match_intent(text)
+            span.set(intent=intent.name if intent else 'ai')
+
+        if intent:
+            return intent.handler(text, deadline)
+
+        return self._handle_ai_command(text, stream, deadline)
+
+    def _handle_exit_command(self) -> Dict[str, Any]:
+        """Обработка команды выхода"""
+        return {
+            'action': 'exit',
+            'response': EXIT_RESPONSE,
+            'speak': True
+        }
+
+    def _handle_calendar_command(self, text: str, deadline: Deadline) -> Dict[str, Any]:
         """Обработка команд календаря"""
-        events = []
+        try:
+            if 'сегодня' in text:
+                events = self.calendar.get_today_events(deadline=deadline)
+            else:
+                events = self.calendar.get_upcoming_events(5, deadline=deadline)
+        except DeadlineExceeded as e:
+            print(f"⏱ {e}")
+            return {
+                'action': 'calendar',
+                'response': CALENDAR_TIMEOUT_RESPONSE,
+                'speak': True
+            }
 
         if 'сегодня' in text:
-            events = self.calendar.get_today_events()
             if events:
                 events_text = self.calendar.format_events_text(events)
                 return {
@@ -74,7 +223,6 @@ class CommandHandler:
                     'speak': True
                 }
         else:
-            events = self.calendar.get_upcoming_events(5)
             if events:
                 events_text = self.calendar.format_events_text(events)
                 return {
@@ -113,33 +261,24 @@ class CommandHandler:
 
     def _handle_browser_command(self, text: str) -> Dict[str, Any]:
         """Обработка команды открытия браузера"""
-        sites = {
-            'youtube': 'https://youtube.com',
-            'ютуб': 'https://youtube.com',
-            'google': 'https://google.com',
-            'github': 'https://github.com',
-            'гитхаб': 'https://github.com',
-            'gmail': 'https://mail.google.com',
-            'почта': 'https://mail.google.com',
-            'яндекс': 'https://yandex.ru',
-            'yandex': 'https://yandex.ru',
-        }
+        # Из нескольких упомянутых сайтов открывается первый по тексту
+        match = min(self.sites.find_all(text), default=None, key=lambda found: found[0])
 
-        for key, url in sites.items():
-            if key in text:
-                try:
-                    webbrowser.open(url)
-                    return {
-                        'action': 'browser',
-                        'response': f"Открываю {key}",
-                        'speak': True
-                    }
-                except:
-                    return {
-                        'action': 'error',
-                        'response': f"Не удалось открыть {key}",
-                        'speak': True
-                    }
+        if match:
+            _, key, url = match
+            try:
+                webbrowser.open(url)
+                return {
+                    'action': 'browser',
+                    'response': f"Открываю {key}",
+                    'speak': True
+                }
+            except:
+                return {
+                    'action': 'error',
+                    'response': f"Не удалось открыть {key}",
+                    'speak': True
+                }
 
         return {
             'action': 'unknown',
@@ -147,15 +286,20 @@ class CommandHandler:
             'speak': True
         }
 
-    def _handle_ai_command(self, text: str) -> Dict[str, Any]:
+    def _handle_ai_command(self, text: str, stream: bool = False,
+                           deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Обработка команды через AI"""
         context = {
             'current_time': datetime.datetime.now().strftime("%H:%M"),
             'upcoming_events': []
         }
 
+        deadline = deadline or Deadline(TURN_DEADLINE)
+
+        # Календарь лишь дополняет контекст: без него ответ лучше, чем опоздание
         try:
-            events = self.calendar.get_upcoming_events(3)
+            with metrics.span('calendar_context', turn=deadline.turn):
+                events = self.calendar.get_upcoming_events(3, deadline=deadline.limit(CALENDAR_CONTEXT_TIMEOUT))
             context['upcoming_events'] = [
                 f"{e['summary']} в {e['start']}"
                 for e in events
@@ -163,7 +307,16 @@ class CommandHandler:
         except:
             pass
 
-        response = self.ai.get_response(text, context)
+        if stream:
+            # Ответ озвучивается по предложениям по мере генерации
+            return {
+                'action': 'ai_response',
+                'response': '',
+                'stream': self.ai.get_response_stream(text, context, deadline=deadline),
+                'speak': True
+            }
+
+        response = self.ai.get_response(text, context, deadline=deadline)
 
         return {
             'action': 'ai_response',
@@ -171,6 +324,23 @@ class CommandHandler:
             'speak': True
         }
 
+    def _handle_calibrate_command(self) -> Dict[str, Any]:
+        """Повторная калибровка микрофона под текущий шум"""
+        self.voice.request_calibration()
+        return {
+            'action': 'calibrate',
+            'response': 'Хорошо, откалибрую микрофон перед следующей фразой. Секунду помолчите после ответа.',
+            'speak': True
+        }
+
+    def _handle_metrics_command(self) -> Dict[str, Any]:
+        """Сводка задержек по стадиям хода"""
+        return {
+            'action': 'metrics',
+            'response': metrics.format_summary(),
+            'speak': False
+        }
+
     def _handle_help_command(self) -> Dict[str, Any]:
         """Обработка команды помощи"""
         help_text = f"""
@@ -188,6 +358,10 @@ class CommandHandler:
 • "Открой YouTube" - открыть сайт
 • "Открой Google" - открыть поисковик
 
+📊 **Диагностика:**
+• "Статистика" - задержки по стадиям (p50/p95/p99)
+• "Откалибруй микрофон" - заново замерить фоновый шум
+
 💬 **Общение:**
 • Просто задавайте вопросы - я отвечу через AI
 • "Пока" - завершить работу
@@ -11,15 +11,78 @@ YANDEX_FOLDER_ID = os.getenv('YANDEX_FOLDER_ID')
 AI_PROVIDER = os.getenv('AI_PROVIDER', 'openai')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
 YANDEX_MODEL = os.getenv('YANDEX_MODEL', 'general')
+AI_STREAMING = os.getenv('AI_STREAMING', 'true').lower() == 'true'
+AI_HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', 4))
+AI_CONNECT_TIMEOUT = float(os.getenv('AI_CONNECT_TIMEOUT', 3.05))
+AI_READ_TIMEOUT = float(os.getenv('AI_READ_TIMEOUT', 30))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 2))
+AI_WARMUP = os.getenv('AI_WARMUP', 'true').lower() == 'true'
+AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'true').lower() == 'true'
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', 2.0))
+AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', 3))
+AI_BREAKER_COOLDOWN = float(os.getenv('AI_BREAKER_COOLDOWN', 30))
+
+# Наибольшее время от конца фразы до ответа; каждый сетевой вызов получает остаток
+TURN_DEADLINE = float(os.getenv('TURN_DEADLINE', 15))
+
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 86400))
+RESPONSE_CACHE_MAX_KB = int(os.getenv('RESPONSE_CACHE_MAX_KB', 2048))
+RESPONSE_CACHE_PERSIST = os.getenv('RESPONSE_CACHE_PERSIST', 'false').lower() == 'true'
+
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', 1500))
+HISTORY_SUMMARY_TOKENS = int(os.getenv('HISTORY_SUMMARY_TOKENS', 300))
+HISTORY_RESUME_MESSAGES = int(os.getenv('HISTORY_RESUME_MESSAGES', 40))
+CONVERSATION_LOG_ENABLED = os.getenv('CONVERSATION_LOG_ENABLED', 'true').lower() == 'true'
+CONVERSATION_LOG_RETENTION_DAYS = int(os.getenv('CONVERSATION_LOG_RETENTION_DAYS', 90))
+CONVERSATION_LOG_MAX_MESSAGES = int(os.getenv('CONVERSATION_LOG_MAX_MESSAGES', 20000))
 
 VOICE_RATE = int(os.getenv('VOICE_RATE', 150))
 VOICE_VOLUME = float(os.getenv('VOICE_VOLUME', 1.0))
 VOICE_GENDER = os.getenv('VOICE_GENDER', 'male')
+TTS_SYNTH_WORKERS = int(os.getenv('TTS_SYNTH_WORKERS', 2))
 ASSISTANT_NAME = os.getenv('ASSISTANT_NAME', 'Алиса')
 
 RECOGNITION_LANGUAGE = os.getenv('RECOGNITION_LANGUAGE', 'ru-RU')
+# Движок распознавания: google (сеть) или vosk (офлайн, нужна модель в VOSK_MODEL_PATH)
+RECOGNITION_ENGINE = os.getenv('RECOGNITION_ENGINE', 'google').lower()
+RECOGNITION_TIMEOUT = float(os.getenv('RECOGNITION_TIMEOUT', 5))
+GTTS_TIMEOUT = float(os.getenv('GTTS_TIMEOUT', 5))
+# Постоянный поток вывода звука: объём буфера и длина куска PCM; без PyAudio звук идёт через pygame
+AUDIO_OUTPUT_ENABLED = os.getenv('AUDIO_OUTPUT_ENABLED', 'true').lower() == 'true'
+AUDIO_OUTPUT_BUFFER_MS = int(os.getenv('AUDIO_OUTPUT_BUFFER_MS', 1000))
+AUDIO_OUTPUT_CHUNK_MS = int(os.getenv('AUDIO_OUTPUT_CHUNK_MS', 40))
+# Калибровка шума: один раз при запуске, затем только при сильном изменении уровня шума
+CALIBRATION_DURATION = float(os.getenv('CALIBRATION_DURATION', 1.0))
+NOISE_DRIFT_RATIO = float(os.getenv('NOISE_DRIFT_RATIO', 3.0))
+# Определение конца фразы по кадрам: пауза после речи (hangover) и запас тишины перед ней
+VAD_FRAME_MS = int(os.getenv('VAD_FRAME_MS', 30))
+VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', 300))
+VAD_PREROLL_MS = int(os.getenv('VAD_PREROLL_MS', 300))
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', 90))
+# Непрерывный режим: потоки распознавания и очереди фраз; при переполнении
+# drop_oldest вытесняет старую фразу, drop_newest отбрасывает новую, block останавливает захват
+LISTEN_ASR_WORKERS = int(os.getenv('LISTEN_ASR_WORKERS', 2))
+LISTEN_BUFFER_SIZE = int(os.getenv('LISTEN_BUFFER_SIZE', 8))
+LISTEN_DROP_POLICY = os.getenv('LISTEN_DROP_POLICY', 'drop_oldest')
+# Перебивание: речь во время ответа останавливает озвучивание. Пока звучит ответ,
+# порог речи выше в BARGE_IN_THRESHOLD_RATIO раз, чтобы не реагировать на собственный голос
+BARGE_IN_ENABLED = os.getenv('BARGE_IN_ENABLED', 'true').lower() == 'true'
+BARGE_IN_THRESHOLD_RATIO = float(os.getenv('BARGE_IN_THRESHOLD_RATIO', 3.0))
+BARGE_IN_MIN_SPEECH_MS = int(os.getenv('BARGE_IN_MIN_SPEECH_MS', 200))
+# Имя ассистента как слово активации в непрерывном режиме: без него фраза не распознаётся.
+# Чувствительность — минимальная уверенность Vosk в имени; после одного имени следующая
+# фраза в течение WAKE_WORD_WINDOW секунд принимается без него
+WAKE_WORD_ENABLED = os.getenv('WAKE_WORD_ENABLED', 'false').lower() == 'true'
+WAKE_WORD_SENSITIVITY = float(os.getenv('WAKE_WORD_SENSITIVITY', 0.6))
+WAKE_WORD_MAX_SECONDS = float(os.getenv('WAKE_WORD_MAX_SECONDS', 2.0))
+WAKE_WORD_WINDOW = float(os.getenv('WAKE_WORD_WINDOW', 5.0))
 TIMEZONE = os.getenv('TIMEZONE', 'Europe/Moscow')
 
+INTENT_CLASSIFIER_ENABLED = os.getenv('INTENT_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+# Отрыв команды от ближайшего вопроса для AI; подбирается scripts/train_intent_classifier.py
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', 0.36))
+
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / 'data'
 CREDENTIALS_DIR = DATA_DIR / 'credentials'
@@ -29,8 +92,42 @@ GOOGLE_CREDENTIALS_FILE = CREDENTIALS_DIR / 'google_credentials.json'
 DATA_DIR.mkdir(exist_ok=True)
 CREDENTIALS_DIR.mkdir(exist_ok=True)
 
+RESPONSE_CACHE_PATH = DATA_DIR / 'response_cache.sqlite3'
+CONVERSATION_LOG_PATH = DATA_DIR / 'conversation.sqlite3'
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', str(DATA_DIR / 'vosk-model-small-ru'))
+
+# Экспорт метрик: через запятую prometheus и/или jsonl, пусто — только в памяти
+METRICS_EXPORT = os.getenv('METRICS_EXPORT', '')
+METRICS_WINDOW = int(os.getenv('METRICS_WINDOW', 500))
+METRICS_PROM_PATH = DATA_DIR / 'metrics.prom'
+METRICS_JSONL_PATH = DATA_DIR / 'metrics.jsonl'
+# Больший файл JSONL переименовывается в .old и начинается заново
+METRICS_JSONL_MAX_MB = int(os.getenv('METRICS_JSONL_MAX_MB', 10))
+
+AUDIO_CACHE_ENABLED = os.getenv('AUDIO_CACHE_ENABLED', 'true').lower() == 'true'
+AUDIO_CACHE_DIR = DATA_DIR / 'audio_cache'
+AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', 100))
+AUDIO_CACHE_PREWARM = os.getenv('AUDIO_CACHE_PREWARM', 'false').lower() == 'true'
+
+# Лог в окне: строки копятся в очереди и выводятся пачками; в окне остаются последние
+# GUI_LOG_MAX_LINES строк, более старые дописываются в файл
+GUI_LOG_MAX_LINES = int(os.getenv('GUI_LOG_MAX_LINES', 5000))
+GUI_LOG_BATCH_SIZE = int(os.getenv('GUI_LOG_BATCH_SIZE', 200))
+GUI_LOG_FLUSH_MS = int(os.getenv('GUI_LOG_FLUSH_MS', 100))
+GUI_LOG_PENDING_MAX = int(os.getenv('GUI_LOG_PENDING_MAX', 10000))
+GUI_LOG_SPILL_PATH = DATA_DIR / 'gui_log.txt'
+GUI_LOG_SPILL_MAX_MB = int(os.getenv('GUI_LOG_SPILL_MAX_MB', 10))
+
 GOOGLE_CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar']
 GOOGLE_CALENDAR_ID = 'primary'
+CALENDAR_STORE_PATH = DATA_DIR / 'calendar_events.json'
+CALENDAR_DISCOVERY_PATH = DATA_DIR / 'calendar_v3_discovery.json'
+CALENDAR_REFRESH_INTERVAL = int(os.getenv('CALENDAR_REFRESH_INTERVAL', 60))
+CALENDAR_SYNC_DAYS_BACK = int(os.getenv('CALENDAR_SYNC_DAYS_BACK', 1))
+# Горизонт локальной копии: повторяющиеся события без даты окончания разворачиваются только до него
+CALENDAR_SYNC_DAYS_AHEAD = int(os.getenv('CALENDAR_SYNC_DAYS_AHEAD', 90))
+CALENDAR_HTTP_TIMEOUT = float(os.getenv('CALENDAR_HTTP_TIMEOUT', 10))
+CALENDAR_CONTEXT_TIMEOUT = float(os.getenv('CALENDAR_CONTEXT_TIMEOUT', 1))
 
 
 SYSTEM_PROMPT = f"""Ты - {ASSISTANT_NAME}, дружелюбный AI-ассистент. 
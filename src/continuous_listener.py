@@ -0,0 +1,338 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.metrics import metrics
+    from src.wake_word import make_wake_word
+except ImportError:
+    from metrics import metrics
+    from wake_word import make_wake_word
+
+try:
+    from src.config import (LISTEN_ASR_WORKERS, LISTEN_BUFFER_SIZE, LISTEN_DROP_POLICY,
+                            WAKE_WORD_ENABLED, WAKE_WORD_WINDOW)
+except ImportError:
+    try:
+        from config import (LISTEN_ASR_WORKERS, LISTEN_BUFFER_SIZE, LISTEN_DROP_POLICY,
+                            WAKE_WORD_ENABLED, WAKE_WORD_WINDOW)
+    except ImportError:
+        LISTEN_ASR_WORKERS = 2
+        LISTEN_BUFFER_SIZE = 8
+        LISTEN_DROP_POLICY = 'drop_oldest'
+        WAKE_WORD_ENABLED = False
+        WAKE_WORD_WINDOW = 5.0
+
+DROP_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+# Как часто поток без работы проверяет, не пора ли остановиться
+POLL_INTERVAL = 0.5
+
+# Остаток фразы после имени короче этого считается паузой: команда придёт следующей фразой
+MIN_COMMAND_SECONDS = 0.4
+
+# Пауза перед повторным открытием микрофона после ошибки растёт вдвое до предела, с
+MIC_RETRY_DELAY = 1.0
+MIC_RETRY_MAX_DELAY = 30.0
+
+
+class BoundedQueue:
+    """Очередь ограниченного размера с политикой переполнения"""
+
+    def __init__(self, name: str, maxsize: int, policy: str = 'drop_oldest'):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"неизвестная политика переполнения {policy}, допустимы: {', '.join(DROP_POLICIES)}")
+
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item: Any) -> Optional[Any]:
+        """Добавление элемента; возвращает вытесненный или отброшенный элемент"""
+        dropped = None
+
+        with self._cond:
+            if self._closed:
+                return item
+
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'block':
+                    # Блокировка останавливает и того, кто кладёт: для захвата звука это потеря кадров
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return item
+                elif self.policy == 'drop_newest':
+                    dropped = item
+                else:
+                    dropped = self._items.popleft()
+
+            if dropped is not item:
+                self._items.append(item)
+            self._cond.notify_all()
+
+        if dropped is not None:
+            self.dropped += 1
+            metrics.increment('listen_dropped', queue=self.name)
+        return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Следующий элемент или None, если очередь закрыта или время ожидания вышло"""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Закрытие: ожидающие получают None, новые элементы не принимаются"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class ContinuousListener:
+    """Непрерывное прослушивание: захват, пул распознавания и выдача команд по порядку в разных потоках"""
+
+    def __init__(self, voice, callback: Callable[[str], None], workers: int = LISTEN_ASR_WORKERS,
+                 buffer_size: int = LISTEN_BUFFER_SIZE, policy: str = LISTEN_DROP_POLICY):
+        self.voice = voice
+        self.callback = callback
+        self.workers = workers
+
+        self.audio_queue = BoundedQueue('audio', buffer_size, policy)
+        self.command_queue = BoundedQueue('commands', buffer_size, policy)
+
+        # Слово активации: без него фразы не доходят до распознавания
+        self.wake_word = make_wake_word(voice.asr) if WAKE_WORD_ENABLED else None
+        self._armed_until = 0.0
+        # Имя слышит поток захвата, а команду после него может забрать поток распознавания
+        self._armed_lock = threading.Lock()
+
+        self.running = False
+        self._threads = []
+
+        # Распознанные фразы ждут здесь, пока не будут готовы все более ранние
+        self._results: Dict[int, Optional[str]] = {}
+        self._seq = 0
+        self._next_seq = 0
+        self._results_lock = threading.Lock()
+        # Готовые фразы передаёт в очередь команд один поток за раз, иначе порядок нарушится
+        self._releasing = False
+
+    def start(self):
+        """Запуск потоков"""
+        self.running = True
+        targets = [('listen-capture', self._capture_loop), ('listen-dispatch', self._dispatch_loop)]
+        targets += [(f"listen-asr-{i}", self._recognize_loop) for i in range(self.workers)]
+
+        for name, target in targets:
+            thread = threading.Thread(target=target, daemon=True, name=name)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        """Остановка потоков"""
+        self.running = False
+        self.audio_queue.close()
+        self.command_queue.close()
+
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def _capture_loop(self):
+        """Захват фраз; микрофон, который не удалось открыть, открывается заново с растущей паузой"""
+        delay = MIC_RETRY_DELAY
+
+        while self.running:
+            try:
+                with self.voice.microphone as source:
+                    delay = MIC_RETRY_DELAY
+                    self._capture_phrases(source)
+            except Exception as e:
+                if not self.running:
+                    return
+                print(f"❌ Микрофон недоступен: {e}. Повтор через {delay:.0f} с")
+                metrics.increment('listen_mic_error')
+
+                retry_at = time.monotonic() + delay
+                while self.running and time.monotonic() < retry_at:
+                    time.sleep(min(POLL_INTERVAL, retry_at - time.monotonic()))
+                delay = min(delay * 2, MIC_RETRY_MAX_DELAY)
+
+    def _capture_phrases(self, source):
+        """Чтение открытого микрофона: фразы записываются без пауз, пока остальные стадии заняты"""
+        import speech_recognition as sr
+
+        if self.wake_word:
+            mode = 'по звуку (Vosk)' if self.wake_word.on_device else 'по тексту'
+            print(f"👂 Жду имя «{self.wake_word.word}» {mode}, "
+                  f"чувствительность {self.wake_word.sensitivity}")
+
+        while self.running:
+            session = self.wake_word.open_session(source.SAMPLE_RATE, source.SAMPLE_WIDTH) if self.wake_word else None
+            try:
+                self.voice._ensure_calibrated(source)
+                # При поиске имени по звуку распознаётся только то, что сказано после него
+                audio = self.voice._listen(source, timeout=1, phrase_time_limit=5,
+                                           sink=session.feed if session else None,
+                                           stream_asr=session is None)
+            except sr.WaitTimeoutError:
+                continue
+            except Exception as e:
+                print(f"❌ Ошибка в цикле прослушивания: {e}")
+                time.sleep(0.5)
+                continue
+
+            if session is not None:
+                audio = self._gate_audio(audio, session)
+                if audio is None:
+                    continue
+
+            dropped = self.audio_queue.put((self._seq, audio, time.monotonic(), session is not None))
+            if dropped is not None:
+                print("⚠️ Распознавание не успевает, фраза пропущена")
+                # Пропущенный номер закрывается, иначе выдача по порядку остановится на нём
+                self._complete(dropped[0], None)
+            self._seq += 1
+
+    def _recognize_loop(self):
+        """Распознавание фраз из очереди"""
+        while self.running:
+            item = self.audio_queue.get(POLL_INTERVAL)
+            if item is None:
+                continue
+
+            seq, audio, captured_at, gated = item
+            metrics.observe('listen_queue_wait', time.monotonic() - captured_at, queue='audio')
+            text = None
+            try:
+                text = self.voice.recognize(audio)
+                if text and self.wake_word and not gated:
+                    text = self._gate_text(text)
+            except Exception as e:
+                # Номер фразы всё равно закрывается, иначе выдача по порядку остановится на нём
+                print(f"❌ Ошибка распознавания: {e}")
+                text = None
+            finally:
+                self._complete(seq, text)
+
+    def _arm(self):
+        """Одно имя без команды: следующая фраза принимается без него"""
+        with self._armed_lock:
+            self._armed_until = time.monotonic() + WAKE_WORD_WINDOW
+        print("👂 Слушаю команду")
+
+    def _take_armed(self) -> bool:
+        """Ждёт ли ассистент команду после имени; ожидание снимается"""
+        with self._armed_lock:
+            armed = time.monotonic() < self._armed_until
+            self._armed_until = 0.0
+        return armed
+
+    def _gate_audio(self, audio, session):
+        """Звук после имени или None, если фраза обращена не к ассистенту"""
+        import speech_recognition as sr
+
+        started = time.perf_counter()
+        end = session.result()
+        metrics.observe('wake_word', time.perf_counter() - started, engine='vosk',
+                        detected=end is not None, confidence=round(session.confidence, 3),
+                        sensitivity=self.wake_word.sensitivity)
+        metrics.observe('wake_word_cpu', session.cpu, engine='vosk')
+
+        if self._take_armed():
+            metrics.increment('wake_word', outcome='follow_up')
+            return audio
+
+        if end is None:
+            metrics.increment('wake_word', outcome='rejected')
+            return None
+
+        frame_bytes = audio.sample_rate * audio.sample_width
+        rest = audio.frame_data[int(end * audio.sample_rate) * audio.sample_width:]
+        if len(rest) < MIN_COMMAND_SECONDS * frame_bytes:
+            metrics.increment('wake_word', outcome='armed')
+            self._arm()
+            return None
+
+        metrics.increment('wake_word', outcome='accepted')
+        return sr.AudioData(rest, audio.sample_rate, audio.sample_width)
+
+    def _gate_text(self, text: str) -> Optional[str]:
+        """Текст после имени или None, если фраза обращена не к ассистенту
+
+        Запасной путь без Vosk: имя ищется в уже распознанном тексте, поэтому распознаётся каждая фраза.
+        """
+        if self._take_armed():
+            metrics.increment('wake_word', outcome='follow_up')
+            return text
+
+        command = self.wake_word.strip(text)
+        if command is None:
+            metrics.increment('wake_word', outcome='rejected')
+            return None
+        if not command:
+            metrics.increment('wake_word', outcome='armed')
+            self._arm()
+            return None
+
+        metrics.increment('wake_word', outcome='accepted')
+        return command
+
+    def _complete(self, seq: int, text: Optional[str]):
+        """Результат фразы; готовые подряд фразы уходят в очередь команд в порядке произнесения"""
+        with self._results_lock:
+            self._results[seq] = text
+            if self._releasing:
+                # Фразы выпускает другой поток, он заберёт и эту
+                return
+            self._releasing = True
+
+        while True:
+            with self._results_lock:
+                ready = []
+                while self._next_seq in self._results:
+                    ready.append(self._results.pop(self._next_seq))
+                    self._next_seq += 1
+                if not ready:
+                    self._releasing = False
+                    return
+
+            # Очередь с политикой block может ждать: остальные потоки распознавания при этом не стоят
+            for text in ready:
+                if text and self.command_queue.put((text, time.monotonic())) is not None:
+                    print("⚠️ Очередь команд переполнена, команда пропущена")
+
+    def _dispatch_loop(self):
+        """Выполнение команд по одной, в порядке произнесения"""
+        while self.running:
+            item = self.command_queue.get(POLL_INTERVAL)
+            if item is None:
+                continue
+
+            text, queued_at = item
+            metrics.observe('listen_queue_wait', time.monotonic() - queued_at, queue='commands')
+            try:
+                self.callback(text)
+            except Exception as e:
+                print(f"❌ Ошибка обработки команды: {e}")
@@ -0,0 +1,160 @@
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Сколько ждать следующих сообщений, прежде чем записать пачку
+BATCH_INTERVAL = 0.5
+BATCH_SIZE = 64
+
+# После удаления такой доли записей файл сжимается
+VACUUM_RATIO = 0.25
+
+_CLEAR = object()
+_FLUSH = object()
+_CLOSE = object()
+
+
+class ConversationLog:
+    """Журнал диалога в SQLite (WAL): запись пачками в фоне, чтение только хвоста"""
+
+    def __init__(self, path: Path, retention_days: int = 90, max_messages: int = 20000):
+        self.path = Path(path)
+        self.retention_days = retention_days
+        self.max_messages = max_messages
+
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL NORMAL не теряет целостность при сбое, только последнюю пачку
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS messages ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, role TEXT, content TEXT, timestamp TEXT)'
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name='conversation-log')
+        self._writer.start()
+
+    def append(self, role: str, content: str, timestamp: Optional[str] = None):
+        """Постановка сообщения в очередь на запись"""
+        self._queue.put((role, content, timestamp or datetime.now().isoformat()))
+
+    def tail(self, limit: int) -> List[Dict]:
+        """Последние сообщения в хронологическом порядке"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT role, content, timestamp FROM messages ORDER BY id DESC LIMIT ?', (limit,)
+            ).fetchall()
+
+        return [{'role': role, 'content': content, 'timestamp': timestamp} for role, content, timestamp in reversed(rows)]
+
+    def clear(self):
+        """Удаление всего журнала после записи уже поставленных сообщений"""
+        self._queue.put(_CLEAR)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание записи всех поставленных сообщений"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self):
+        """Запись очереди и закрытие базы"""
+        if self._writer.is_alive():
+            self._queue.put(_CLOSE)
+            self._writer.join()
+
+    def count(self) -> int:
+        """Число сообщений в журнале"""
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    def compact(self):
+        """Удаление сообщений старше срока хранения и сверх лимита"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+
+        with self._lock:
+            total = self._db.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+            removed = self._db.execute('DELETE FROM messages WHERE timestamp < ?', (cutoff,)).rowcount
+            removed += self._db.execute(
+                'DELETE FROM messages WHERE id <= (SELECT MAX(id) FROM messages) - ?', (self.max_messages,)
+            ).rowcount
+            self._db.commit()
+
+            if total and removed / total >= VACUUM_RATIO:
+                self._db.execute('VACUUM')
+            self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        if removed:
+            print(f"🗄 Журнал диалога: удалено старых сообщений: {removed}")
+
+    def _write_loop(self):
+        """Фоновая запись: обслуживание при старте, затем сообщения пачками"""
+        try:
+            self.compact()
+        except sqlite3.Error as e:
+            print(f"⚠️ Не удалось сжать журнал диалога: {e}")
+
+        while True:
+            item = self._queue.get()
+            batch = []
+            waiters = []
+            stop = False
+
+            # Собираем всё, что пришло за интервал, в одну транзакцию
+            deadline = time.monotonic() + BATCH_INTERVAL
+            while True:
+                if item is _CLOSE:
+                    stop = True
+                elif item is _CLEAR:
+                    self._write(batch)
+                    batch = []
+                    self._execute('DELETE FROM messages')
+                elif item[0] is _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    batch.append(item)
+
+                if stop or waiters or len(batch) >= BATCH_SIZE:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+            for done in waiters:
+                done.set()
+
+            if stop:
+                with self._lock:
+                    self._db.close()
+                return
+
+    def _write(self, batch: List[tuple]):
+        """Запись пачки сообщений одной транзакцией"""
+        if batch:
+            self._execute('INSERT INTO messages (role, content, timestamp) VALUES (?, ?, ?)', batch, many=True)
+
+    def _execute(self, sql: str, params=(), many: bool = False):
+        """Выполнение изменения с обработкой ошибок базы"""
+        try:
+            with self._lock:
+                if many:
+                    self._db.executemany(sql, params)
+                else:
+                    self._db.execute(sql, params)
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка записи журнала диалога: {e}")
@@ -0,0 +1,72 @@
+import itertools
+import random
+import time
+from typing import Any, Callable, Optional
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 2.0
+
+_turn_ids = itertools.count(1)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Время на ход истекло"""
+
+
+class Deadline:
+    """Бюджет времени на ход: каждый сетевой вызов получает остаток как таймаут"""
+
+    def __init__(self, budget: float, turn: Optional[int] = None):
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget
+        # Номер хода связывает замеры стадий одного хода в метриках
+        self.turn = turn if turn is not None else next(_turn_ids)
+
+    def __repr__(self) -> str:
+        return f"<Deadline {self.remaining():.2f}/{self.budget:.2f} с>"
+
+    def remaining(self) -> float:
+        """Оставшееся время в секундах"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Время с начала хода в секундах"""
+        return time.monotonic() - self.started_at
+
+    @property
+    def expired(self) -> bool:
+        """Истекло ли время"""
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Таймаут для очередного вызова; исключение, если время уже вышло"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"бюджет {self.budget:.1f} с исчерпан")
+        return remaining if cap is None else min(remaining, cap)
+
+    def limit(self, seconds: float) -> 'Deadline':
+        """Вложенный срок для второстепенной подзадачи, не дольше общего"""
+        return Deadline(min(seconds, self.remaining()), self.turn)
+
+
+def retry_call(fn: Callable[[], Any], deadline: Deadline,
+               retryable: Callable[[Exception], bool] = lambda e: True,
+               attempts: int = RETRY_ATTEMPTS) -> Any:
+    """Вызов с повторами через экспоненциальную паузу со случайным разбросом, пока хватает времени"""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not retryable(e):
+                raise
+
+            # Полный разброс: одновременно упавшие клиенты не повторяют запросы синхронно
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            if delay >= deadline.remaining():
+                raise
+
+            print(f"🔁 Повтор после ошибки: {e}")
+            time.sleep(delay)
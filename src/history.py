@@ -0,0 +1,146 @@
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.utils import split_sentences
+except ImportError:
+    from utils import split_sentences
+
+# Среднее число символов русского текста на токен, когда точный токенизатор недоступен
+CHARS_PER_TOKEN = {
+    'openai': 2.5,
+    'yandex': 3.5,
+}
+
+# Служебные токены на каждое сообщение (роль, разделители)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Сколько символов от реплики попадает в резюме
+SUMMARY_LINE_CHARS = 160
+
+_ROLE_LABELS = {'user': 'Пользователь', 'assistant': 'Ассистент'}
+
+_tiktoken_encodings = {}
+
+
+def make_token_counter(provider: str, model: Optional[str] = None) -> Callable[[str], int]:
+    """Счётчик токенов: tiktoken для OpenAI при наличии, иначе оценка по длине"""
+    if provider == 'openai' and model:
+        try:
+            import tiktoken
+
+            if model not in _tiktoken_encodings:
+                try:
+                    _tiktoken_encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _tiktoken_encodings[model] = tiktoken.get_encoding('cl100k_base')
+            encoding = _tiktoken_encodings[model]
+            return lambda text: len(encoding.encode(text)) + MESSAGE_OVERHEAD_TOKENS
+        except ImportError:
+            pass
+
+    chars_per_token = CHARS_PER_TOKEN.get(provider, 3.0)
+    return lambda text: int(len(text) / chars_per_token) + 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationHistory:
+    """История диалога в пределах бюджета токенов с накопительным резюме вытесненных реплик"""
+
+    def __init__(self, count_tokens: Callable[[str], int], token_budget: int, summary_budget: int):
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+
+        # Сообщения хранятся вместе с их размером в токенах
+        self._messages = deque()
+        self._tokens = 0
+
+        self._summary_lines = deque()
+        self._summary_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (message for message, _ in self._messages)
+
+    def __getitem__(self, index: int) -> Dict:
+        return self._messages[index][0]
+
+    @property
+    def tokens(self) -> int:
+        """Размер истории и резюме в токенах"""
+        return self._tokens + self._summary_tokens
+
+    @property
+    def summary(self) -> str:
+        """Краткое содержание вытесненной части разговора"""
+        return '\n'.join(line for line, _ in self._summary_lines)
+
+    def append(self, role: str, content: str, timestamp: Optional[str] = None) -> Dict:
+        """Добавление сообщения с вытеснением старых реплик в резюме"""
+        message = {
+            'role': role,
+            'content': content,
+            'timestamp': timestamp or datetime.now().isoformat()
+        }
+        tokens = self.count_tokens(content)
+
+        self._messages.append((message, tokens))
+        self._tokens += tokens
+        self._evict()
+
+        return message
+
+    def clear(self):
+        """Очистка истории и резюме"""
+        self._messages.clear()
+        self._tokens = 0
+        self._summary_lines.clear()
+        self._summary_tokens = 0
+
+    def prompt_messages(self) -> List[Dict[str, str]]:
+        """Сообщения для промпта: резюме, затем реплики в пределах бюджета"""
+        messages = []
+
+        if self._summary_lines:
+            messages.append({
+                'role': 'system',
+                'content': f"Краткое содержание предыдущего разговора:\n{self.summary}"
+            })
+
+        messages.extend({'role': message['role'], 'content': message['content']} for message, _ in self._messages)
+        return messages
+
+    def _evict(self):
+        """Перенос самых старых реплик в резюме, пока история не уложится в бюджет"""
+        # Последнее сообщение остаётся целиком, даже если оно больше бюджета
+        while self._tokens > self.token_budget and len(self._messages) > 1:
+            message, tokens = self._messages.popleft()
+            self._tokens -= tokens
+            self._summarize(message)
+
+    def _summarize(self, message: Dict):
+        """Сжатие реплики до первого предложения в резюме"""
+        sentences = split_sentences(message['content'])
+        if not sentences:
+            return
+
+        text = sentences[0]
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS].rstrip() + '…'
+
+        line = f"{_ROLE_LABELS.get(message['role'], message['role'])}: {text}"
+        tokens = self.count_tokens(line)
+
+        self._summary_lines.append((line, tokens))
+        self._summary_tokens += tokens
+
+        while self._summary_tokens > self.summary_budget and len(self._summary_lines) > 1:
+            _, old_tokens = self._summary_lines.popleft()
+            self._summary_tokens -= old_tokens
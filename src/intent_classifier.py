@@ -0,0 +1,123 @@
+import json
+import math
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.utils import normalize_text
+except ImportError:
+    from utils import normalize_text
+
+INTENT_PHRASES_PATH = Path(__file__).parent / 'intent_phrases.json'
+
+# Метка примеров, на которые должен отвечать AI
+OTHER_LABEL = 'other'
+
+
+def load_phrases(path: Path = INTENT_PHRASES_PATH) -> Dict[str, List[str]]:
+    """Загрузка размеченных фраз: намерение -> примеры"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class IntentClassifier:
+    """Классификатор намерений: TF-IDF по символьным n-граммам и ближайший пример
+
+    Уверенность — на сколько ближайший пример команды ближе ближайшего примера OTHER_LABEL:
+    «сколько времени варить яйцо» похоже на команду времени, но ещё больше похоже
+    на «сколько времени варить макароны», и уходит в AI.
+    """
+
+    def __init__(self, min_n: int = 2, max_n: int = 4):
+        self.min_n = min_n
+        self.max_n = max_n
+        self.idf: Dict[str, float] = {}
+        self.examples: Dict[str, List[Dict[str, float]]] = {}
+
+    def _ngrams(self, text: str) -> Counter:
+        """Символьные n-граммы слов с границами"""
+        grams = Counter()
+        for word in normalize_text(text).split():
+            padded = f" {word} "
+            for n in range(self.min_n, self.max_n + 1):
+                for i in range(len(padded) - n + 1):
+                    grams[padded[i:i + n]] += 1
+        return grams
+
+    def _vectorize(self, text: str) -> Dict[str, float]:
+        """TF-IDF вектор с единичной нормой; незнакомые n-граммы отбрасываются"""
+        idf = self.idf
+        vector = {
+            gram: (1 + math.log(count)) * idf[gram]
+            for gram, count in self._ngrams(text).items()
+            if gram in idf
+        }
+
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if not norm:
+            return {}
+
+        return {gram: value / norm for gram, value in vector.items()}
+
+    def fit(self, examples: Dict[str, List[str]]) -> 'IntentClassifier':
+        """Обучение по примерам фраз для каждого намерения"""
+        documents = [(label, self._ngrams(phrase)) for label, phrases in examples.items() for phrase in phrases]
+
+        document_frequency = Counter()
+        for _, grams in documents:
+            document_frequency.update(grams.keys())
+
+        total = len(documents)
+        self.idf = {
+            gram: math.log((1 + total) / (1 + frequency)) + 1
+            for gram, frequency in document_frequency.items()
+        }
+
+        self.examples = {}
+        for label, phrases in examples.items():
+            vectors = [vector for vector in map(self._vectorize, phrases) if vector]
+            if vectors:
+                self.examples[label] = vectors
+
+        return self
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Ближайшее намерение и его отрыв от ближайшего вопроса для AI"""
+        vector = self._vectorize(text)
+        if not vector:
+            return None, 0.0
+
+        best_label, best_score, other_score = None, 0.0, 0.0
+        for label, vectors in self.examples.items():
+            score = max(self._similarity(vector, example) for example in vectors)
+            if label == OTHER_LABEL:
+                other_score = score
+            elif score > best_score:
+                best_label, best_score = label, score
+
+        if best_label is None or best_score <= other_score:
+            return OTHER_LABEL, other_score - best_score
+
+        return best_label, best_score - other_score
+
+    @staticmethod
+    def _similarity(vector: Dict[str, float], other: Dict[str, float]) -> float:
+        """Косинусная близость векторов с единичной нормой"""
+        return sum(value * other.get(gram, 0.0) for gram, value in vector.items())
+
+    def classify(self, text: str, threshold: float) -> Optional[str]:
+        """Намерение при достаточной уверенности, иначе None"""
+        label, score = self.predict(text)
+        if label is None or label == OTHER_LABEL or score < threshold:
+            return None
+        return label
+
+    @classmethod
+    def from_phrases(cls, path: Path = INTENT_PHRASES_PATH) -> 'IntentClassifier':
+        """Классификатор, обученный на поставляемом наборе фраз"""
+        return cls().fit(load_phrases(path))
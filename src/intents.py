@@ -0,0 +1,170 @@
+import re
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class KeywordIndex:
+    """Индекс Ахо-Корасик: все ключевые слова находятся за один проход по тексту
+
+    Ключевое слово совпадает только с начала слова: «пока» не находится в «покажи».
+    Окончание не проверяется, поэтому основа «встреч» находит и «встреча», и «встречи».
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, Any]]] = [[]]
+        self._built = True
+
+    def __len__(self) -> int:
+        return sum(len(output) for output in self._output)
+
+    def add(self, keyword: str, payload: Any):
+        """Добавление ключевого слова"""
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append((keyword, payload))
+        self._built = False
+
+    def build(self):
+        """Построение суффиксных ссылок"""
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+
+        self._built = True
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, str, Any]]:
+        """Все вхождения с начала слова: (позиция, ключевое слово, payload)"""
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        state = 0
+
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match_state = state
+            while match_state:
+                for keyword, payload in self._output[match_state]:
+                    start = i - len(keyword) + 1
+                    if start == 0 or not text[start - 1].isalnum():
+                        yield start, keyword, payload
+                match_state = fail[match_state]
+
+
+class Intent:
+    """Намерение: обработчик и признаки, по которым оно распознаётся"""
+
+    def __init__(self, name: str, handler: Callable[..., Dict[str, Any]],
+                 keywords: Iterable[str] = (), patterns: Iterable[str] = (),
+                 priority: int = 0, order: int = 0):
+        self.name = name
+        self.handler = handler
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.patterns = list(patterns)
+        self.priority = priority
+        self.order = order
+
+    def __repr__(self) -> str:
+        return f"<Intent {self.name} priority={self.priority}>"
+
+
+class IntentRegistry:
+    """Реестр намерений, скомпилированный в один индекс ключевых слов и по выражению на намерение"""
+
+    def __init__(self):
+        self._intents: Dict[str, Intent] = {}
+        self._index: Optional[KeywordIndex] = None
+        self._patterns: List[Tuple[re.Pattern, Intent]] = []
+        self._counter = 0
+
+    def register(self, name: str, handler: Callable[..., Dict[str, Any]],
+                 keywords: Iterable[str] = (), patterns: Iterable[str] = (),
+                 priority: int = 0) -> Intent:
+        """Регистрация намерения, повторная регистрация заменяет прежнее"""
+        self._counter += 1
+        intent = Intent(name, handler, keywords, patterns, priority, self._counter)
+        self._intents[name] = intent
+        self._index = None
+        return intent
+
+    def unregister(self, name: str):
+        """Удаление намерения"""
+        if self._intents.pop(name, None):
+            self._index = None
+
+    def get(self, name: str) -> Optional[Intent]:
+        """Намерение по имени"""
+        return self._intents.get(name)
+
+    @property
+    def intents(self) -> List[Intent]:
+        """Зарегистрированные намерения"""
+        return list(self._intents.values())
+
+    def compile(self):
+        """Сборка индекса; вызывается автоматически при первом поиске после изменений"""
+        index = KeywordIndex()
+        patterns = []
+
+        for intent in self._intents.values():
+            for keyword in intent.keywords:
+                index.add(keyword, intent)
+            if intent.patterns:
+                # У каждого намерения своё выражение: в общем чередовании раннее совпадение
+                # одного намерения скрывало бы пересекающееся с ним совпадение другого
+                alternation = '|'.join(f"(?:{pattern})" for pattern in intent.patterns)
+                patterns.append((re.compile(alternation, re.IGNORECASE), intent))
+
+        index.build()
+        self._patterns = patterns
+        self._index = index
+
+    def candidates(self, text: str) -> Iterator[Tuple[Intent, int, str]]:
+        """Все совпадения в тексте: (намерение, позиция, совпавший фрагмент)"""
+        if self._index is None:
+            self.compile()
+
+        for start, keyword, intent in self._index.find_all(text):
+            yield intent, start, keyword
+
+        for pattern, intent in self._patterns:
+            for match in pattern.finditer(text):
+                yield intent, match.start(), match.group()
+
+    def match(self, text: str) -> Optional[Intent]:
+        """Выбор намерения для текста"""
+        # Побеждает больший приоритет, затем более длинный фрагмент,
+        # затем более раннее вхождение, затем более ранняя регистрация
+        best = None
+        best_rank = None
+
+        for intent, start, fragment in self.candidates(text.lower()):
+            rank = (intent.priority, len(fragment), -start, -intent.order)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = intent, rank
+
+        return best
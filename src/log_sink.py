@@ -0,0 +1,94 @@
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.config import GUI_LOG_PENDING_MAX, GUI_LOG_SPILL_PATH, GUI_LOG_SPILL_MAX_MB
+except ImportError:
+    try:
+        from config import GUI_LOG_PENDING_MAX, GUI_LOG_SPILL_PATH, GUI_LOG_SPILL_MAX_MB
+    except ImportError:
+        GUI_LOG_PENDING_MAX = 10000
+        GUI_LOG_SPILL_PATH = None
+        GUI_LOG_SPILL_MAX_MB = 10
+
+
+class LogSink:
+    """Потокобезопасная очередь строк лога: потоки только кладут строки, интерфейс забирает их пачками"""
+
+    def __init__(self, max_pending: int = GUI_LOG_PENDING_MAX, spill_path: Optional[Path] = GUI_LOG_SPILL_PATH,
+                 spill_max_bytes: int = GUI_LOG_SPILL_MAX_MB * 1024 * 1024):
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.spill_max_bytes = spill_max_bytes
+        self.dropped = 0
+
+        # Если интерфейс не успевает, старые строки вытесняются, а память не растёт
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+
+    def put(self, message: str):
+        """Строка лога с отметкой времени; можно вызывать из любого потока"""
+        line = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(line)
+
+    def drain(self, limit: int) -> List[str]:
+        """До limit строк в порядке поступления"""
+        with self._lock:
+            lines = [self._pending.popleft() for _ in range(min(limit, len(self._pending)))]
+            dropped, self.dropped = self.dropped, 0
+
+        if dropped:
+            lines.insert(0, f"⚠️ Лог не успевал за выводом, пропущено строк: {dropped}")
+        return lines
+
+    def spill(self, text: str):
+        """Дозапись вытесненных из окна строк в файл; большой файл сменяется новым"""
+        if not self.spill_path or not text:
+            return
+
+        try:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.spill_path.exists() and self.spill_path.stat().st_size > self.spill_max_bytes:
+                self.spill_path.replace(self.spill_path.with_suffix(self.spill_path.suffix + '.old'))
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            self.spill_path = None
+            self.put(f"⚠️ Не удалось сохранить старые строки лога: {e}")
+
+
+class StdoutRedirector:
+    """Замена sys.stdout, которая передаёт целые строки в LogSink"""
+
+    encoding = 'utf-8'
+
+    def __init__(self, sink: LogSink):
+        self.sink = sink
+        # print пишет текст и перевод строки отдельными вызовами: недописанная строка хранится для каждого потока
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, 'buffer', '') + text
+        *lines, self._local.buffer = buffer.split('\n')
+        for line in lines:
+            if line.strip():
+                self.sink.put(line.strip())
+        return len(text)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', '')
+        self._local.buffer = ''
+        if buffer.strip():
+            self.sink.put(buffer.strip())
+
+    def isatty(self) -> bool:
+        return False
@@ -1,6 +1,8 @@
 
 import sys
 import os
+import time
+import importlib.util
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
@@ -9,37 +11,30 @@ import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-from src.assistant import AIAssistant, main as assistant_main
-
-
-def check_dependencies():
-    """Проверка наличия зависимостей"""
-    missing = []
 
-    try:
-        import speech_recognition
-    except ImportError:
-        missing.append("SpeechRecognition")
+from src.log_sink import LogSink, StdoutRedirector
 
-    try:
-        import pyttsx3
-    except ImportError:
-        missing.append("pyttsx3")
+_import_started = time.perf_counter()
+from src.assistant import AIAssistant, main as assistant_main
+ASSISTANT_IMPORT_TIME = time.perf_counter() - _import_started
 
-    try:
-        import pyaudio
-    except ImportError:
-        missing.append("pyaudio")
+# Модуль -> пакет для pip
+DEPENDENCIES = {
+    'speech_recognition': 'SpeechRecognition',
+    'pyttsx3': 'pyttsx3',
+    'pyaudio': 'pyaudio',
+    'openai': 'openai',
+    'googleapiclient': 'google-api-python-client',
+}
 
-    try:
-        import openai
-    except ImportError:
-        missing.append("openai")
 
-    try:
-        import googleapiclient
-    except ImportError:
-        missing.append("google-api-python-client")
+def check_dependencies():
+    """Проверка наличия зависимостей"""
+    # find_spec ищет модуль без его импорта, поэтому проверка почти бесплатна
+    missing = [
+        package for module, package in DEPENDENCIES.items()
+        if importlib.util.find_spec(module) is None
+    ]
 
     if missing:
         print("\n" + "=" * 60)
@@ -68,8 +63,14 @@ class AssistantGUI:
         self.assistant = None
         self.assistant_thread = None
 
+        # Потоки ассистента только кладут строки в очередь; окно обновляется из цикла Tk
+        self.log_sink = LogSink()
+        self.original_stdout = sys.stdout
+        self._stop_requested = False
+
         self.setup_ui()
         self.check_config()
+        self._drain_log()
 
     def setup_ui(self):
         """Настройка интерфейса"""
@@ -209,12 +210,41 @@ class AssistantGUI:
             self.log("   Календарь будет недоступен")
 
     def log(self, message: str):
-        """Добавление сообщения в лог"""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Добавление сообщения в лог; безопасно из любого потока"""
+        self.log_sink.put(message)
+
+    def _drain_log(self):
+        """Вывод накопленных строк одной вставкой; вызывается только из цикла Tk"""
+        from src.config import GUI_LOG_BATCH_SIZE, GUI_LOG_FLUSH_MS
+
+        if self._stop_requested:
+            self._stop_requested = False
+            self.stop_assistant()
+
+        lines = self.log_sink.drain(GUI_LOG_BATCH_SIZE)
+        if lines:
+            # Прокрутка вниз, только если пользователь не листает старые строки
+            at_end = self.log_text.yview()[1] >= 1.0
+            self.log_text.insert(tk.END, '\n'.join(lines) + '\n')
+            self._trim_log()
+            if at_end:
+                self.log_text.see(tk.END)
+
+        # Если строки остались, следующая пачка выводится сразу после отрисовки
+        self.root.after(1 if lines and len(lines) >= GUI_LOG_BATCH_SIZE else GUI_LOG_FLUSH_MS, self._drain_log)
+
+    def _trim_log(self):
+        """Окно хранит не больше GUI_LOG_MAX_LINES строк, вытесненные уходят в файл"""
+        from src.config import GUI_LOG_MAX_LINES
+
+        lines = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        # Обрезка с запасом в десятую часть, чтобы не удалять строки на каждой пачке
+        if lines <= GUI_LOG_MAX_LINES + GUI_LOG_MAX_LINES // 10:
+            return
+
+        end = f"{lines - GUI_LOG_MAX_LINES + 1}.0"
+        self.log_sink.spill(self.log_text.get('1.0', end))
+        self.log_text.delete('1.0', end)
 
     def start_assistant(self):
         """Запуск ассистента"""
@@ -225,39 +255,26 @@ class AssistantGUI:
 
         self.log("🚀 Запуск AI-ассистента...")
 
-        self.assistant_thread = threading.Thread(target=self._run_assistant, daemon=True)
+        # Переменные Tk читаются только в главном потоке: режим передаётся потоку готовым
+        mode = self.listen_mode.get()
+        self.assistant_thread = threading.Thread(target=self._run_assistant, args=(mode,), daemon=True)
         self.assistant_thread.start()
 
-    def _run_assistant(self):
+    def _run_assistant(self, listen_mode: str):
         """Запуск ассистента в потоке"""
+        sys.stdout = StdoutRedirector(self.log_sink)
         try:
-            import sys
-            from io import StringIO
-
-            class LogRedirector:
-                def __init__(self, log_func):
-                    self.log_func = log_func
-                    self.buffer = ""
-
-                def write(self, text):
-                    if text.strip():
-                        self.log_func(text.strip())
-
-                def flush(self):
-                    pass
-
-            original_stdout = sys.stdout
-            sys.stdout = LogRedirector(self.log)
-
             self.assistant = AIAssistant()
-            self.assistant.set_listen_mode(self.listen_mode.get())
+            self.assistant.set_listen_mode(listen_mode)
             self.assistant.start()
 
-            sys.stdout = original_stdout
-
         except Exception as e:
             self.log(f"❌ Ошибка: {e}")
-            self.root.after(0, self.stop_assistant)
+            # Остановку выполнит цикл Tk: из этого потока окно трогать нельзя
+            self._stop_requested = True
+        finally:
+            sys.stdout.flush()
+            sys.stdout = self.original_stdout
 
     def stop_assistant(self):
         """Остановка ассистента"""
@@ -273,9 +290,67 @@ class AssistantGUI:
     def on_closing(self):
         """Обработчик закрытия окна"""
         self.stop_assistant()
+        sys.stdout = self.original_stdout
         self.root.destroy()
 
 
+def print_startup_profile():
+    """Замер времени инициализации каждого компонента"""
+    from src.assistant import voice, ai_engine, calendar
+    from src.utils import STARTUP_TIMINGS
+
+    started = time.perf_counter()
+    assistant = AIAssistant()
+    assistant_time = time.perf_counter() - started
+
+    rows = [('import src.assistant', ASSISTANT_IMPORT_TIME), ('AIAssistant()', assistant_time)]
+
+    for name, component in [('voice', voice), ('ai_engine', ai_engine), ('calendar', calendar)]:
+        try:
+            component.resolve()
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+        rows.append((name, STARTUP_TIMINGS.get(name, 0.0)))
+
+    print("\n⏱ Профиль запуска:")
+    for name, seconds in rows:
+        print(f"   {name:<22} {seconds * 1000:9.1f} мс")
+    print(f"   {'итого':<22} {sum(seconds for _, seconds in rows) * 1000:9.1f} мс\n")
+
+
+def print_metrics_summary():
+    """Сводка задержек по стадиям из журнала метрик прошлых запусков"""
+    from src.metrics import metrics
+
+    path = metrics.jsonl_path
+    if not path or not os.path.exists(path):
+        print("📊 Журнал метрик не найден. Включите его: METRICS_EXPORT=jsonl")
+        return
+
+    loaded = metrics.load_jsonl(path)
+    print(f"\n📊 Метрики из {path} ({loaded} замеров):\n")
+    print(metrics.format_summary())
+    print()
+
+
+def run_wav_files(paths):
+    """Ходы ассистента по записанным WAV-файлам: распознавание и команда без микрофона и озвучивания"""
+    assistant = AIAssistant()
+
+    for path in paths:
+        text = assistant.voice.recognize_file(path)
+        if not text:
+            print(f"🔇 {path}: речь не распознана")
+            continue
+
+        result = assistant.command_handler.process_command(text)
+        print(f"🎙 {path}: {text}")
+        print(f"🤖 {result['response']}\n")
+
+    if assistant.ai.is_initialized:
+        assistant.ai.flush_log()
+
+
 def main():
     """Главная функция"""
     parser = argparse.ArgumentParser(
@@ -296,11 +371,42 @@ def main():
         help='Режим прослушивания'
     )
 
+    parser.add_argument(
+        '--startup-profile',
+        action='store_true',
+        help='Показать время инициализации компонентов и выйти'
+    )
+
+    parser.add_argument(
+        '--metrics',
+        action='store_true',
+        help='Показать сводку задержек по стадиям (p50/p95/p99) и выйти'
+    )
+
+    parser.add_argument(
+        '--wav',
+        nargs='+',
+        metavar='FILE',
+        help='Прогнать ходы по записанным WAV-файлам вместо микрофона и выйти'
+    )
+
     args = parser.parse_args()
 
+    if args.metrics:
+        print_metrics_summary()
+        return
+
     if not check_dependencies():
         sys.exit(1)
 
+    if args.startup_profile:
+        print_startup_profile()
+        return
+
+    if args.wav:
+        run_wav_files(args.wav)
+        return
+
     if args.cli:
         print("🤖 Запуск в консольном режиме...")
         assistant = AIAssistant()
@@ -0,0 +1,263 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.config import (
+        METRICS_EXPORT, METRICS_WINDOW, METRICS_PROM_PATH, METRICS_JSONL_PATH, METRICS_JSONL_MAX_MB
+    )
+except ImportError:
+    try:
+        from config import (
+            METRICS_EXPORT, METRICS_WINDOW, METRICS_PROM_PATH, METRICS_JSONL_PATH, METRICS_JSONL_MAX_MB
+        )
+    except ImportError:
+        METRICS_EXPORT = ''
+        METRICS_WINDOW = 500
+        METRICS_PROM_PATH = None
+        METRICS_JSONL_PATH = None
+        METRICS_JSONL_MAX_MB = 10
+
+# Атрибуты span, которые становятся метками гистограммы; остальные идут только в JSONL
+LABEL_KEYS = ('provider', 'engine', 'intent', 'queue')
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Сколько записей JSONL копится в памяти до записи на диск
+JSONL_BUFFER_SIZE = 50
+
+
+class Histogram:
+    """Скользящее окно длительностей с перцентилями и накопленными count/sum"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        """Добавление замера"""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль по окну последних замеров"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Span:
+    """Замер одной стадии хода; атрибуты можно дополнить внутри блока через set"""
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, attrs: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+        self.started = 0.0
+
+    def set(self, **attrs):
+        """Дополнительные атрибуты, например число токенов"""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.attrs)
+        return False
+
+
+class MetricsRegistry:
+    """Гистограммы стадий и счётчики с экспортом в Prometheus и JSONL"""
+
+    def __init__(self, window: int = METRICS_WINDOW, export: str = METRICS_EXPORT,
+                 prom_path: Optional[Path] = METRICS_PROM_PATH, jsonl_path: Optional[Path] = METRICS_JSONL_PATH,
+                 jsonl_max_bytes: int = METRICS_JSONL_MAX_MB * 1024 * 1024):
+        self.window = window
+        self.formats = {fmt.strip() for fmt in export.split(',') if fmt.strip()}
+        self.prom_path = prom_path
+        self.jsonl_path = jsonl_path
+        self.jsonl_max_bytes = jsonl_max_bytes
+
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+        self._jsonl_buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attrs) -> Span:
+        """Контекстный менеджер замера стадии"""
+        return Span(self, name, attrs)
+
+    def observe(self, name: str, seconds: float, **attrs):
+        """Запись длительности стадии"""
+        self._observe(name, seconds, attrs, 'jsonl' in self.formats)
+
+    def _observe(self, name: str, seconds: float, attrs: Dict[str, Any], log: bool):
+        """Запись в гистограмму и, если нужно, в буфер JSONL"""
+        labels = tuple((key, str(attrs[key])) for key in LABEL_KEYS if attrs.get(key) is not None)
+
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram(self.window)
+            histogram.observe(seconds)
+
+            if log:
+                record = {'ts': round(time.time(), 3), 'stage': name, 'seconds': round(seconds, 6)}
+                record.update(attrs)
+                self._jsonl_buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+                flush = len(self._jsonl_buffer) >= JSONL_BUFFER_SIZE
+            else:
+                flush = False
+
+        if flush:
+            self._flush_jsonl()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Увеличение счётчика"""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Сводка по стадиям: число замеров, среднее и перцентили"""
+        with self._lock:
+            rows = []
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                row = {
+                    'stage': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'mean': histogram.total / histogram.count if histogram.count else 0.0,
+                }
+                for q in QUANTILES:
+                    row[f"p{int(q * 100)}"] = histogram.percentile(q)
+                rows.append(row)
+            return rows
+
+    def counters(self) -> Dict[str, float]:
+        """Текущие значения счётчиков"""
+        with self._lock:
+            return {
+                name + ''.join(f"[{k}={v}]" for k, v in labels): value
+                for (name, labels), value in sorted(self._counters.items())
+            }
+
+    def format_summary(self) -> str:
+        """Сводка в виде таблицы для консоли"""
+        rows = self.summary()
+        if not rows:
+            return "Замеров пока нет"
+
+        lines = [f"{'стадия':<28} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9}"]
+        for row in rows:
+            name = row['stage'] + ''.join(f" {k}={v}" for k, v in row['labels'].items())
+            lines.append(
+                f"{name:<28} {row['count']:>6} "
+                f"{row['p50'] * 1000:>7.0f}мс {row['p95'] * 1000:>7.0f}мс {row['p99'] * 1000:>7.0f}мс"
+            )
+
+        for name, value in self.counters().items():
+            lines.append(f"{name:<28} {value:>6.0f}")
+
+        return '\n'.join(lines)
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines = [
+            '# HELP assistant_stage_seconds Длительность стадий хода ассистента',
+            '# TYPE assistant_stage_seconds summary',
+        ]
+
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                base = [('stage', name)] + list(labels)
+                for q in QUANTILES:
+                    lines.append(
+                        f"assistant_stage_seconds{_format_labels(base + [('quantile', str(q))])} "
+                        f"{histogram.percentile(q):.6f}"
+                    )
+                lines.append(f"assistant_stage_seconds_count{_format_labels(base)} {histogram.count}")
+                lines.append(f"assistant_stage_seconds_sum{_format_labels(base)} {histogram.total:.6f}")
+
+            declared = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in declared:
+                    lines.append(f"# TYPE assistant_{name}_total counter")
+                    declared.add(name)
+                lines.append(f"assistant_{name}_total{_format_labels(list(labels))} {value:g}")
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        """Запись настроенных экспортов на диск"""
+        try:
+            if 'prometheus' in self.formats and self.prom_path:
+                # Атомарная замена: сборщик не прочитает наполовину записанный файл
+                tmp_path = f"{self.prom_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(self.to_prometheus())
+                os.replace(tmp_path, self.prom_path)
+
+            self._flush_jsonl()
+        except OSError as e:
+            print(f"⚠️ Не удалось записать метрики: {e}")
+
+    def load_jsonl(self, path: Path) -> int:
+        """Загрузка замеров из JSONL прошлых запусков, возвращает число записей"""
+        loaded = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    stage, seconds = record.pop('stage'), record.pop('seconds')
+                except (ValueError, KeyError):
+                    continue
+                record.pop('ts', None)
+
+                self._observe(stage, seconds, record, log=False)
+                loaded += 1
+
+        return loaded
+
+    def _flush_jsonl(self):
+        """Дозапись накопленных записей JSONL; вызывается и из замеров, поэтому ошибки диска не выходят наружу"""
+        with self._lock:
+            buffer, self._jsonl_buffer = self._jsonl_buffer, []
+
+        if not buffer or not self.jsonl_path:
+            return
+
+        path = Path(self.jsonl_path)
+        try:
+            if path.exists() and path.stat().st_size > self.jsonl_max_bytes:
+                path.replace(path.with_suffix(path.suffix + '.old'))
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(buffer) + '\n')
+        except OSError as e:
+            # Записи этой пачки теряются: метрики не должны останавливать ход разговора
+            print(f"⚠️ Не удалось записать метрики JSONL: {e}")
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    """Метки Prometheus в фигурных скобках"""
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+metrics = MetricsRegistry()
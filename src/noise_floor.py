@@ -0,0 +1,84 @@
+from array import array
+from typing import Optional
+
+# Вес нового замера шума в скользящем среднем
+FLOOR_ALPHA = 0.2
+
+# Нижняя граница порога: в полной тишине порог не должен падать до нуля
+MIN_THRESHOLD = 50.0
+
+# Сколько фраз подряд упираются в предел длины, прежде чем шум считается выросшим
+SATURATED_LIMIT = 2
+
+_TYPECODES = {1: 'b', 2: 'h', 4: 'i'}
+
+
+class NoiseFloor:
+    """Уровень фонового шума между фразами и порог начала речи по нему"""
+
+    def __init__(self, drift_ratio: float = 3.0, ratio: float = 1.5, alpha: float = FLOOR_ALPHA):
+        self.drift_ratio = drift_ratio
+        self.ratio = ratio
+        self.alpha = alpha
+
+        self.baseline: Optional[float] = None
+        self.floor: Optional[float] = None
+        self.saturated = 0
+        self.calibrations = 0
+
+    @property
+    def calibrated(self) -> bool:
+        """Была ли калибровка"""
+        return self.baseline is not None
+
+    def reset(self, threshold: float):
+        """Новая точка отсчёта по порогу, найденному калибровкой"""
+        # Хранится измеренный шум без нижней границы: иначе в тишине замеры всегда ниже точки отсчёта
+        self.baseline = self.floor = threshold / self.ratio
+        self.saturated = 0
+        self.calibrations += 1
+
+    def observe(self, energy: float):
+        """Учёт уровня шума на отрезке без речи"""
+        if self.floor is None:
+            self.floor = energy
+        else:
+            self.floor = self.alpha * energy + (1 - self.alpha) * self.floor
+
+    def observe_phrase(self, capped: bool):
+        """Учёт конца фразы: запись до жёсткого предела бывает, когда шум не опускается ниже порога"""
+        if capped:
+            self.saturated += 1
+        else:
+            self.saturated = 0
+
+    def threshold(self) -> float:
+        """Порог энергии, выше которого звук считается речью"""
+        return self._clamped(self.floor)
+
+    def _clamped(self, floor: Optional[float]) -> float:
+        """Порог для уровня шума с нижней границей"""
+        return max(MIN_THRESHOLD, (floor or 0.0) * self.ratio)
+
+    @property
+    def drifted(self) -> bool:
+        """Шум ушёл от последней калибровки настолько, что нужна новая"""
+        if not self.calibrated or self.saturated >= SATURATED_LIMIT:
+            return True
+        # Сравниваются пороги, а не сам шум: колебания ниже нижней границы порог не меняют
+        change = self._clamped(self.floor) / self._clamped(self.baseline)
+        return change > self.drift_ratio or change < 1 / self.drift_ratio
+
+
+def to_samples(data: bytes, sample_width: int) -> array:
+    """Отсчёты PCM со знаком"""
+    return array(_TYPECODES[sample_width], data[:len(data) - len(data) % sample_width])
+
+
+def rms(data: bytes, sample_width: int) -> float:
+    """Среднеквадратичная амплитуда PCM, как audioop.rms"""
+    samples = to_samples(data, sample_width)
+    if not samples:
+        return 0.0
+    return (sum(sample * sample for sample in samples) / len(samples)) ** 0.5
+
@@ -0,0 +1,187 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.deadline import Deadline
+    from src.metrics import metrics
+except ImportError:
+    from deadline import Deadline
+    from metrics import metrics
+
+try:
+    from src.config import ASSISTANT_NAME, AI_STREAMING, PIPELINE_QUEUE_SIZE, TURN_DEADLINE
+except ImportError:
+    try:
+        from config import ASSISTANT_NAME, AI_STREAMING, PIPELINE_QUEUE_SIZE, TURN_DEADLINE
+    except ImportError:
+        ASSISTANT_NAME = 'Алиса'
+        AI_STREAMING = True
+        PIPELINE_QUEUE_SIZE = 2
+        TURN_DEADLINE = 15.0
+
+
+# Маркер конца ответа в очереди озвучивания
+_END_OF_REPLY = object()
+
+
+class TurnPipeline:
+    """Асинхронный конвейер хода: захват, распознавание, маршрутизация, AI и озвучивание"""
+
+    def __init__(self, voice, command_handler, on_exit=None, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.voice = voice
+        self.command_handler = command_handler
+        self.on_exit = on_exit
+        self.queue_size = queue_size
+
+        # Микрофон читается строго из одного потока, распознаваний может быть несколько
+        self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='capture')
+        self._asr_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='asr')
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='turn')
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event = asyncio.Event()
+
+    async def run(self):
+        """Запуск всех стадий до остановки"""
+        self._loop = asyncio.get_running_loop()
+
+        audio_queue = asyncio.Queue(maxsize=self.queue_size)
+        text_queue = asyncio.Queue(maxsize=self.queue_size)
+        result_queue = asyncio.Queue(maxsize=self.queue_size)
+        speech_queue = asyncio.Queue()
+
+        tasks = [
+            asyncio.create_task(self._capture_stage(audio_queue)),
+            asyncio.create_task(self._recognize_stage(audio_queue, text_queue)),
+            asyncio.create_task(self._route_stage(text_queue, result_queue)),
+            asyncio.create_task(self._ai_stage(result_queue, speech_queue)),
+            asyncio.create_task(self._speech_stage(speech_queue)),
+        ]
+        for task in tasks:
+            task.add_done_callback(self._on_stage_done)
+
+        try:
+            await self._stop_event.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            self._capture_executor.shutdown(wait=False, cancel_futures=True)
+            self._asr_executor.shutdown(wait=False, cancel_futures=True)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_stage_done(self, task: asyncio.Task):
+        """Стадия не должна завершаться сама: без неё конвейер молча встанет, поэтому он останавливается"""
+        if task.cancelled():
+            return
+        error = task.exception()
+        print(f"❌ Стадия конвейера остановилась: {error!r}" if error else "❌ Стадия конвейера остановилась")
+        self._stop_event.set()
+
+    def stop(self):
+        """Остановка конвейера, безопасна из любого потока"""
+        if self._loop is None:
+            self._stop_event.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def _call(self, executor, func, *args):
+        """Вызов блокирующей функции в пуле потоков"""
+        return await self._loop.run_in_executor(executor, func, *args)
+
+    async def _capture_stage(self, audio_queue: asyncio.Queue):
+        """Захват фраз с микрофона, в том числе во время озвучивания ответа"""
+        while True:
+            # Во время ответа порог VAD поднят, поэтому фразу записывает только перебивающий пользователь
+            audio = await self._call(self._capture_executor, self.voice.capture, 5)
+            if audio is not None:
+                await audio_queue.put(audio)
+
+    async def _recognize_stage(self, audio_queue: asyncio.Queue, text_queue: asyncio.Queue):
+        """Распознавание записанных фраз"""
+        while True:
+            audio = await audio_queue.get()
+            # Срок хода отсчитывается с конца фразы пользователя
+            deadline = Deadline(TURN_DEADLINE)
+            text = await self._call(self._asr_executor, self.voice.recognize, audio, deadline)
+            if text:
+                await text_queue.put((text, deadline))
+
+    async def _route_stage(self, text_queue: asyncio.Queue, result_queue: asyncio.Queue):
+        """Маршрутизация распознанного текста по командам"""
+        while True:
+            text, deadline = await text_queue.get()
+            try:
+                result = await self._call(
+                    self._executor, self.command_handler.process_command, text, AI_STREAMING, deadline
+                )
+            except Exception as e:
+                print(f"❌ Ошибка: {e}")
+                continue
+            await result_queue.put((result, deadline))
+
+    async def _ai_stage(self, result_queue: asyncio.Queue, speech_queue: asyncio.Queue):
+        """Получение ответа AI по предложениям и передача на озвучивание"""
+        while True:
+            result, deadline = await result_queue.get()
+
+            if result.get('stream') is not None:
+                try:
+                    await self._call(self._executor, self._drain_stream, result['stream'], speech_queue)
+                except Exception as e:
+                    print(f"❌ Ошибка: {e}")
+            elif result.get('speak', True):
+                await speech_queue.put(result['response'])
+            else:
+                print(f"\n🤖 {ASSISTANT_NAME}: {result['response']}\n")
+
+            await speech_queue.put((_END_OF_REPLY, result.get('action'), deadline))
+
+    def _drain_stream(self, stream, speech_queue: asyncio.Queue):
+        """Чтение потока ответа AI в пуле потоков"""
+        for sentence in stream:
+            self._loop.call_soon_threadsafe(speech_queue.put_nowait, sentence)
+
+    async def _speech_stage(self, speech_queue: asyncio.Queue):
+        """Озвучивание ответов по порядку"""
+        done = None
+        interruptions = None
+
+        while True:
+            item = await speech_queue.get()
+
+            if isinstance(item, tuple) and item[0] is _END_OF_REPLY:
+                _, action, deadline = item
+                try:
+                    if done is not None:
+                        await self._call(self._executor, done.wait)
+
+                    # Ход: от конца фразы пользователя до конца озвучивания ответа
+                    metrics.observe('turn', deadline.elapsed(), intent=action, turn=deadline.turn)
+                    await self._call(self._executor, metrics.export)
+                except Exception as e:
+                    print(f"❌ Ошибка: {e}")
+                finally:
+                    done = None
+                    interruptions = None
+
+                if action == 'exit' and self.on_exit:
+                    self.on_exit()
+                continue
+
+            try:
+                if interruptions is None:
+                    interruptions = self.voice.interruptions
+                if self.voice.interruptions != interruptions:
+                    # Ответ перебили: оставшиеся предложения уже не нужны
+                    continue
+
+                done = self.voice.speak_async(item)
+            except Exception as e:
+                print(f"❌ Ошибка озвучивания: {e}")
@@ -0,0 +1,248 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.deadline import Deadline, DeadlineExceeded
+except ImportError:
+    from deadline import Deadline, DeadlineExceeded
+
+# Вес нового замера в скользящем среднем задержки
+EWMA_ALPHA = 0.3
+
+# Во сколько раз запасной провайдер должен быть быстрее основного, чтобы стать первым
+PREFERENCE_MARGIN = 1.5
+
+LATENCY_WINDOW = 50
+
+
+class ProviderError(Exception):
+    """Провайдер не смог ответить"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_provider_failure(error: Exception, deadline: Optional[Deadline] = None) -> bool:
+    """Виноват ли провайдер: исчерпанный срок хода не засчитывается ему как ошибка"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    # Таймаут запроса урезан до остатка срока: сработав вместе со сроком, он говорит о долгом ходе, а не о провайдере
+    return not (deadline and deadline.expired)
+
+
+class ProviderStats:
+    """Задержки и автомат отключения (circuit breaker) одного провайдера"""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.ewma: Optional[float] = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+        self.successes = 0
+        self.errors = 0
+
+    @property
+    def state(self) -> str:
+        """closed — работает, open — отключён, half-open — пробный запрос после паузы"""
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def available(self) -> bool:
+        """Можно ли отправлять запросы"""
+        return self.state != 'open'
+
+    def p95(self) -> Optional[float]:
+        """95-й перцентиль недавних задержек"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def record_success(self, latency: float):
+        """Учёт успешного ответа"""
+        self.latencies.append(latency)
+        self.ewma = latency if self.ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma
+        self.failures = 0
+        self.opened_at = None
+        self.successes += 1
+
+    def record_failure(self):
+        """Учёт ошибки; после серии ошибок провайдер отключается на время cooldown"""
+        self.failures += 1
+        self.errors += 1
+        # Неудачный пробный запрос снова отключает провайдера
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class ProviderRouter:
+    """Выбор провайдера по здоровью и задержке, дублирующий запрос к запасному при задержке"""
+
+    def __init__(self, hedge_enabled: bool = True, hedge_min_delay: float = 2.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0):
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._providers: Dict[str, Callable[..., Any]] = {}
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        # Проигравший запрос дорабатывает в фоне, поэтому потоков больше, чем провайдеров
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ai-provider')
+
+    def __bool__(self) -> bool:
+        return bool(self._providers)
+
+    @property
+    def providers(self) -> List[str]:
+        """Подключённые провайдеры в порядке предпочтения"""
+        return list(self._providers)
+
+    def add(self, name: str, call: Callable[..., Any]):
+        """Подключение провайдера; первый добавленный считается основным"""
+        self._providers[name] = call
+        self._stats[name] = ProviderStats(self.failure_threshold, self.cooldown)
+
+    def order(self) -> List[str]:
+        """Доступные провайдеры: сначала самый здоровый и быстрый"""
+        with self._lock:
+            ranked = []
+            for index, name in enumerate(self._providers):
+                stats = self._stats[name]
+                if not stats.available():
+                    continue
+                score = (stats.ewma or 0.0) * (1.0 if index == 0 else PREFERENCE_MARGIN)
+                ranked.append((score, index, name))
+
+        return [name for _, _, name in sorted(ranked)]
+
+    def hedge_delay(self, name: str) -> float:
+        """Сколько ждать провайдера, прежде чем продублировать запрос"""
+        with self._lock:
+            p95 = self._stats[name].p95()
+        return max(self.hedge_min_delay, p95 or 0.0)
+
+    def record_success(self, name: str, latency: float):
+        """Учёт ответа, полученного в обход call (например, потокового)"""
+        with self._lock:
+            self._stats[name].record_success(latency)
+
+    def record_failure(self, name: str):
+        """Учёт ошибки, полученной в обход call"""
+        with self._lock:
+            stats = self._stats[name]
+            was_available = stats.available()
+            stats.record_failure()
+            opened = was_available and not stats.available()
+
+        if opened:
+            print(f"🔌 Провайдер {name} временно отключён после ошибок")
+
+    def call(self, *args, exclude: Iterable[str] = (), deadline: Optional[Deadline] = None) -> Tuple[str, Any]:
+        """Ответ первого успешно ответившего провайдера: (имя, результат)"""
+        names = [name for name in self.order() if name not in exclude]
+        if not names:
+            raise ProviderError("нет доступных AI провайдеров")
+
+        pending = {}
+        errors = []
+        timed_out = None
+        # После выбора победителя ошибки проигравших дублей провайдерам не засчитываются
+        settled = threading.Event()
+
+        def launch(name: str):
+            started = time.monotonic()
+            future = self._executor.submit(self._providers[name], *args)
+            future.add_done_callback(
+                lambda f: self._record(name, f, time.monotonic() - started, deadline, settled)
+            )
+            pending[future] = name
+            return started
+
+        try:
+            primary = names.pop(0)
+            primary_started = launch(primary)
+
+            while pending:
+                timeout = None
+                if names and self.hedge_enabled:
+                    elapsed = time.monotonic() - primary_started
+                    timeout = max(0.0, self.hedge_delay(primary) - elapsed)
+                if deadline:
+                    remaining = deadline.remaining()
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done and deadline and deadline.expired:
+                    # Опоздавшие ответы дорабатывают в фоне; в статистику попадают только их успехи
+                    raise DeadlineExceeded(f"AI провайдеры не ответили за {deadline.budget:.1f} с")
+
+                if not done:
+                    hedge = names.pop(0)
+                    print(f"⏱ {primary} отвечает дольше обычного, дублирую запрос в {hedge}")
+                    launch(hedge)
+                    continue
+
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        return name, future.result()
+                    except DeadlineExceeded as e:
+                        # Срок общий для всех провайдеров: следующий тоже не успеет, ждём только уже отправленные
+                        timed_out = e
+                        names = []
+                    except Exception as e:
+                        errors.append(f"{name}: {e}")
+
+                # Все отправленные запросы упали: переходим к следующему провайдеру
+                if not pending and names:
+                    primary = names.pop(0)
+                    primary_started = launch(primary)
+
+            if timed_out is not None or (deadline and deadline.expired):
+                raise timed_out or DeadlineExceeded(f"AI провайдеры не ответили за {deadline.budget:.1f} с")
+            raise ProviderError('; '.join(errors))
+        finally:
+            settled.set()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние провайдеров"""
+        with self._lock:
+            return {
+                name: {
+                    'state': stats.state,
+                    'ewma': stats.ewma,
+                    'p95': stats.p95(),
+                    'successes': stats.successes,
+                    'errors': stats.errors,
+                }
+                for name, stats in self._stats.items()
+            }
+
+    def _record(self, name: str, future, latency: float, deadline: Optional[Deadline], settled: threading.Event):
+        """Учёт результата каждого запроса; проигравшие дубли учитываются только успехом"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self.record_success(name, latency)
+        elif not settled.is_set() and is_provider_failure(error, deadline):
+            self.record_failure(name)
+
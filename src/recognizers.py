@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+import threading
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.config import RECOGNITION_LANGUAGE, RECOGNITION_ENGINE, VOSK_MODEL_PATH
+except ImportError:
+    try:
+        from config import RECOGNITION_LANGUAGE, RECOGNITION_ENGINE, VOSK_MODEL_PATH
+    except ImportError:
+        RECOGNITION_LANGUAGE = 'ru-RU'
+        RECOGNITION_ENGINE = 'google'
+        VOSK_MODEL_PATH = None
+
+# Частота и разрядность, в которых Vosk получает звук
+VOSK_SAMPLE_RATE = 16000
+VOSK_SAMPLE_WIDTH = 2
+
+
+class GoogleBackend:
+    """Распознавание через Google Web Speech API (сетевой запрос на каждую фразу)"""
+
+    name = 'google'
+    streaming = False
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def warm_up(self):
+        """Подготовка не нужна"""
+
+    def recognize(self, audio, timeout: Optional[float] = None) -> Optional[str]:
+        """Текст фразы или None, если речь не разобрана"""
+        import speech_recognition as sr
+
+        self.recognizer.operation_timeout = timeout
+        try:
+            return self.recognizer.recognize_google(audio, language=RECOGNITION_LANGUAGE)
+        except sr.UnknownValueError:
+            return None
+
+    @staticmethod
+    def retryable(error: Exception) -> bool:
+        """Временная ли ошибка сервиса"""
+        import speech_recognition as sr
+
+        return isinstance(error, sr.RequestError)
+
+    def open_stream(self, sample_rate: int):
+        """Google принимает только фразу целиком"""
+        return None
+
+
+class VoskStream:
+    """Потоковое распознавание одной фразы: кадры подаются по мере записи"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.partial = ''
+        self._final = []
+
+    def feed(self, frame: Optional[bytes]):
+        """Очередной кадр PCM; None означает конец фразы"""
+        if frame is None:
+            return
+
+        if self.recognizer.AcceptWaveform(frame):
+            # Vosk сам закрыл отрезок на паузе внутри фразы
+            text = json.loads(self.recognizer.Result()).get('text', '')
+            if text:
+                self._final.append(text)
+            self.partial = ''
+        else:
+            self.partial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+
+    def result(self) -> Optional[str]:
+        """Итоговый текст фразы"""
+        text = json.loads(self.recognizer.FinalResult()).get('text', '')
+        if text:
+            self._final.append(text)
+        return ' '.join(self._final) or None
+
+
+class VoskBackend:
+    """Офлайн-распознавание Vosk на CPU; модель загружается один раз и остаётся в памяти"""
+
+    name = 'vosk'
+    streaming = True
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Модель Vosk, загружается при первом обращении"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import vosk
+
+                    vosk.SetLogLevel(-1)
+                    self._model = vosk.Model(str(self.model_path))
+                    print(f"🧠 Модель Vosk загружена: {self.model_path}")
+        return self._model
+
+    def warm_up(self):
+        """Загрузка модели заранее, чтобы первая фраза не ждала её"""
+        try:
+            self.model
+        except Exception as e:
+            print(f"❌ Не удалось загрузить модель Vosk: {e}")
+
+    def recognize(self, audio, timeout: Optional[float] = None) -> Optional[str]:
+        """Текст записанной фразы; таймаут не нужен, сети нет"""
+        stream = self.open_stream(VOSK_SAMPLE_RATE)
+        stream.feed(audio.get_raw_data(convert_rate=VOSK_SAMPLE_RATE, convert_width=VOSK_SAMPLE_WIDTH))
+        return stream.result()
+
+    @staticmethod
+    def retryable(error: Exception) -> bool:
+        """Локальные ошибки повтором не исправить"""
+        return False
+
+    def open_stream(self, sample_rate: int) -> VoskStream:
+        """Сессия распознавания фразы с промежуточными результатами"""
+        import vosk
+
+        return VoskStream(vosk.KaldiRecognizer(self.model, sample_rate))
+
+
+def make_backend(recognizer, engine: str = RECOGNITION_ENGINE):
+    """Движок распознавания из настроек; без модели Vosk остаётся Google"""
+    if engine == 'vosk':
+        try:
+            import vosk  # noqa: F401
+        except ImportError:
+            print("⚠️ Vosk не установлен (pip install vosk), распознавание через Google")
+            return GoogleBackend(recognizer)
+
+        if not VOSK_MODEL_PATH or not os.path.isdir(VOSK_MODEL_PATH):
+            print(f"⚠️ Модель Vosk не найдена: {VOSK_MODEL_PATH}, распознавание через Google")
+            return GoogleBackend(recognizer)
+
+        return VoskBackend(VOSK_MODEL_PATH)
+
+    if engine != 'google':
+        print(f"⚠️ Неизвестный движок распознавания {engine}, используется Google")
+    return GoogleBackend(recognizer)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.utils import normalize_text
+except ImportError:
+    from utils import normalize_text
+
+# Вопросы, ответ на которые зависит от момента или от предыдущих реплик
+_CONTEXT_STEMS = re.compile(
+    r'\b(сейчас|сегодн|завтра|вчера|врем|событ|встреч|календар|план|расписан|погод|новост|курс'
+    r'|дальше|продолж|повтор)'
+)
+_CONTEXT_WORDS = re.compile(r'\b(час|это|этот|эта|эти|он|она|оно|они|его|ее|их|там|тогда|еще)\b')
+
+# Как часто из базы удаляются просроченные ответы, с
+PURGE_INTERVAL = 3600
+
+
+class ResponseCache:
+    """Кэш ответов AI с TTL и вытеснением LRU в пределах бюджета памяти"""
+
+    def __init__(self, max_bytes: int, ttl: float, persist_path: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # ключ -> (ответ, момент истечения, размер)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(str(persist_path), check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)'
+            )
+            self._db.execute('DELETE FROM responses WHERE expires_at < ?', (time.time(),))
+            self._db.commit()
+        self._purged_at = time.time()
+
+    @staticmethod
+    def is_context_sensitive(text: str) -> bool:
+        """Зависит ли ответ от времени, календаря или хода беседы"""
+        text = normalize_text(text)
+        return bool(_CONTEXT_STEMS.search(text) or _CONTEXT_WORDS.search(text))
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str, context: Optional[Dict] = None) -> str:
+        """Ключ по провайдеру, модели, нормализованному тексту и значимой части контекста"""
+        # Текущее время меняется каждую минуту и в ключ не входит
+        events = sorted((context or {}).get('upcoming_events') or [])
+        raw = json.dumps([provider, model, normalize_text(text), events], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Ответ из кэша или None"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+            if self._db:
+                row = self._db.execute(
+                    'SELECT value, expires_at FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str, ttl: Optional[float] = None):
+        """Сохранение ответа с собственным или общим TTL"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._store(key, value, expires_at)
+
+            if self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, value, expires_at)
+                )
+                self._trim_db()
+                self._db.commit()
+
+    def record_bypass(self):
+        """Учёт запроса, отправленного мимо кэша"""
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        """Очистка кэша"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            if self._db:
+                self._db.execute('DELETE FROM responses')
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий и размер кэша"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypasses': self.bypasses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+    def _store(self, key: str, value: str, expires_at: float):
+        """Запись в память с вытеснением давно использованных"""
+        if key in self._entries:
+            self._remove(key)
+
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        self._entries[key] = (value, expires_at, size)
+        self._size += size
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _trim_db(self):
+        """База ограничена тем же бюджетом, что и память: старые записи удаляются, просроченные — раз в час"""
+        now = time.time()
+        if now - self._purged_at > PURGE_INTERVAL:
+            self._db.execute('DELETE FROM responses WHERE expires_at < ?', (now,))
+            self._purged_at = now
+
+        # INSERT OR REPLACE выдаёт новой записи больший rowid, поэтому малые rowid — самые старые записи
+        self._db.execute(
+            '''DELETE FROM responses WHERE rowid IN (
+                   SELECT rowid FROM (
+                       SELECT rowid, SUM(LENGTH(CAST(key AS BLOB)) + LENGTH(CAST(value AS BLOB)))
+                           OVER (ORDER BY rowid DESC) AS total
+                       FROM responses
+                   ) WHERE total > ?
+               )''',
+            (self.max_bytes,)
+        )
+
+    def _remove(self, key: str):
+        """Удаление записи из памяти"""
+        _, _, size = self._entries.pop(key)
+        self._size -= size
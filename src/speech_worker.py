@@ -0,0 +1,171 @@
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
+from typing import Callable, Optional, Any
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.utils import split_sentences
+except ImportError:
+    from utils import split_sentences
+
+
+class SpeechWorker:
+    """Фоновая очередь озвучивания с конвейерным синтезом предложений"""
+
+    def __init__(self, play: Callable[[str, Any], None],
+                 stop_playback: Optional[Callable[[], None]] = None,
+                 initializer: Optional[Callable[[], None]] = None,
+                 max_workers: int = 2):
+        self.play = play
+        self.stop_playback = stop_playback
+        self.initializer = initializer
+
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts-synth')
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._ready = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name='speech-worker', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    @property
+    def is_speaking(self) -> bool:
+        """Есть ли текст в очереди или на воспроизведении"""
+        return not self._idle.is_set()
+
+    def submit(self, text: str,
+               synthesize: Optional[Callable[[str, Callable[[], bool]], Any]] = None) -> threading.Event:
+        """Постановка текста в очередь, возвращает событие завершения
+
+        synthesize получает предложение и функцию, которая сообщает, что очередь уже сброшена.
+        """
+        done = threading.Event()
+        sentences = split_sentences(text)
+
+        if not sentences:
+            done.set()
+            return done
+
+        with self._lock:
+            generation = self._generation
+            cancelled = partial(self._cancelled, generation)
+            self._pending += len(sentences)
+            self._idle.clear()
+
+            for i, sentence in enumerate(sentences):
+                # Синтез всех предложений стартует сразу: пул ограничивает
+                # параллелизм, а N+1 готовится, пока играет N
+                future = self._pool.submit(synthesize, sentence, cancelled) if synthesize else None
+                is_last = i == len(sentences) - 1
+                self._queue.put((generation, sentence, future, done if is_last else None))
+
+        return done
+
+    def run_in_pool(self, fn: Callable[[], Any]) -> Future:
+        """Фоновая задача в пуле синтеза: параллелизм общий с синтезом предложений"""
+        return self._pool.submit(fn)
+
+    def run(self, fn: Callable[[], Any]) -> Future:
+        """Выполнение функции в потоке озвучивания между фразами"""
+        future = Future()
+        self._queue.put(('job', fn, future))
+        return future
+
+    def flush(self):
+        """Отмена очереди и остановка текущего воспроизведения"""
+        with self._lock:
+            self._generation += 1
+
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                if item[0] == 'job':
+                    item[2].cancel()
+                    continue
+                self._finish(item)
+
+        if self.stop_playback:
+            try:
+                self.stop_playback()
+            except Exception as e:
+                print(f"❌ Ошибка остановки озвучивания: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание окончания всей очереди"""
+        return self._idle.wait(timeout)
+
+    def shutdown(self):
+        """Остановка потока озвучивания"""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+        self._pool.shutdown(wait=False)
+
+    def _cancelled(self, generation: int) -> bool:
+        """Сброшена ли очередь после постановки предложений этого поколения"""
+        return generation != self._generation
+
+    def _finish(self, item):
+        """Учёт обработанного элемента очереди"""
+        _, _, future, done = item
+
+        if isinstance(future, Future):
+            future.cancel()
+        if done:
+            done.set()
+
+        self._pending -= 1
+        if self._pending <= 0:
+            self._pending = 0
+            self._idle.set()
+
+    def _run(self):
+        """Цикл воспроизведения"""
+        if self.initializer:
+            try:
+                self.initializer()
+            except Exception as e:
+                print(f"❌ Ошибка инициализации озвучивания: {e}")
+        self._ready.set()
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            if item[0] == 'job':
+                _, fn, future = item
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn())
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+
+            generation, sentence, future, _ = item
+
+            try:
+                if generation == self._generation:
+                    audio = future.result() if future else None
+                    if generation == self._generation:
+                        self.play(sentence, audio)
+            except Exception as e:
+                print(f"❌ Ошибка озвучивания: {e}")
+            finally:
+                with self._lock:
+                    self._finish(item)
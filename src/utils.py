@@ -0,0 +1,86 @@
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# Время создания ленивых компонентов в секундах, для профиля запуска
+STARTUP_TIMINGS: Dict[str, float] = {}
+
+# Граница предложения: знак конца предложения и пробел, либо перевод строки
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Нормализация: регистр, ё/е, пунктуация и пробелы"""
+    text = text.lower().replace('ё', 'е')
+    text = _NON_WORD.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def split_sentences(text: str) -> List[str]:
+    """Разбиение текста на предложения"""
+    return [part.strip() for part in _SENTENCE_BOUNDARY.split(text) if part and part.strip()]
+
+
+def iter_sentences(chunks: Iterable[str]) -> Iterator[str]:
+    """Сборка предложений из потока текстовых фрагментов"""
+    buffer = ''
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+
+        buffer += chunk
+        parts = _SENTENCE_BOUNDARY.split(buffer)
+
+        for sentence in parts[:-1]:
+            if sentence and sentence.strip():
+                yield sentence.strip()
+
+        buffer = parts[-1] or ''
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class LazySingleton:
+    """Прокси, создающий объект при первом обращении к нему"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    @property
+    def is_initialized(self) -> bool:
+        """Создан ли уже объект"""
+        return self._instance is not None
+
+    def resolve(self) -> Any:
+        """Получение объекта, при необходимости с созданием"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                instance = self._factory()
+                STARTUP_TIMINGS[self._name] = time.perf_counter() - started
+                object.__setattr__(self, '_instance', instance)
+
+        return self._instance
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.resolve(), item)
+
+    def __setattr__(self, key: str, value: Any):
+        setattr(self.resolve(), key, value)
+
+    def __repr__(self) -> str:
+        state = 'инициализирован' if self.is_initialized else 'не инициализирован'
+        return f"<LazySingleton {self._name}: {state}>"
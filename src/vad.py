@@ -0,0 +1,175 @@
+import time
+from array import array
+from collections import deque
+from typing import Callable, List, Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.noise_floor import rms, to_samples
+except ImportError:
+    from noise_floor import rms, to_samples
+
+try:
+    from src.config import VAD_FRAME_MS, VAD_HANGOVER_MS, VAD_PREROLL_MS, VAD_MIN_SPEECH_MS
+except ImportError:
+    try:
+        from config import VAD_FRAME_MS, VAD_HANGOVER_MS, VAD_PREROLL_MS, VAD_MIN_SPEECH_MS
+    except ImportError:
+        VAD_FRAME_MS = 30
+        VAD_HANGOVER_MS = 300
+        VAD_PREROLL_MS = 300
+        VAD_MIN_SPEECH_MS = 90
+
+# Кадр во столько раз громче порога считается речью при любом числе переходов через ноль
+LOUD_RATIO = 2.0
+
+# Доля переходов через ноль, выше которой негромкий кадр похож на шипение, а не на голос
+ZCR_NOISE = 0.45
+
+# Внутри фразы тихие шипящие согласные продлевают речь, если энергия не ниже этой доли порога
+SOFT_RATIO = 0.6
+ZCR_FRICATIVE = 0.25
+
+# После мягкого предела длины пауза, завершающая фразу, сокращается до этой доли, но не короче кадра
+MIN_HANGOVER_SHARE = 0.3
+
+# Жёсткий предел длины фразы в долях мягкого: защита от шума, который не опускается ниже порога
+HARD_LIMIT_FACTOR = 3.0
+
+# Кадры без речи, по которым оценивается шум
+NOISE_FRAMES = 50
+
+
+def zero_crossing_rate(samples: array) -> float:
+    """Доля соседних отсчётов с разным знаком"""
+    if len(samples) < 2:
+        return 0.0
+    crossings = sum(1 for a, b in zip(samples, samples[1:]) if (a < 0) != (b < 0))
+    return crossings / (len(samples) - 1)
+
+
+class VoiceActivityDetector:
+    """Покадровое определение начала и конца фразы по энергии и переходам через ноль"""
+
+    def __init__(self, sample_rate: int, sample_width: int, threshold: float,
+                 max_phrase: Optional[float] = None, sink: Optional[Callable[[Optional[bytes]], None]] = None,
+                 frame_ms: int = VAD_FRAME_MS, hangover_ms: int = VAD_HANGOVER_MS,
+                 preroll_ms: int = VAD_PREROLL_MS, min_speech_ms: int = VAD_MIN_SPEECH_MS):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.threshold = threshold
+        self.max_phrase = max_phrase
+        # Получатель кадров фразы по мере записи; None означает конец фразы
+        self.sink = sink
+
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_seconds = self.frame_samples / sample_rate
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+
+        self.frames: List[bytes] = []
+        self._preroll = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self._noise = deque(maxlen=NOISE_FRAMES)
+        self._onset = 0
+        self._silence = 0
+
+        self.started = False
+        self.finished = False
+        self.capped = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def frame_bytes(self) -> int:
+        """Размер кадра в байтах"""
+        return self.frame_samples * self.sample_width
+
+    @property
+    def duration(self) -> float:
+        """Длина записанной фразы в секундах, включая паузу перед ней"""
+        return len(self.frames) * self.frame_seconds
+
+    @property
+    def audio(self) -> bytes:
+        """PCM записанной фразы"""
+        return b''.join(self.frames)
+
+    @property
+    def noise_energy(self) -> Optional[float]:
+        """Медианная энергия кадров без речи перед фразой"""
+        if not self._noise:
+            return None
+        ordered = sorted(self._noise)
+        return ordered[len(ordered) // 2]
+
+    def is_speech(self, frame: bytes) -> bool:
+        """Похож ли кадр на речь"""
+        energy = rms(frame, self.sample_width)
+        if energy >= self.threshold * LOUD_RATIO:
+            return True
+
+        zcr = zero_crossing_rate(to_samples(frame, self.sample_width))
+
+        if energy >= self.threshold:
+            return zcr <= ZCR_NOISE
+        return self.started and energy >= self.threshold * SOFT_RATIO and zcr >= ZCR_FRICATIVE
+
+    def feed(self, frame: bytes) -> bool:
+        """Очередной кадр; True, когда фраза закончилась"""
+        if self.finished:
+            return True
+
+        speech = self.is_speech(frame)
+
+        if not self.started:
+            self._preroll.append(frame)
+            if not speech:
+                self._onset = 0
+                self._noise.append(rms(frame, self.sample_width))
+                return False
+
+            self._onset += 1
+            if self._onset < self.min_speech_frames:
+                return False
+
+            # Начало речи: пауза перед фразой попадает в запись, чтобы не срезать первый звук
+            self.started = True
+            self.started_at = time.perf_counter()
+            self.frames.extend(self._preroll)
+            self._emit(*self._preroll)
+            self._preroll.clear()
+            return False
+
+        self.frames.append(frame)
+        self._emit(frame)
+        self._silence = 0 if speech else self._silence + 1
+
+        if self._silence >= self._hangover() or self._over_hard_limit():
+            self.capped = self._over_hard_limit()
+            self.finished = True
+            self.finished_at = time.perf_counter()
+            if self.sink:
+                self.sink(None)
+
+        return self.finished
+
+    def _hangover(self) -> int:
+        """Пауза, завершающая фразу: после мягкого предела длины она короче, чтобы закончить на ближайшей паузе"""
+        if not self.max_phrase or self.duration <= self.max_phrase:
+            return self.hangover_frames
+
+        share = max(MIN_HANGOVER_SHARE, self.max_phrase / self.duration)
+        return max(1, int(self.hangover_frames * share))
+
+    def _over_hard_limit(self) -> bool:
+        """Превышен ли жёсткий предел длины фразы"""
+        return bool(self.max_phrase) and self.duration >= self.max_phrase * HARD_LIMIT_FACTOR
+
+    def _emit(self, *frames: bytes):
+        """Передача кадров получателю"""
+        if self.sink:
+            for frame in frames:
+                self.sink(frame)
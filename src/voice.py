@@ -1,35 +1,97 @@
-import speech_recognition as sr
-import pyttsx3
 import threading
-import queue
 import time
-from typing import Optional, Callable
-import pygame
-from gtts import gTTS
+from pathlib import Path
+from typing import Optional, Callable, Iterable, Iterator, Union
 import io
+import queue
 import os
+import tempfile
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from src.config import VOICE_RATE, VOICE_VOLUME, VOICE_GENDER, RECOGNITION_LANGUAGE, ASSISTANT_NAME
+    from src.speech_worker import SpeechWorker
+    from src.audio_cache import AudioCache
+    from src.utils import split_sentences, LazySingleton
+    from src.deadline import Deadline, DeadlineExceeded, retry_call
+    from src.metrics import metrics
+    from src.noise_floor import NoiseFloor
+    from src.vad import VoiceActivityDetector
+    from src.recognizers import make_backend
+    from src.continuous_listener import ContinuousListener
+    from src.audio_output import make_output
+except ImportError:
+    from speech_worker import SpeechWorker
+    from audio_cache import AudioCache
+    from utils import split_sentences, LazySingleton
+    from deadline import Deadline, DeadlineExceeded, retry_call
+    from metrics import metrics
+    from noise_floor import NoiseFloor
+    from vad import VoiceActivityDetector
+    from recognizers import make_backend
+    from continuous_listener import ContinuousListener
+    from audio_output import make_output
+
+try:
+    from src.config import (
+        VOICE_RATE, VOICE_VOLUME, VOICE_GENDER, RECOGNITION_LANGUAGE, ASSISTANT_NAME,
+        TTS_SYNTH_WORKERS, AUDIO_CACHE_ENABLED, AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB,
+        RECOGNITION_TIMEOUT, GTTS_TIMEOUT, CALIBRATION_DURATION, NOISE_DRIFT_RATIO,
+        BARGE_IN_ENABLED, BARGE_IN_THRESHOLD_RATIO, BARGE_IN_MIN_SPEECH_MS,
+        AUDIO_OUTPUT_ENABLED
+    )
 except ImportError:
     try:
-        from config import VOICE_RATE, VOICE_VOLUME, VOICE_GENDER, RECOGNITION_LANGUAGE, ASSISTANT_NAME
+        from config import (
+            VOICE_RATE, VOICE_VOLUME, VOICE_GENDER, RECOGNITION_LANGUAGE, ASSISTANT_NAME,
+            TTS_SYNTH_WORKERS, AUDIO_CACHE_ENABLED, AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB,
+            RECOGNITION_TIMEOUT, GTTS_TIMEOUT, CALIBRATION_DURATION, NOISE_DRIFT_RATIO,
+            BARGE_IN_ENABLED, BARGE_IN_THRESHOLD_RATIO, BARGE_IN_MIN_SPEECH_MS,
+            AUDIO_OUTPUT_ENABLED
+        )
     except ImportError:
         VOICE_RATE = 150
         VOICE_VOLUME = 1.0
         VOICE_GENDER = 'male'
         RECOGNITION_LANGUAGE = 'ru-RU'
         ASSISTANT_NAME = 'Алиса'
+        TTS_SYNTH_WORKERS = 2
+        AUDIO_CACHE_ENABLED = False
+        AUDIO_CACHE_DIR = None
+        AUDIO_CACHE_MAX_MB = 100
+        RECOGNITION_TIMEOUT = 5.0
+        GTTS_TIMEOUT = 5.0
+        CALIBRATION_DURATION = 1.0
+        NOISE_DRIFT_RATIO = 3.0
+        BARGE_IN_ENABLED = True
+        BARGE_IN_THRESHOLD_RATIO = 3.0
+        BARGE_IN_MIN_SPEECH_MS = 200
+        AUDIO_OUTPUT_ENABLED = True
 
 
 class VoiceEngine:
     """Класс для работы с голосовым вводом/выводом"""
 
     def __init__(self):
+        # Тяжёлые аудиобиблиотеки загружаются только при создании движка
+        import speech_recognition as sr
+        import pygame
+
         self.recognizer = sr.Recognizer()
+        # Таймаут запроса к сервису распознавания; без него зависший сокет останавливает прослушивание
+        self.recognizer.operation_timeout = RECOGNITION_TIMEOUT
+        # Порогом управляет оценка шума между фразами, а не калибровка перед каждой фразой
+        self.recognizer.dynamic_energy_threshold = False
+        self.noise_floor = NoiseFloor(NOISE_DRIFT_RATIO, self.recognizer.dynamic_energy_ratio)
+        self._recalibrate = False
+
+        self.asr = make_backend(self.recognizer)
+        # Промежуточный текст потокового распознавания, например для показа в интерфейсе
+        self.on_partial: Optional[Callable[[str], None]] = None
+        if self.asr.streaming:
+            # Модель загружается в фоне один раз и дальше остаётся в памяти
+            threading.Thread(target=self.asr.warm_up, daemon=True).start()
 
         try:
             self.microphone = sr.Microphone()
@@ -37,17 +99,21 @@ class VoiceEngine:
             print(f"❌ Ошибка инициализации микрофона: {e}")
             self.microphone = None
 
-        try:
-            self.tts_engine = pyttsx3.init()
-            self._configure_voice()
-        except Exception as e:
-            print(f"❌ Ошибка инициализации TTS: {e}")
-            self.tts_engine = None
+        self.tts_engine = None
+        self.voice_id = ''
+
+        self.audio_cache = None
+        if AUDIO_CACHE_ENABLED and AUDIO_CACHE_DIR:
+            try:
+                self.audio_cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024)
+            except OSError as e:
+                print(f"⚠️ Кэш озвучки недоступен: {e}")
 
-        self.listen_queue = queue.Queue()
         self.is_listening = False
-        self.listen_thread = None
-        self.listen_callback = None
+        self.listener = None
+
+        # Сколько раз пользователь перебил ответ; по счётчику озвучивание отбрасывает остаток ответа
+        self.interruptions = 0
 
         self.use_gtts = False
         try:
@@ -55,8 +121,29 @@ class VoiceEngine:
         except:
             pass
 
+        # Один открытый поток вывода для всех фраз; pygame остаётся запасным путём
+        self.output = make_output(VOICE_VOLUME) if AUDIO_OUTPUT_ENABLED else None
+
+        # pyttsx3 создаётся в потоке озвучивания: все вызовы движка идут из одного потока
+        self.speech = SpeechWorker(
+            play=self._play,
+            stop_playback=self._stop_playback,
+            initializer=self._init_tts,
+            max_workers=TTS_SYNTH_WORKERS
+        )
+
         print("🎤 Voice engine initialized")
 
+    def _init_tts(self):
+        """Инициализация pyttsx3"""
+        try:
+            import pyttsx3
+            self.tts_engine = pyttsx3.init()
+            self._configure_voice()
+        except Exception as e:
+            print(f"❌ Ошибка инициализации TTS: {e}")
+            self.tts_engine = None
+
     def _configure_voice(self):
         """Настройка голоса pyttsx3"""
         if not self.tts_engine:
@@ -66,9 +153,11 @@ class VoiceEngine:
             voices = self.tts_engine.getProperty('voices')
 
             if VOICE_GENDER == 'female' and len(voices) > 1:
-                self.tts_engine.setProperty('voice', voices[1].id)
+                self.voice_id = voices[1].id
             else:
-                self.tts_engine.setProperty('voice', voices[0].id)
+                self.voice_id = voices[0].id
+
+            self.tts_engine.setProperty('voice', self.voice_id)
 
             self.tts_engine.setProperty('rate', VOICE_RATE)
             self.tts_engine.setProperty('volume', VOICE_VOLUME)
@@ -77,12 +166,56 @@ class VoiceEngine:
 
     def speak(self, text: str):
         """Озвучивание текста"""
+        self.speak_async(text).wait()
+
+    def speak_async(self, text: str) -> threading.Event:
+        """Неблокирующее озвучивание, возвращает событие завершения"""
         print(f"🤖 {ASSISTANT_NAME}: {text}")
 
-        if self.use_gtts:
-            self._speak_gtts(text)
-        else:
-            self._speak_pyttsx3(text)
+        synthesize = self._synthesize_queued if self.use_gtts else None
+        return self.speech.submit(text, synthesize)
+
+    def stop_speaking(self):
+        """Прерывание озвучивания и очистка очереди"""
+        self.speech.flush()
+
+    def _barge_in(self):
+        """Пользователь заговорил во время ответа: ответ обрывается, а его фраза записывается дальше"""
+        print("✋ Вас понял, останавливаю ответ")
+        self.interruptions += 1
+        self.stop_speaking()
+        metrics.increment('barge_in')
+
+    @property
+    def is_speaking(self) -> bool:
+        """Идёт ли озвучивание"""
+        return self.speech.is_speaking
+
+    def _play(self, text: str, audio: Optional[Union[bytes, Iterator[bytes]]]):
+        """Воспроизведение предложения в потоке озвучивания"""
+        with metrics.span('tts_playback', cached=isinstance(audio, bytes)):
+            if isinstance(audio, bytes):
+                self._play_audio(audio)
+            elif audio is not None:
+                try:
+                    self._play_audio(audio)
+                except Exception as e:
+                    print(f"❌ gTTS error: {e}")
+            elif self.use_gtts and not self.tts_engine:
+                self._speak_gtts(text)
+            else:
+                self._speak_pyttsx3(text)
+
+    def _stop_playback(self):
+        """Остановка текущего воспроизведения"""
+        import pygame
+
+        if self.tts_engine:
+            self.tts_engine.stop()
+        if self.output:
+            self.output.stop()
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
 
     def _speak_pyttsx3(self, text: str):
         """Озвучивание через pyttsx3"""
@@ -92,54 +225,385 @@ class VoiceEngine:
             return
 
         try:
+            if self.audio_cache or self.output:
+                # Фраза рендерится в WAV, чтобы попасть в кэш и играть через общий поток вывода
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = self._render_pyttsx3(text, Path(tmp))
+                    if path:
+                        self._play_audio(path)
+                        return
+
             self.tts_engine.say(text)
             self.tts_engine.runAndWait()
         except Exception as e:
             print(f"❌ Ошибка озвучивания: {e}")
             self._speak_gtts(text)
 
+    def _render_pyttsx3(self, text: str, directory: Path) -> Optional[Path]:
+        """WAV фразы pyttsx3: из кэша, а если его там нет — рендер в directory и добавление в кэш"""
+        key = self._cache_key('pyttsx3', text) if self.audio_cache else None
+        if key:
+            path = self.audio_cache.get(key)
+            if path:
+                return path
+
+        # Рендер идёт в личный каталог: недописанный файл в каталоге кэша могли бы удалить как мусор
+        path = directory / 'speech.wav'
+        with metrics.span('tts_synthesis', engine='pyttsx3', chars=len(text)):
+            self.tts_engine.save_to_file(text, str(path))
+            self.tts_engine.runAndWait()
+
+        if not path.exists() or path.stat().st_size == 0:
+            return None
+
+        if key:
+            try:
+                return self.audio_cache.commit(key, path, '.wav')
+            except OSError as e:
+                # Фраза всё равно звучит из временного файла, без похода в сеть за gTTS
+                print(f"⚠️ Фраза не сохранена в кэш озвучки: {e}")
+        return path
+
     def _speak_gtts(self, text: str):
         """Озвучивание через Google TTS"""
         try:
-            tts = gTTS(text=text, lang=RECOGNITION_LANGUAGE[:2])
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            fp.seek(0)
-            pygame.mixer.music.load(fp)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
+            self._play_audio(self._gtts_audio(text))
         except Exception as e:
             print(f"❌ gTTS error: {e}")
 
+    def _gtts_audio(self, text: str, cancelled: Optional[Callable[[], bool]] = None) -> Union[bytes, Iterator[bytes]]:
+        """MP3 из кэша целиком; иначе поток кусков, если вывод умеет декодировать MP3 по мере загрузки"""
+        if self.output and self.output.mp3_supported:
+            if self.audio_cache:
+                data = self.audio_cache.get_bytes(self._cache_key('gtts', text))
+                if data:
+                    return data
+            return self._prefetch_gtts(text, cancelled or (lambda: False))
+        return self._synthesize_gtts(text)
+
+    def _prefetch_gtts(self, text: str, cancelled: Callable[[], bool]) -> Iterator[bytes]:
+        """Загрузка MP3 в пуле синтеза: куски доступны сразу, а после загрузки файл целиком попадает в кэш"""
+        chunks = queue.Queue()
+
+        def download():
+            data = []
+            try:
+                if cancelled():
+                    return
+                for chunk in self._stream_gtts(text):
+                    if cancelled():
+                        # Ответ сброшен: загрузка прекращается, неполный файл в кэш не пишется
+                        return
+                    data.append(chunk)
+                    chunks.put(chunk)
+            except Exception as e:
+                # Ошибка сообщается здесь: из декодера она бы не дошла до лога
+                print(f"❌ gTTS error: {e}")
+                return
+            finally:
+                chunks.put(None)
+
+            if data and self.audio_cache:
+                self.audio_cache.put(self._cache_key('gtts', text), b''.join(data), '.mp3')
+
+        # Пул синтеза ограничивает число одновременных загрузок; следующее предложение качается, пока играет текущее
+        self.speech.run_in_pool(download)
+        return self._read_chunks(chunks)
+
+    @staticmethod
+    def _read_chunks(chunks: queue.Queue) -> Iterator[bytes]:
+        """Куски из очереди загрузки до конца файла или до обрыва загрузки"""
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def _stream_gtts(self, text: str) -> Iterable[bytes]:
+        """MP3 от Google TTS кусками по мере загрузки"""
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=RECOGNITION_LANGUAGE[:2], timeout=GTTS_TIMEOUT)
+        with metrics.span('tts_synthesis', engine='gtts', chars=len(text), streamed=True):
+            yield from tts.stream()
+
+    def _synthesize_queued(self, text: str, cancelled: Callable[[], bool]) -> Optional[Union[bytes, Iterator[bytes]]]:
+        """Синтез gTTS для очереди; при ошибке предложение озвучит pyttsx3"""
+        try:
+            return self._gtts_audio(text, cancelled)
+        except Exception as e:
+            print(f"❌ gTTS error: {e}")
+            return None
+
+    def _synthesize_gtts(self, text: str) -> bytes:
+        """Синтез MP3 через Google TTS"""
+        key = None
+        if self.audio_cache:
+            key = self._cache_key('gtts', text)
+            data = self.audio_cache.get_bytes(key)
+            if data:
+                return data
+
+        from gtts import gTTS
+
+        tts = gTTS(text=text, lang=RECOGNITION_LANGUAGE[:2], timeout=GTTS_TIMEOUT)
+        fp = io.BytesIO()
+        with metrics.span('tts_synthesis', engine='gtts', chars=len(text)):
+            tts.write_to_fp(fp)
+        data = fp.getvalue()
+
+        if key:
+            self.audio_cache.put(key, data, '.mp3')
+
+        return data
+
+    def _cache_key(self, engine: str, text: str) -> str:
+        """Ключ кэша озвучки для текущих настроек голоса"""
+        if engine == 'gtts':
+            return AudioCache.make_key(engine, '', 0, RECOGNITION_LANGUAGE[:2], text)
+        return AudioCache.make_key(engine, self.voice_id, VOICE_RATE, RECOGNITION_LANGUAGE, text)
+
+    def _play_audio(self, source: Union[bytes, Path, Iterator[bytes]]):
+        """Воспроизведение MP3/WAV через постоянный поток вывода или pygame"""
+        if not isinstance(source, (bytes, Path)):
+            # MP3 декодируется по мере загрузки: звук начинается до конца синтеза
+            self.output.play_mp3(source).wait()
+            return
+
+        import pygame
+
+        if self.output:
+            if isinstance(source, Path) and source.suffix == '.wav':
+                self.output.play_wav(source).wait()
+                return
+            if self.output.mp3_supported:
+                # MP3 подаётся декодеру кусками: первые кадры играют, пока декодируется остальное
+                data = source.read_bytes() if isinstance(source, Path) else source
+                chunk = 4096
+                self.output.play_mp3(data[i:i + chunk] for i in range(0, len(data), chunk)).wait()
+                return
+
+        if isinstance(source, Path):
+            pygame.mixer.music.load(str(source))
+        else:
+            pygame.mixer.music.load(io.BytesIO(source))
+        pygame.mixer.music.set_volume(VOICE_VOLUME)
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            time.sleep(0.1)
+
+    def prewarm_cache(self, phrases: Iterable[str]):
+        """Фоновый рендер известных фраз в кэш озвучки"""
+        if not self.audio_cache:
+            return
+
+        # Очередь озвучивания синтезирует по предложениям, так же их и кэшируем
+        sentences = [sentence for phrase in phrases for sentence in split_sentences(phrase)]
+
+        def render_pyttsx3(text: str):
+            with tempfile.TemporaryDirectory() as tmp:
+                self._render_pyttsx3(text, Path(tmp))
+
+        def prewarm():
+            rendered = 0
+            for sentence in dict.fromkeys(sentences):
+                try:
+                    if self.use_gtts:
+                        self._synthesize_gtts(sentence)
+                    elif self.tts_engine:
+                        # pyttsx3 рендерит только в своём потоке, дожидаясь пауз в речи
+                        self.speech.wait()
+                        self.speech.run(lambda text=sentence: render_pyttsx3(text)).result()
+                    rendered += 1
+                except Exception as e:
+                    print(f"⚠️ Не удалось подготовить фразу: {e}")
+            print(f"🔊 Кэш озвучки прогрет: {rendered} предложений")
+
+        threading.Thread(target=prewarm, daemon=True).start()
+
+    def calibrate(self, source=None, duration: float = CALIBRATION_DURATION) -> bool:
+        """Замер фонового шума; без source микрофон открывается на время замера"""
+        if source is None:
+            if not self.microphone:
+                print("❌ Микрофон не доступен")
+                return False
+            try:
+                with self.microphone as source:
+                    return self.calibrate(source, duration)
+            except Exception as e:
+                print(f"❌ Ошибка калибровки микрофона: {e}")
+                return False
+
+        print("🎚 Калибровка микрофона, помолчите секунду...")
+        with metrics.span('calibration'):
+            self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+
+        self.noise_floor.reset(self.recognizer.energy_threshold)
+        self.recognizer.energy_threshold = self.noise_floor.threshold()
+        self._recalibrate = False
+        print(f"🎚 Порог речи: {self.recognizer.energy_threshold:.0f}")
+        return True
+
+    def request_calibration(self):
+        """Калибровка перед следующей фразой: микрофон может быть занят прослушиванием"""
+        self._recalibrate = True
+
+    def _ensure_calibrated(self, source):
+        """Калибровка при первом прослушивании, по запросу или после сильного изменения шума"""
+        if not (self._recalibrate or self.noise_floor.drifted):
+            return
+        if self.noise_floor.calibrated and self.is_speaking:
+            # Замер шума во время ответа измерил бы голос ассистента, откладываем до тишины
+            return
+
+        if self.noise_floor.calibrated and not self._recalibrate:
+            print("🎚 Уровень шума изменился, перекалибровка")
+            metrics.increment('recalibrations', reason='drift')
+        self.calibrate(source)
+
+    def _track_noise(self, vad: VoiceActivityDetector, speaking: bool):
+        """Обновление уровня шума по кадрам без речи и порога для следующей фразы"""
+        if speaking:
+            # Перед такой фразой звучал сам ассистент, это не фоновый шум
+            return
+
+        if vad.noise_energy is not None:
+            self.noise_floor.observe(vad.noise_energy)
+        if vad.finished:
+            self.noise_floor.observe_phrase(vad.capped)
+        self.recognizer.energy_threshold = self.noise_floor.threshold()
+
+    def _listen(self, source, timeout: Optional[float], phrase_time_limit: Optional[float],
+                sink: Optional[Callable[[Optional[bytes]], None]] = None, stream_asr: bool = True):
+        """Запись фразы с покадровым определением её начала и конца"""
+        import speech_recognition as sr
+
+        speaking = self.is_speaking
+        stream = self.asr.open_stream(source.SAMPLE_RATE) if stream_asr else None
+        vad = VoiceActivityDetector(
+            source.SAMPLE_RATE, source.SAMPLE_WIDTH, self.recognizer.energy_threshold,
+            max_phrase=phrase_time_limit, sink=self._stream_sink(stream, sink) if stream else sink
+        )
+
+        threshold = vad.threshold
+        min_speech_frames = vad.min_speech_frames
+        echo_min_speech_frames = max(min_speech_frames, int(BARGE_IN_MIN_SPEECH_MS / 1000 / vad.frame_seconds))
+
+        waited = 0.0
+        onset_handled = False
+        while True:
+            if not vad.started:
+                # Пока звучит ответ, микрофон слышит и его: порог и минимальная длина речи выше
+                echo = self.is_speaking
+                vad.threshold = threshold * BARGE_IN_THRESHOLD_RATIO if echo else threshold
+                vad.min_speech_frames = echo_min_speech_frames if echo else min_speech_frames
+
+            if vad.feed(source.stream.read(vad.frame_samples)):
+                break
+
+            if vad.started:
+                if not onset_handled:
+                    onset_handled = True
+                    if BARGE_IN_ENABLED and self.is_speaking:
+                        self._barge_in()
+                    vad.threshold = threshold
+                continue
+
+            waited += vad.frame_seconds
+            if timeout and waited > timeout:
+                # Ожидание прошло в тишине: это тоже замер шума
+                self._track_noise(vad, speaking or self.is_speaking)
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+        # Ожидание начала речи не считается: замеряется только записанная фраза
+        metrics.observe('capture', vad.finished_at - vad.started_at)
+        self._track_noise(vad, speaking or self.is_speaking)
+
+        audio = sr.AudioData(vad.audio, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        if stream:
+            # Фраза уже разобрана во время записи: осталось забрать итог
+            with metrics.span('asr', engine=self.asr.name, streamed=True):
+                audio.transcript = stream.result()
+        return audio
+
+    def _stream_sink(self, stream, sink: Optional[Callable[[Optional[bytes]], None]]):
+        """Получатель кадров, который кормит потоковое распознавание и сообщает промежуточный текст"""
+        def feed(frame: Optional[bytes]):
+            partial = stream.partial
+            stream.feed(frame)
+            if self.on_partial and stream.partial and stream.partial != partial:
+                self.on_partial(stream.partial)
+            if sink:
+                sink(frame)
+
+        return feed
+
     def listen_once(self, timeout: int = 5, phrase_time_limit: int = 5) -> Optional[str]:
         """Однократное прослушивание"""
+        audio = self.capture(timeout=timeout, phrase_time_limit=phrase_time_limit)
+        if audio is None:
+            return None
+
+        return self.recognize(audio)
+
+    def capture(self, timeout: int = 5, phrase_time_limit: int = 5,
+                sink: Optional[Callable[[Optional[bytes]], None]] = None):
+        """Запись одной фразы с микрофона без распознавания; длинная фраза завершается на ближайшей паузе"""
+        import speech_recognition as sr
+
         if not self.microphone:
             print("❌ Микрофон не доступен")
             return None
 
         try:
             with self.microphone as source:
+                self._ensure_calibrated(source)
                 print("🎧 Слушаю...")
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-
-            print("🔄 Распознаю...")
-            text = self.recognizer.recognize_google(audio, language=RECOGNITION_LANGUAGE)
-            print(f"📝 Распознано: {text}")
-            return text
+                return self._listen(source, timeout, phrase_time_limit, sink)
 
         except sr.WaitTimeoutError:
             return None
-        except sr.UnknownValueError:
-            return None
-        except sr.RequestError as e:
-            print(f"❌ Ошибка сервиса распознавания: {e}")
-            return None
         except Exception as e:
             print(f"❌ Ошибка: {e}")
             return None
 
+    def recognize(self, audio, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Распознавание записанной фразы не позже срока deadline"""
+        deadline = deadline or Deadline(RECOGNITION_TIMEOUT)
+
+        if hasattr(audio, 'transcript'):
+            # Потоковый движок распознал фразу ещё во время записи
+            text = audio.transcript
+        else:
+            try:
+                print("🔄 Распознаю...")
+                with metrics.span('asr', engine=self.asr.name, turn=deadline.turn):
+                    text = retry_call(
+                        lambda: self.asr.recognize(audio, deadline.timeout(RECOGNITION_TIMEOUT)),
+                        deadline, self.asr.retryable
+                    )
+            except DeadlineExceeded:
+                print("⏱ Распознавание не уложилось в срок")
+                return None
+            except Exception as e:
+                if self.asr.retryable(e):
+                    print(f"❌ Ошибка сервиса распознавания: {e}")
+                else:
+                    print(f"❌ Ошибка: {e}")
+                return None
+
+        if text:
+            print(f"📝 Распознано: {text}")
+        return text
+
+    def recognize_file(self, path: Union[str, Path], deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Распознавание записи из WAV-файла, например для проверки без микрофона"""
+        import speech_recognition as sr
+
+        with sr.AudioFile(str(path)) as source:
+            audio = self.recognizer.record(source)
+        return self.recognize(audio, deadline)
+
     def start_listening(self, callback: Callable[[str], None]):
         """Запуск непрерывного прослушивания в фоне"""
         if not self.microphone:
@@ -147,35 +611,17 @@ class VoiceEngine:
             return
 
         self.is_listening = True
-        self.listen_callback = callback
-
-        def listen_loop():
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source)
-
-                while self.is_listening:
-                    try:
-                        audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=5)
-                        text = self.recognizer.recognize_google(audio, language=RECOGNITION_LANGUAGE)
-                        if text and self.listen_callback:
-                            self.listen_callback(text)
-                    except sr.WaitTimeoutError:
-                        continue
-                    except sr.UnknownValueError:
-                        continue
-                    except Exception as e:
-                        print(f"❌ Ошибка в цикле прослушивания: {e}")
-                        time.sleep(0.5)
-
-        self.listen_thread = threading.Thread(target=listen_loop, daemon=True)
-        self.listen_thread.start()
+        # Пока выполняется команда, микрофон продолжает читаться, а фразы ждут в очередях
+        self.listener = ContinuousListener(self, callback)
+        self.listener.start()
         print("🎧 Непрерывное прослушивание запущено")
 
     def stop_listening(self):
         """Остановка непрерывного прослушивания"""
         self.is_listening = False
-        if self.listen_thread:
-            self.listen_thread.join(timeout=2)
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
         print("🎧 Прослушивание остановлено")
 
     def toggle_gtts(self, enabled: bool):
@@ -184,4 +630,4 @@ class VoiceEngine:
         print(f"🔊 gTTS {'включен' if enabled else 'выключен'}")
 
 
-voice = VoiceEngine()
\ No newline at end of file
+voice = LazySingleton('voice', VoiceEngine)
\ No newline at end of file
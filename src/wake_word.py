@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from typing import List, Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from src.recognizers import VoskBackend, make_backend
+except ImportError:
+    from recognizers import VoskBackend, make_backend
+
+try:
+    from src.config import ASSISTANT_NAME, WAKE_WORD_SENSITIVITY, WAKE_WORD_MAX_SECONDS
+except ImportError:
+    try:
+        from config import ASSISTANT_NAME, WAKE_WORD_SENSITIVITY, WAKE_WORD_MAX_SECONDS
+    except ImportError:
+        ASSISTANT_NAME = 'Алиса'
+        WAKE_WORD_SENSITIVITY = 0.6
+        WAKE_WORD_MAX_SECONDS = 2.0
+
+# Слова перед именем, с которыми обращение всё ещё считается обращением
+WAKE_PREFIXES = ('эй', 'слушай', 'ну')
+
+PUNCTUATION = ',.!?:;…'
+
+
+class WakeWordSession:
+    """Поиск имени в начале одной фразы; звук подаётся кадрами по мере записи"""
+
+    def __init__(self, recognizer, word: str, sensitivity: float, max_bytes: int):
+        self.recognizer = recognizer
+        self.word = word
+        self.sensitivity = sensitivity
+        self.max_bytes = max_bytes
+
+        self.confidence = 0.0
+        self.cpu = 0.0
+        self._fed = 0
+        self._words: List[dict] = []
+
+    def feed(self, frame: Optional[bytes]):
+        """Очередной кадр; после начала фразы кадры не разбираются, поэтому нагрузка ограничена"""
+        if frame is None or self._fed >= self.max_bytes:
+            return
+
+        started = time.process_time()
+        if self.recognizer.AcceptWaveform(frame):
+            self._words.extend(json.loads(self.recognizer.Result()).get('result', []))
+        self.cpu += time.process_time() - started
+        self._fed += len(frame)
+
+    def result(self) -> Optional[float]:
+        """Конец имени в секундах от начала записи или None, если к ассистенту не обращались"""
+        started = time.process_time()
+        self._words.extend(json.loads(self.recognizer.FinalResult()).get('result', []))
+        self.cpu += time.process_time() - started
+
+        for word in self._words:
+            if word.get('word') == self.word:
+                self.confidence = max(self.confidence, word.get('conf', 1.0))
+                if word.get('conf', 1.0) >= self.sensitivity:
+                    return word['end']
+        return None
+
+
+class WakeWord:
+    """Проверка, что фраза обращена к ассистенту по имени"""
+
+    def __init__(self, word: str = ASSISTANT_NAME, model_source: Optional[VoskBackend] = None,
+                 sensitivity: float = WAKE_WORD_SENSITIVITY, max_seconds: float = WAKE_WORD_MAX_SECONDS):
+        self.word = word.lower()
+        self.model_source = model_source
+        self.sensitivity = sensitivity
+        self.max_seconds = max_seconds
+
+    @property
+    def on_device(self) -> bool:
+        """Ищется ли имя в звуке до распознавания"""
+        return self.model_source is not None
+
+    def open_session(self, sample_rate: int, sample_width: int = 2) -> Optional[WakeWordSession]:
+        """Сессия поиска имени в звуке; без модели Vosk имя ищется в распознанном тексте"""
+        if not self.on_device:
+            return None
+
+        import vosk
+
+        # Грамматика из одного имени: распознаватель не перебирает словарь и почти не нагружает CPU
+        recognizer = vosk.KaldiRecognizer(
+            self.model_source.model, sample_rate, json.dumps([self.word, '[unk]'], ensure_ascii=False)
+        )
+        recognizer.SetWords(True)
+        return WakeWordSession(recognizer, self.word, self.sensitivity,
+                               int(self.max_seconds * sample_rate) * sample_width)
+
+    def strip(self, text: str) -> Optional[str]:
+        """Текст после имени, пустая строка для одного имени или None, если имени в начале нет"""
+        words = [word.strip(PUNCTUATION) for word in text.lower().split()]
+        if words and words[0] in WAKE_PREFIXES:
+            words = words[1:]
+        if not words or words[0] != self.word:
+            return None
+        return ' '.join(words[1:])
+
+
+def make_wake_word(asr) -> WakeWord:
+    """Проверка имени на модели Vosk, общей с распознаванием, если она есть"""
+    model_source = asr if isinstance(asr, VoskBackend) else None
+
+    if model_source is None:
+        backend = make_backend(None, 'vosk')
+        if isinstance(backend, VoskBackend):
+            model_source = backend
+            threading.Thread(target=backend.warm_up, daemon=True).start()
+        else:
+            print("⚠️ Без Vosk имя ассистента проверяется по распознанному тексту")
+
+    return WakeWord(model_source=model_source)
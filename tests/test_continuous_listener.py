@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from src.continuous_listener import BoundedQueue, ContinuousListener
+
+
+class FakeVoice:
+    asr = None
+    microphone = None
+
+    def __init__(self, delays=None, failures=()):
+        self.delays = delays or {}
+        self.failures = set(failures)
+
+    def recognize(self, audio):
+        time.sleep(self.delays.get(audio, 0))
+        if audio in self.failures:
+            raise RuntimeError('сбой распознавания')
+        return f"фраза {audio}"
+
+
+def drain(queue):
+    items = []
+    while True:
+        item = queue.get(0)
+        if item is None:
+            return items
+        items.append(item[0])
+
+
+def test_drop_oldest_keeps_newest():
+    queue = BoundedQueue('test', 2, 'drop_oldest')
+    for item in (1, 2, 3):
+        queue.put(item)
+
+    assert queue.get(0) == 2
+    assert queue.get(0) == 3
+    assert queue.dropped == 1
+
+
+def test_drop_newest_rejects_incoming():
+    queue = BoundedQueue('test', 2, 'drop_newest')
+    queue.put(1)
+    queue.put(2)
+
+    assert queue.put(3) == 3
+    assert [queue.get(0), queue.get(0)] == [1, 2]
+
+
+def test_block_waits_for_space():
+    queue = BoundedQueue('test', 1, 'block')
+    queue.put(1)
+
+    putter = threading.Thread(target=queue.put, args=(2,))
+    putter.start()
+    time.sleep(0.05)
+    assert putter.is_alive()
+
+    assert queue.get(0) == 1
+    putter.join(1)
+    assert not putter.is_alive()
+    assert queue.get(0) == 2
+
+
+def test_closed_queue_releases_waiters():
+    queue = BoundedQueue('test', 1, 'block')
+    queue.close()
+
+    assert queue.get(1) is None
+    assert queue.put(1) == 1
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedQueue('test', 1, 'drop_random')
+
+
+def test_results_are_released_in_capture_order():
+    listener = ContinuousListener(FakeVoice(), callback=None, workers=1, buffer_size=8)
+
+    listener._complete(2, 'третья')
+    listener._complete(1, 'вторая')
+    assert len(listener.command_queue) == 0
+
+    listener._complete(0, 'первая')
+    assert drain(listener.command_queue) == ['первая', 'вторая', 'третья']
+
+
+def test_dropped_or_empty_phrase_does_not_stall_order():
+    listener = ContinuousListener(FakeVoice(), callback=None, workers=1, buffer_size=8)
+
+    listener._complete(1, 'вторая')
+    listener._complete(0, None)
+
+    assert drain(listener.command_queue) == ['вторая']
+
+
+def test_workers_finishing_out_of_order_dispatch_in_order():
+    # Ранние фразы распознаются дольше поздних, одна фраза падает с ошибкой
+    voice = FakeVoice(delays={0: 0.15, 1: 0.1, 2: 0.05}, failures={3})
+    received = []
+    listener = ContinuousListener(voice, received.append, workers=4, buffer_size=8)
+    listener.running = True
+
+    threads = [threading.Thread(target=listener._recognize_loop, daemon=True) for _ in range(4)]
+    threads.append(threading.Thread(target=listener._dispatch_loop, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    for seq in range(6):
+        listener.audio_queue.put((seq, seq, time.monotonic(), False))
+
+    expected = ['фраза 0', 'фраза 1', 'фраза 2', 'фраза 4', 'фраза 5']
+    waited = time.monotonic() + 3
+    while len(received) < len(expected) and time.monotonic() < waited:
+        time.sleep(0.01)
+    listener.stop()
+
+    assert received == expected
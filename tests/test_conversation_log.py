@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.conversation_log import ConversationLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = ConversationLog(tmp_path / 'conversation.db', retention_days=30, max_messages=100)
+    yield log
+    log.close()
+
+
+def test_tail_returns_latest_in_order(log):
+    for i in range(5):
+        log.append('user', f'сообщение {i}')
+    assert log.flush(5)
+
+    assert [message['content'] for message in log.tail(3)] == ['сообщение 2', 'сообщение 3', 'сообщение 4']
+
+
+def test_messages_survive_reopen(tmp_path):
+    path = tmp_path / 'conversation.db'
+    log = ConversationLog(path)
+    log.append('user', 'привет')
+    log.append('assistant', 'здравствуйте')
+    log.close()
+
+    reopened = ConversationLog(path)
+    try:
+        assert [message['role'] for message in reopened.tail(10)] == ['user', 'assistant']
+    finally:
+        reopened.close()
+
+
+def test_clear_keeps_messages_queued_after_it(log):
+    log.append('user', 'старое')
+    log.clear()
+    log.append('user', 'новое')
+    assert log.flush(5)
+
+    assert [message['content'] for message in log.tail(10)] == ['новое']
+
+
+def test_compact_drops_expired_and_excess_messages(log):
+    old = (datetime.now() - timedelta(days=31)).isoformat()
+    log.append('user', 'давнее', timestamp=old)
+    for i in range(150):
+        log.append('user', f'сообщение {i}')
+    assert log.flush(5)
+
+    log.compact()
+
+    assert log.count() == 100
+    assert log.tail(1)[0]['content'] == 'сообщение 149'
+    assert all(message['content'] != 'давнее' for message in log.tail(100))
@@ -0,0 +1,96 @@
+import pytest
+
+from src import deadline as deadline_module
+from src.deadline import Deadline, DeadlineExceeded, retry_call
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(deadline_module.time, 'sleep', delays.append)
+    return delays
+
+
+def failing(calls, error=ConnectionError):
+    def fn():
+        calls.append(1)
+        raise error('boom')
+    return fn
+
+
+def test_timeout_is_capped_by_remaining_budget():
+    deadline = Deadline(10.0)
+
+    assert deadline.timeout(2.0) == 2.0
+    assert deadline.timeout() <= 10.0
+
+
+def test_expired_deadline_raises():
+    deadline = Deadline(0.0)
+
+    assert deadline.expired
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(1.0)
+
+
+def test_limit_never_exceeds_parent():
+    parent = Deadline(0.5)
+
+    assert parent.limit(10.0).budget <= 0.5
+    assert parent.limit(0.1).budget == 0.1
+    assert parent.limit(0.1).turn == parent.turn
+
+
+def test_retry_call_returns_first_success(sleeps):
+    results = iter([ConnectionError('reset'), 'ok'])
+
+    def fn():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert retry_call(fn, Deadline(10.0)) == 'ok'
+    assert len(sleeps) == 1
+
+
+def test_retry_call_stops_after_attempts(sleeps):
+    calls = []
+
+    with pytest.raises(ConnectionError):
+        retry_call(failing(calls), Deadline(10.0), attempts=3)
+
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_retry_call_backoff_is_capped(sleeps):
+    calls = []
+
+    with pytest.raises(ConnectionError):
+        retry_call(failing(calls), Deadline(60.0), attempts=10)
+
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(deadline_module.RETRY_MAX_DELAY, deadline_module.RETRY_BASE_DELAY * 2 ** attempt)
+
+
+def test_retry_call_does_not_retry_permanent_errors(sleeps):
+    calls = []
+
+    with pytest.raises(ValueError):
+        retry_call(failing(calls, ValueError), Deadline(10.0), lambda e: isinstance(e, ConnectionError))
+
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_retry_call_does_not_sleep_past_deadline(sleeps, monkeypatch):
+    monkeypatch.setattr(deadline_module.random, 'uniform', lambda low, high: high)
+    calls = []
+
+    with pytest.raises(ConnectionError):
+        retry_call(failing(calls), Deadline(0.1), attempts=5)
+
+    # Первая пауза 0.25 с длиннее остатка срока: повтора нет
+    assert len(calls) == 1
+    assert sleeps == []
@@ -0,0 +1,82 @@
+from src.history import ConversationHistory, SUMMARY_LINE_CHARS
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def make_history(token_budget=10, summary_budget=100):
+    return ConversationHistory(count_words, token_budget=token_budget, summary_budget=summary_budget)
+
+
+def test_history_within_budget_is_kept_whole():
+    history = make_history(token_budget=10)
+    history.append('user', 'привет')
+    history.append('assistant', 'здравствуйте чем помочь')
+
+    assert len(history) == 2
+    assert history.summary == ''
+    assert history.tokens == 4
+
+
+def test_oldest_messages_move_to_summary():
+    history = make_history(token_budget=6)
+    history.append('user', 'как зовут кота')
+    history.append('assistant', 'кота зовут Барсик. Он рыжий.')
+    history.append('user', 'сколько ему лет')
+
+    assert [message['content'] for message in history] == ['сколько ему лет']
+    assert history.summary.splitlines() == ['Пользователь: как зовут кота', 'Ассистент: кота зовут Барсик.']
+    assert sum(count_words(message['content']) for message in history) <= 6
+
+
+def test_last_message_is_kept_even_over_budget():
+    history = make_history(token_budget=2)
+    history.append('user', 'очень длинный вопрос из многих слов')
+
+    assert len(history) == 1
+    assert history[0]['content'] == 'очень длинный вопрос из многих слов'
+
+
+def test_summary_is_trimmed_to_its_budget():
+    history = make_history(token_budget=1, summary_budget=6)
+    for i in range(5):
+        history.append('user', f'вопрос номер {i}')
+
+    lines = history.summary.splitlines()
+    # Резюме хранит самые свежие строки: по 4 слова на строку, бюджет 6 слов
+    assert lines == ['Пользователь: вопрос номер 3']
+
+
+def test_long_reply_is_shortened_in_summary():
+    history = make_history(token_budget=1)
+    history.append('assistant', 'а' * (SUMMARY_LINE_CHARS * 2))
+    history.append('user', 'дальше')
+
+    line = history.summary
+    assert line.startswith('Ассистент: ')
+    assert line.endswith('…')
+    assert len(line) <= len('Ассистент: ') + SUMMARY_LINE_CHARS + 1
+
+
+def test_prompt_starts_with_summary():
+    history = make_history(token_budget=3)
+    history.append('user', 'как зовут кота')
+    history.append('assistant', 'Барсик')
+
+    messages = history.prompt_messages()
+
+    assert messages[0]['role'] == 'system'
+    assert 'как зовут кота' in messages[0]['content']
+    assert messages[1:] == [{'role': 'assistant', 'content': 'Барсик'}]
+
+
+def test_clear_drops_summary():
+    history = make_history(token_budget=1)
+    history.append('user', 'раз два')
+    history.append('user', 'три')
+    history.clear()
+
+    assert len(history) == 0
+    assert history.summary == ''
+    assert history.tokens == 0
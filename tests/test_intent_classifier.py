@@ -0,0 +1,63 @@
+import pytest
+
+from scripts.train_intent_classifier import apply_threshold, evaluate
+from src.commands import CommandHandler, INTENT_CONFIDENCE_THRESHOLD
+from src.intent_classifier import IntentClassifier, load_phrases, OTHER_LABEL
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return IntentClassifier.from_phrases()
+
+
+def test_confident_paraphrase_is_answered_locally(classifier):
+    assert classifier.classify('подскажи пожалуйста который час', INTENT_CONFIDENCE_THRESHOLD) == 'time'
+    assert classifier.classify('какое число сегодня у нас', INTENT_CONFIDENCE_THRESHOLD) == 'date'
+    assert classifier.classify('какие команды ты понимаешь', INTENT_CONFIDENCE_THRESHOLD) == 'help'
+
+
+def test_low_confidence_falls_back_to_ai(classifier):
+    # Ближайшая команда — время, но отрыв от вопросов для AI ниже порога
+    label, score = classifier.predict('сколько времени печь пирог')
+    assert label == 'time'
+    assert score < INTENT_CONFIDENCE_THRESHOLD
+
+    assert classifier.classify('сколько времени печь пирог', INTENT_CONFIDENCE_THRESHOLD) is None
+
+
+def test_threshold_above_confidence_rejects_command(classifier):
+    label, score = classifier.predict('какие у меня встречи сегодня')
+    assert label == 'calendar'
+
+    assert classifier.classify('какие у меня встречи сегодня', score - 0.01) == 'calendar'
+    assert classifier.classify('какие у меня встречи сегодня', score + 0.01) is None
+
+
+def test_questions_for_ai_are_not_classified(classifier):
+    assert classifier.classify('посоветуй сериал', 0.0) is None
+    assert classifier.classify('кто изобрёл телефон', 0.0) is None
+
+
+def test_configured_threshold_keeps_false_local_answers_rare():
+    # Порог подобран кросс-валидацией; пополнение фраз не должно сделать его слишком мягким
+    predictions, _ = evaluate(load_phrases(), folds=5, seed=13)
+    confusion = apply_threshold(predictions, INTENT_CONFIDENCE_THRESHOLD)
+
+    others = sum(count for (label, _), count in confusion.items() if label == OTHER_LABEL)
+    false_local = others - confusion[(OTHER_LABEL, OTHER_LABEL)]
+    assert false_local / others <= 0.03
+
+
+def test_training_failure_is_not_retried(monkeypatch):
+    calls = []
+
+    def broken_phrases():
+        calls.append(1)
+        raise OSError('нет файла')
+
+    monkeypatch.setattr(IntentClassifier, 'from_phrases', broken_phrases)
+    handler = CommandHandler(ai_engine=None, calendar=None, voice=None)
+
+    assert handler.route('какая погода в москве') is None
+    assert handler.route('расскажи анекдот') is None
+    assert len(calls) == 1
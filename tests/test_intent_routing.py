@@ -0,0 +1,70 @@
+import pytest
+
+from src.commands import CommandHandler
+from src.intents import IntentRegistry, KeywordIndex
+
+
+@pytest.fixture(scope='module')
+def handler():
+    return CommandHandler(ai_engine=None, calendar=None, voice=None)
+
+
+@pytest.mark.parametrize('text', [
+    'покажи что умеешь',
+    'расскажи о планете марс',
+    'какие у тебя планы на выходные',
+    'дай совет на сегодня',
+    'какое число пи',
+    'сколько времени варить яйцо',
+    'я пока подумаю',
+    'какие у тебя выходные',
+    'стопка блинов',
+])
+def test_ordinary_questions_do_not_hit_unrelated_commands(handler, text):
+    assert handler.route(text) in (None, 'help')
+    assert handler.route(text) != 'exit'
+
+
+@pytest.mark.parametrize('text, intent', [
+    ('покажи что умеешь', 'help'),
+    ('что ты умеешь', 'help'),
+    ('который час', 'time'),
+    ('сколько сейчас времени?', 'time'),
+    ('скажи время', 'time'),
+    ('какое сегодня число', 'date'),
+    ('какая сегодня дата', 'date'),
+    ('какой сегодня день', 'date'),
+    ('что у меня сегодня', 'calendar'),
+    ('какие у меня планы на выходные', 'calendar'),
+    ('есть ли встречи завтра', 'calendar'),
+    ('какие дела на сегодня', 'calendar'),
+    ('открой ютуб', 'browser'),
+    ('откалибруй микрофон', 'calibrate'),
+    ('покажи статистику', 'metrics'),
+])
+def test_commands_are_routed(handler, text, intent):
+    assert handler.route(text) == intent
+
+
+@pytest.mark.parametrize('text', ['пока', 'пока пока', 'стоп!', 'выход', 'до свидания', 'алиса, стоп', 'ну всё, до свидания'])
+def test_exit_matches_whole_utterance(handler, text):
+    assert handler.route(text) == 'exit'
+
+
+def test_keywords_match_only_at_word_start():
+    index = KeywordIndex()
+    index.add('план', 'calendar')
+    index.add('встреч', 'calendar')
+
+    assert list(index.find_all('аэроплан')) == []
+    assert list(index.find_all('перевстречаться')) == []
+    assert [keyword for _, keyword, _ in index.find_all('план до встречи')] == ['план', 'встреч']
+
+
+def test_overlapping_pattern_of_higher_priority_wins():
+    registry = IntentRegistry()
+    registry.register('chat', handler=None, patterns=[r'расскажи про \w+'])
+    registry.register('weather', handler=None, patterns=[r'про погоду'], priority=10)
+
+    # Совпадение chat начинается раньше и накрывает совпадение weather
+    assert registry.match('расскажи про погоду завтра').name == 'weather'
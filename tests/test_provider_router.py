@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+from src.deadline import Deadline, DeadlineExceeded
+from src.provider_router import ProviderError, ProviderRouter, ProviderStats
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown():
+    stats = ProviderStats(failure_threshold=2, cooldown=30.0)
+
+    stats.record_failure()
+    assert stats.state == 'closed'
+    stats.record_failure()
+    assert stats.state == 'open'
+    assert not stats.available()
+
+    stats.opened_at -= 30.0
+    assert stats.state == 'half-open'
+    assert stats.available()
+
+
+def test_failed_probe_reopens_and_successful_probe_closes():
+    stats = ProviderStats(failure_threshold=3, cooldown=30.0)
+    for _ in range(3):
+        stats.record_failure()
+
+    stats.opened_at -= 30.0
+    stats.record_failure()
+    assert stats.state == 'open'
+
+    stats.opened_at -= 30.0
+    stats.record_success(0.1)
+    assert stats.state == 'closed'
+    assert stats.failures == 0
+
+
+def test_open_provider_is_skipped():
+    router = ProviderRouter(failure_threshold=1)
+    router.add('openai', lambda: 'a')
+    router.add('yandex', lambda: 'b')
+
+    router.record_failure('openai')
+
+    assert router.order() == ['yandex']
+    assert router.call() == ('yandex', 'b')
+
+
+def test_failover_to_next_provider_on_error():
+    def broken():
+        raise ProviderError('500')
+
+    router = ProviderRouter(hedge_enabled=False)
+    router.add('openai', broken)
+    router.add('yandex', lambda: 'ok')
+
+    assert router.call() == ('yandex', 'ok')
+    assert router.stats()['openai']['errors'] == 1
+
+
+def test_all_providers_failing_raises_provider_error():
+    def broken():
+        raise ProviderError('500')
+
+    router = ProviderRouter(hedge_enabled=False)
+    router.add('openai', broken)
+    router.add('yandex', broken)
+
+    with pytest.raises(ProviderError):
+        router.call()
+
+
+def test_hedge_wins_when_primary_is_slow():
+    def slow():
+        time.sleep(0.5)
+        return 'slow'
+
+    router = ProviderRouter(hedge_min_delay=0.05)
+    router.add('openai', slow)
+    router.add('yandex', lambda: 'fast')
+
+    started = time.monotonic()
+    assert router.call() == ('yandex', 'fast')
+    assert time.monotonic() - started < 0.4
+
+
+def test_fast_primary_is_not_hedged():
+    calls = []
+
+    def backup():
+        calls.append('yandex')
+        return 'backup'
+
+    router = ProviderRouter(hedge_min_delay=0.2)
+    router.add('openai', lambda: 'primary')
+    router.add('yandex', backup)
+
+    assert router.call() == ('openai', 'primary')
+    assert calls == []
+
+
+def test_lost_hedge_failure_is_not_counted():
+    def slow_then_fail():
+        time.sleep(0.2)
+        raise ConnectionError('reset')
+
+    router = ProviderRouter(hedge_min_delay=0.05, failure_threshold=1)
+    router.add('openai', slow_then_fail)
+    router.add('yandex', lambda: 'fast')
+
+    assert router.call() == ('yandex', 'fast')
+    time.sleep(0.3)
+
+    assert router.stats()['openai']['state'] == 'closed'
+    assert router.stats()['openai']['errors'] == 0
+
+
+def test_turn_deadline_does_not_open_breaker():
+    def hangs(deadline):
+        time.sleep(deadline.remaining() + 0.05)
+        deadline.timeout()
+
+    router = ProviderRouter(hedge_enabled=False, failure_threshold=1)
+    router.add('openai', hangs)
+
+    deadline = Deadline(0.1)
+    with pytest.raises(DeadlineExceeded):
+        router.call(deadline, deadline=deadline)
+    time.sleep(0.2)
+
+    assert router.stats()['openai']['state'] == 'closed'
+
+
+def test_request_timeout_within_budget_counts_as_failure():
+    def times_out(deadline):
+        raise TimeoutError('read timeout')
+
+    router = ProviderRouter(hedge_enabled=False, failure_threshold=1)
+    router.add('openai', times_out)
+
+    deadline = Deadline(5.0)
+    with pytest.raises(ProviderError):
+        router.call(deadline, deadline=deadline)
+
+    assert router.stats()['openai']['state'] == 'open'
@@ -0,0 +1,102 @@
+import sys
+
+import pytest
+
+from src.response_cache import ResponseCache
+
+
+def entry_size(key, value):
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+def test_hit_and_miss():
+    cache = ResponseCache(max_bytes=1024 * 1024, ttl=60)
+
+    assert cache.get('k') is None
+    cache.put('k', 'ответ')
+
+    assert cache.get('k') == 'ответ'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_expired_entry_is_dropped():
+    cache = ResponseCache(max_bytes=1024 * 1024, ttl=60)
+    cache.put('k', 'ответ', ttl=-1)
+
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_is_evicted():
+    size = entry_size('a', 'x' * 100)
+    cache = ResponseCache(max_bytes=size * 2, ttl=60)
+
+    cache.put('a', 'x' * 100)
+    cache.put('b', 'x' * 100)
+    # Обращение к a делает вытесняемым b
+    assert cache.get('a') is not None
+    cache.put('c', 'x' * 100)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] <= size * 2
+
+
+def test_single_oversized_entry_is_kept():
+    cache = ResponseCache(max_bytes=10, ttl=60)
+    cache.put('k', 'x' * 100)
+
+    assert cache.get('k') == 'x' * 100
+
+
+def test_persisted_entries_survive_restart(tmp_path):
+    path = tmp_path / 'responses.db'
+    ResponseCache(max_bytes=1024 * 1024, ttl=60, persist_path=path).put('k', 'ответ')
+
+    assert ResponseCache(max_bytes=1024 * 1024, ttl=60, persist_path=path).get('k') == 'ответ'
+
+
+def test_persisted_entries_are_bounded(tmp_path):
+    cache = ResponseCache(max_bytes=1000, ttl=60, persist_path=tmp_path / 'responses.db')
+    for i in range(50):
+        cache.put(f'k{i}', 'x' * 100)
+
+    total = cache._db.execute(
+        'SELECT SUM(LENGTH(CAST(key AS BLOB)) + LENGTH(CAST(value AS BLOB))) FROM responses'
+    ).fetchone()[0]
+    assert total <= 1000
+    assert cache._db.execute("SELECT 1 FROM responses WHERE key = 'k49'").fetchone()
+
+
+def test_key_ignores_case_punctuation_and_time():
+    key = ResponseCache.make_key('openai', 'gpt', 'Столица Франции?', {'current_time': '10:00'})
+
+    assert key == ResponseCache.make_key('openai', 'gpt', 'столица франции', {'current_time': '11:30'})
+    assert key != ResponseCache.make_key('yandex', 'gpt', 'столица франции')
+
+
+@pytest.mark.parametrize('text', [
+    'который час',
+    'что у меня сегодня',
+    'какая погода завтра',
+    'расскажи ещё',
+    'продолжай',
+    'а что это значит',
+    'какие планы на неделю',
+])
+def test_context_sensitive_questions_bypass_cache(text):
+    assert ResponseCache.is_context_sensitive(text)
+
+
+@pytest.mark.parametrize('text', [
+    'столица франции',
+    'сколько будет два плюс два',
+    'расскажи анекдот',
+    'что такое фотосинтез',
+    'часовой пояс москвы',
+])
+def test_stable_questions_are_cached(text):
+    assert not ResponseCache.is_context_sensitive(text)
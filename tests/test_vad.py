@@ -0,0 +1,91 @@
+from array import array
+
+from src.vad import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def speech_frame(amplitude=5000):
+    # Громкий сигнал с редкой сменой знака похож на голос, а не на шипение
+    return array('h', (amplitude if (i // 40) % 2 else -amplitude for i in range(FRAME_SAMPLES))).tobytes()
+
+
+def silence_frame():
+    return bytes(FRAME_SAMPLES * 2)
+
+
+def make_vad(**kwargs):
+    options = dict(frame_ms=FRAME_MS, hangover_ms=300, preroll_ms=90, min_speech_ms=90)
+    options.update(kwargs)
+    return VoiceActivityDetector(SAMPLE_RATE, 2, threshold=300, **options)
+
+
+def feed(vad, frames):
+    return [vad.feed(frame) for frame in frames]
+
+
+def test_phrase_ends_after_hangover_of_silence():
+    vad = make_vad()
+    feed(vad, [speech_frame()] * 3)
+    assert vad.started
+
+    # 300 мс паузы при кадре 30 мс: фраза заканчивается на десятом тихом кадре
+    results = feed(vad, [silence_frame()] * 10)
+
+    assert results == [False] * 9 + [True]
+    assert vad.finished
+
+
+def test_speech_inside_hangover_restarts_it():
+    vad = make_vad()
+    feed(vad, [speech_frame()] * 3)
+
+    assert not any(feed(vad, [silence_frame()] * 9))
+    assert not vad.feed(speech_frame())
+    assert not any(feed(vad, [silence_frame()] * 9))
+    assert vad.feed(silence_frame())
+
+
+def test_short_click_does_not_start_phrase():
+    vad = make_vad()
+    feed(vad, [speech_frame()] * 2 + [silence_frame()] * 20)
+
+    assert not vad.started
+    assert vad.frames == []
+
+
+def test_preroll_keeps_phrase_onset():
+    vad = make_vad(preroll_ms=150)
+    feed(vad, [silence_frame()] * 10 + [speech_frame()] * 3)
+
+    # 150 мс предзаписи — пять кадров, включая кадры начала речи
+    assert len(vad.frames) == 5
+    assert vad.frames[-1] == speech_frame()
+
+
+def test_sink_receives_frames_and_end_marker():
+    received = []
+    vad = make_vad(sink=received.append)
+    feed(vad, [speech_frame()] * 3 + [silence_frame()] * 10)
+
+    assert received[-1] is None
+    assert b''.join(received[:-1]) == vad.audio
+
+
+def test_hangover_shortens_after_soft_limit():
+    vad = make_vad(max_phrase=0.3)
+    feed(vad, [speech_frame()] * 20)
+
+    # После мягкого предела фраза заканчивается на более короткой паузе
+    results = feed(vad, [silence_frame()] * 10)
+    assert True in results[:9]
+
+
+def test_hard_limit_caps_endless_noise():
+    vad = make_vad(max_phrase=0.3)
+    results = feed(vad, [speech_frame()] * 100)
+
+    assert vad.finished and vad.capped
+    assert results.index(True) < 40